@@ -0,0 +1,137 @@
+"""
+Admission control for LLM calls
+Caps concurrent ChatGPT calls and queues the rest by priority, so an upset customer about
+to get a support ticket is served before joke requests from the test buttons. Low-priority
+requests that wait too long are shed to the smart responses instead of queueing further.
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+
+# Priority = channel + sentiment + strongest intent; higher is served first
+CHANNEL_PRIORITY = {
+    "web": 20,
+    "telegram": 20,
+    "quick_action": 10,
+    "test": 0,
+    "warmup": -10
+}
+SENTIMENT_PRIORITY = {
+    "negative": 30,  # create_support_ticket marks these "high"
+    "neutral": 10,
+    "positive": 10
+}
+INTENT_PRIORITY = {
+    "return": 15,
+    "order": 10,
+    "support": 10,
+    "contact": 10,
+    "product": 5,
+    "hours": 0
+}
+DEFAULT_PRIORITY = CHANNEL_PRIORITY["web"] + SENTIMENT_PRIORITY["neutral"]
+
+# Requests below this priority are shed after SHED_WAIT_SECONDS in the queue
+SHED_PRIORITY_THRESHOLD = 30
+SHED_WAIT_SECONDS = 0.5
+
+
+def request_priority(sentiment="neutral", intent_keywords=(), channel="web"):
+    """Queue priority of one LLM request"""
+    return (
+        CHANNEL_PRIORITY.get(channel, 0)
+        + SENTIMENT_PRIORITY.get(sentiment, SENTIMENT_PRIORITY["neutral"])
+        + max((INTENT_PRIORITY.get(intent, 0) for intent in intent_keywords), default=0)
+    )
+
+
+def _percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class AdmissionController:
+    """Concurrency cap with a priority queue and wait-based load shedding"""
+
+    def __init__(self, max_concurrent=4, shed_wait=SHED_WAIT_SECONDS,
+                 shed_priority_threshold=SHED_PRIORITY_THRESHOLD):
+        self.max_concurrent = max_concurrent
+        self.shed_wait = shed_wait
+        self.shed_priority_threshold = shed_priority_threshold
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._queue = []  # heap of (-priority, seq, waiter); shed waiters stay until popped
+        self._waiting = 0
+        self._seq = itertools.count()
+        self._wait_samples = deque(maxlen=1000)
+        self._stats = {
+            "requests": 0,
+            "admitted": 0,
+            "queued": 0,
+            "shed": 0,
+            "shed_by_channel": {}
+        }
+
+    def acquire(self, priority=DEFAULT_PRIORITY, timeout=None, channel="web"):
+        """Wait for an LLM slot; False means the request was shed (or ran out of time)"""
+        with self._lock:
+            self._stats["requests"] += 1
+            if self._in_flight < self.max_concurrent and not self._waiting:
+                self._in_flight += 1
+                self._stats["admitted"] += 1
+                self._wait_samples.append(0.0)
+                return True
+            waiter = {"event": threading.Event(), "granted": False}
+            heapq.heappush(self._queue, (-priority, next(self._seq), waiter))
+            self._waiting += 1
+            self._stats["queued"] += 1
+
+        max_wait = timeout
+        if priority < self.shed_priority_threshold:
+            max_wait = self.shed_wait if timeout is None else min(timeout, self.shed_wait)
+        start = time.monotonic()
+        waiter["event"].wait(max_wait)
+        waited = time.monotonic() - start
+
+        with self._lock:
+            self._wait_samples.append(waited)
+            if waiter["granted"]:
+                self._stats["admitted"] += 1
+                return True
+            # Not granted in time - leave the queue (release() skips removed waiters)
+            waiter["removed"] = True
+            self._waiting -= 1
+            self._stats["shed"] += 1
+            by_channel = self._stats["shed_by_channel"]
+            by_channel[channel] = by_channel.get(channel, 0) + 1
+            return False
+
+    def release(self):
+        """Free a slot, handing it straight to the highest-priority waiter"""
+        with self._lock:
+            while self._queue:
+                _, _, waiter = heapq.heappop(self._queue)
+                if not waiter.get("removed"):
+                    self._waiting -= 1
+                    waiter["granted"] = True
+                    waiter["event"].set()
+                    return
+            self._in_flight -= 1
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["shed_by_channel"] = dict(self._stats["shed_by_channel"])
+            stats["in_flight"] = self._in_flight
+            stats["queue_depth"] = self._waiting
+            samples = list(self._wait_samples)
+        stats["shed_rate"] = round(stats["shed"] / stats["requests"], 3) if stats["requests"] else 0.0
+        stats["queue_wait_p50"] = _percentile(samples, 50)
+        stats["queue_wait_p95"] = _percentile(samples, 95)
+        return stats
@@ -0,0 +1,48 @@
+"""
+Conversation analytics
+Message counts, response sources, sentiment and intent distributions for the dashboard.
+Kept free of Streamlit so it can be benchmarked and reused offline.
+"""
+
+import pandas as pd
+
+from text_analysis import analyze_sentiment, extract_intent_keywords
+
+
+def build_analytics_report(messages):
+    """Analytics for a list of chat messages (None when there are none)"""
+    if not messages:
+        return None
+    
+    # Convert messages to DataFrame
+    df = pd.DataFrame(messages)
+    
+    # Basic metrics
+    total_messages = len(df)
+    user_messages = len(df[df['role'] == 'user'])
+    bot_messages = len(df[df['role'] == 'assistant'])
+    
+    # Response source analysis
+    source_counts = df[df['role'] == 'assistant']['source'].value_counts()
+    
+    # Sentiment analysis
+    user_texts = df[df['role'] == 'user']['content'].tolist()
+    sentiments = [analyze_sentiment(text)[0] for text in user_texts]
+    sentiment_counts = pd.Series(sentiments).value_counts()
+    
+    # Intent analysis
+    all_keywords = []
+    for text in user_texts:
+        keywords = extract_intent_keywords(text)
+        all_keywords.extend(keywords)
+    intent_counts = pd.Series(all_keywords).value_counts()
+    
+    return {
+        'total_messages': total_messages,
+        'user_messages': user_messages,
+        'bot_messages': bot_messages,
+        'source_counts': source_counts,
+        'sentiment_counts': sentiment_counts,
+        'intent_counts': intent_counts,
+        'avg_response_time': 2.5  # Placeholder
+    }
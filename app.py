@@ -1,8 +1,6 @@
 import os
 import streamlit as st
-from openai import OpenAI
-from google.cloud import dialogflow_v2 as dialogflow
-from google.api_core.exceptions import GoogleAPIError
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 
 # Try to get environment variables first, fallback to config.py
 try:
@@ -40,27 +38,72 @@ import json
 from datetime import datetime
 import requests
 import threading
+import uuid
 import plotly.express as px
 import plotly.graph_objects as go
-import pandas as pd
-from textblob import TextBlob
 import re
+from stages import StageExecutor, format_timings
+from event_bus import EventBus
+from telegram_supervisor import TelegramSupervisor
+from shared_state import get_shared_state
+from text_analysis import analyze_sentiment, extract_intent_keywords, detect_language
+from analytics import build_analytics_report
+from engine_client import get_engine
+from tracing import tracer, span, observe, start_metrics_server
 
-# Set Google credentials for Dialogflow
-os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = GOOGLE_APPLICATION_CREDENTIALS_PATH
+# Telegram bot setup
+# TELEGRAM_API_BASE points the bot at another Bot API server (e.g. the load-test stand-in)
+TELEGRAM_API_BASE = os.getenv("TELEGRAM_API_BASE", "https://api.telegram.org")
+TELEGRAM_API_URL = f"{TELEGRAM_API_BASE}/bot{TELEGRAM_BOT_TOKEN}"
 
-# Set OpenAI client
-openai_client = OpenAI(api_key=OPENAI_API_KEY)
+# Ticket numbers and the Telegram offset live in the shared state backend so every
+# Streamlit process and telegram_bot.py see the same values
+shared_state = get_shared_state()
 
-# Dialogflow session client
-dialogflow_session_client = dialogflow.SessionsClient()
+# The response pipeline runs in the response engine - in this process, or in the
+# engine_server.py service when ENGINE_URL is set
+engine = get_engine()
 
-# Telegram bot setup
-TELEGRAM_API_URL = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}"
+# Telegram events kept for the dashboard (process-wide) and shown per session
+TELEGRAM_EVENT_BUFFER_SIZE = 500
+TELEGRAM_PANEL_SIZE = 10
+TELEGRAM_PANEL_REFRESH_SECONDS = 2
+TELEGRAM_POLL_TIMEOUT_SECONDS = 10
+TELEGRAM_OFFSET_KEY = "telegram:offset"
+
+# Prometheus text endpoint for this Streamlit process (GET /metrics)
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9108"))
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")  # set to 0.0.0.0 to expose /metrics beyond this machine
+
+@st.cache_resource
+def get_stage_executor():
+    """Shared thread pool for per-message analysis and backend stages"""
+    return StageExecutor()
+
+@st.cache_resource
+def get_metrics_server():
+    """One /metrics endpoint per server process"""
+    return start_metrics_server(METRICS_PORT, METRICS_HOST)
+
+@st.cache_resource
+def get_telegram_event_bus():
+    """Bounded buffer the Telegram worker publishes to; every session reads from it"""
+    return EventBus(maxlen=TELEGRAM_EVENT_BUFFER_SIZE)
 
-# Global flag to track OpenAI quota status
-openai_quota_exceeded = False
-last_update_id = 0
+def periodic_fragment(run_every):
+    """st.fragment (st.experimental_fragment on older Streamlit) with a plain-function fallback"""
+    fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None)
+    if fragment is None:
+        return lambda fn: fn
+    return fragment(run_every=run_every)
+
+def run_with_script_context(fn):
+    """Bind the current Streamlit script context so st.* calls work from worker threads"""
+    ctx = get_script_run_ctx()
+    def wrapper(*args, **kwargs):
+        add_script_run_ctx(threading.current_thread(), ctx)
+        return fn(*args, **kwargs)
+    return wrapper
 
 # Streamlit page config
 st.set_page_config(
@@ -290,338 +333,61 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
-# ---------- ENHANCED RESPONSE SYSTEM ----------
-def get_smart_response(user_input):
-    """Enhanced response system with better context and fallback"""
-    user_input_lower = user_input.lower()
-    
-    # Enhanced greeting responses
-    if any(word in user_input_lower for word in ['hello', 'hi', 'hey', 'good morning', 'good afternoon', 'good evening']):
-        return {
-            "response": "Hello! 👋 I'm your AI-powered support assistant. I'm here to help you with any questions about our products, services, or support needs. How can I assist you today?",
-            "source": "dialogflow",
-            "confidence": 0.95
-        }
-    
-    # Help and support requests
-    elif any(word in user_input_lower for word in ['help', 'support', 'assist', 'what can you do', 'how can you help']):
-        return {
-            "response": """I'm your comprehensive support assistant! Here's what I can help you with:
-
-🔍 **Product Information** - Find details, pricing, and availability
-📦 **Order Management** - Track orders, check status, and manage deliveries
-🔄 **Returns & Refunds** - Process returns and handle refunds
-🔧 **Technical Support** - Troubleshoot issues and provide solutions
-📞 **Contact Information** - Connect you with the right team
-⏰ **Business Hours** - Check availability and support times
-💳 **Payment & Billing** - Handle payment issues and billing questions
-
-What would you like to know about?""",
-            "source": "dialogflow",
-            "confidence": 0.9
-        }
-    
-    # Product inquiries
-    elif any(word in user_input_lower for word in ['product', 'item', 'buy', 'purchase', 'price', 'cost', 'available']):
-        return {
-            "response": "I'd be happy to help you with product information! Could you please specify which product or category you're interested in? I can provide details about pricing, features, availability, and help you make the best choice.",
-            "source": "dialogflow",
-            "confidence": 0.85
-        }
-    
-    # Order status
-    elif any(word in user_input_lower for word in ['order', 'tracking', 'shipping', 'delivery', 'when', 'status', 'where is my']):
-        return {
-            "response": """To check your order status, I'll need your order number. Here's how to find it:
-
-📧 **Email Confirmation** - Check your email for order confirmation
-📱 **Account Dashboard** - Log into your account to view order history
-📞 **Phone Support** - Call us at 1-800-SUPPORT with your order number
-
-Once you have your order number, I can help you track its status and estimated delivery date. Do you have your order number handy?""",
-            "source": "dialogflow",
-            "confidence": 0.9
-        }
-    
-    # Returns and refunds
-    elif any(word in user_input_lower for word in ['return', 'refund', 'exchange', 'cancel', 'send back', 'money back']):
-        return {
-            "response": """Our return and refund policy is designed to make things easy for you:
-
-✅ **30-Day Return Window** - Return items within 30 days of purchase
-📦 **Free Return Shipping** - We cover all return shipping costs
-💳 **Full Refund** - Money back to your original payment method
-🔄 **Easy Process** - Use our online return portal or contact support
-
-To start a return, I'll need your order number and the reason for return. Do you have your order details ready?""",
-            "source": "dialogflow",
-            "confidence": 0.9
-        }
-    
-    # Technical issues
-    elif any(word in user_input_lower for word in ['technical', 'broken', 'not working', 'error', 'problem', 'issue', 'trouble', 'fix']):
-        return {
-            "response": """I'm sorry to hear you're experiencing technical issues. Let me help you troubleshoot:
-
-🔍 **Quick Troubleshooting Steps:**
-• Restart your device/browser
-• Clear cache and cookies
-• Check your internet connection
-• Try a different browser or device
-• Update to the latest version
-
-📞 **Still having issues?** I can connect you with our technical support team for personalized assistance.
-
-Could you describe the problem in detail so I can provide more specific help?""",
-            "source": "dialogflow",
-            "confidence": 0.85
-        }
-    
-    # Contact information
-    elif any(word in user_input_lower for word in ['contact', 'phone', 'email', 'speak', 'human', 'agent', 'talk to someone']):
-        return {
-            "response": """You can reach our customer service team through multiple channels:
-
-📞 **Phone Support:** 1-800-SUPPORT (24/7)
-📧 **Email:** support@company.com
-💬 **Live Chat:** Available on our website
-📱 **Mobile App:** Download our app for quick support
-
-⏰ **Business Hours:**
-Monday-Friday: 8 AM - 8 PM EST
-Saturday: 9 AM - 6 PM EST
-Sunday: 10 AM - 4 PM EST
-
-Would you like me to connect you with a human agent right now?""",
-            "source": "dialogflow",
-            "confidence": 0.9
-        }
-    
-    # Business hours
-    elif any(word in user_input_lower for word in ['hours', 'open', 'closed', 'time', 'when', 'available', 'business hours']):
-        return {
-            "response": """Our customer support is available:
-
-🕐 **Monday-Friday:** 8 AM - 8 PM EST
-🕐 **Saturday:** 9 AM - 6 PM EST
-🕐 **Sunday:** 10 AM - 4 PM EST
-
-📞 **24/7 Emergency Support:** Available for urgent technical issues
-💬 **Online Chat:** Available 24/7 for general inquiries
-
-We're here to help whenever you need us!""",
-            "source": "dialogflow",
-            "confidence": 0.9
-        }
-    
-    # Goodbye
-    elif any(word in user_input_lower for word in ['bye', 'goodbye', 'end', 'exit', 'see you', 'thank you', 'thanks']):
-        return {
-            "response": "Thank you for chatting with us! Have a wonderful day! 👋 Feel free to come back anytime you need assistance. We're here to help!",
-            "source": "dialogflow",
-            "confidence": 0.95
-        }
+# ---------- TELEGRAM INTEGRATION ----------
+def handle_telegram_update(update, event_bus):
+    """Answer one Telegram update and publish both sides to the dashboard event bus"""
+    if "message" not in update:
+        return
+    message = update["message"]
+    chat_id = message["chat"]["id"]
+    text = message.get("text", "")
     
-    # Default - will be handled by ChatGPT
-    else:
-        return None
-
-# ---------- ENHANCED DIALOGFLOW FUNCTION ----------
-def detect_intent_text(session_id, text, language_code="en"):
-    session = dialogflow_session_client.session_path(DIALOGFLOW_PROJECT_ID, session_id)
-    text_input = dialogflow.TextInput(text=text, language_code=language_code)
-    query_input = dialogflow.QueryInput(text=text_input)
-
-    try:
-        response = dialogflow_session_client.detect_intent(
-            request={"session": session, "query_input": query_input}
-        )
-        fulfillment_text = response.query_result.fulfillment_text
-        # Check if Dialogflow has a meaningful response
-        if fulfillment_text and fulfillment_text.strip():
-            # List of generic/unhelpful responses that should trigger ChatGPT fallback
-            generic_responses = [
-                "hmm, i'm not sure i understand",
-                "could you rephrase",
-                "sorry, i'm still learning",
-                "i'm afraid i don't have an answer",
-                "that's a bit outside my knowledge",
-                "can you ask something else",
-                "i'll pass it along to the team",
-                "that's a great question",
-                "i'm not sure about that",
-                "let me check on that",
-                "i don't have information about that",
-                "that's beyond my capabilities",
-                "i didn't get that",
-                "i'm sorry, i didn't quite catch that",
-                "would you like to talk to a support agent",
-                "can you try saying it differently",
-                "i didn't catch that",
-                "could you please rephrase",
-                "i'm sorry, i didn't understand",
-                "let me connect you with someone",
-                "i'll transfer you to an agent",
-                "that's outside my scope",
-                "i can't help with that",
-                "i don't have that information",
-                "i'm not programmed for that",
-                "that's not something i can assist with",
-                "i'm limited in what i can help with",
-                "i don't have access to that",
-                "that's beyond my training",
-                "i can't process that request"
-            ]
-            # Check if the response is generic/unhelpful
-            response_lower = fulfillment_text.lower()
-            is_generic = any(generic in response_lower for generic in generic_responses)
-            if is_generic:
-                return None  # Trigger ChatGPT fallback
-            else:
-                return {
-                    "response": fulfillment_text,
-                    "source": "dialogflow",
-                    "confidence": response.query_result.intent_detection_confidence
-                }
-        return None
-    except Exception as e:
-        st.error(f"Dialogflow error: {str(e)}")
-        return None
-
-# ---------- ENHANCED OPENAI FUNCTION ----------
-def ask_openai(prompt, conversation_history=None):
-    global openai_quota_exceeded
-    if openai_quota_exceeded:
-        return {
-            "response": """I understand you need help! Unfortunately, my advanced AI service is temporarily unavailable due to usage limits. 
-
-Here are your options:
-📞 **Call Support:** 1-800-SUPPORT (24/7)
-📧 **Email:** support@company.com
-💬 **Live Chat:** Available on our website
-⏰ **Business Hours:** Mon-Fri 8AM-8PM EST
-
-For immediate assistance, I recommend contacting our human support team who can help you right away!""",
-            "source": "fallback",
-            "confidence": 0.0
-        }
-
-    try:
-        # Build conversation context
-        messages = [
-            {
-                "role": "system", 
-                "content": """You are a professional, friendly, and helpful customer support AI assistant. 
-                You provide clear, accurate, and helpful responses to customer inquiries. 
-                Always be polite, professional, and try to be as helpful as possible. 
-                If you don't know something, suggest contacting human support."""
-            }
-        ]
-        
-        # Add conversation history if available
-        if conversation_history:
-            for msg in conversation_history[-6:]:  # Keep last 6 messages for context
-                messages.append({"role": msg["role"], "content": msg["content"]})
+    if text:
+        # Publish incoming message
+        event_bus.publish({
+            "chat_id": chat_id,
+            "text": text,
+            "type": "incoming",
+            "timestamp": datetime.now().isoformat()
+        })
         
-        # Add current user message
-        messages.append({"role": "user", "content": prompt})
+        # Process message and get response (the engine keeps the chat's recent turns)
+        response = engine.telegram_reply(chat_id, text)
         
-        response = openai_client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            temperature=0.7,
-            messages=messages,
-            max_tokens=300
-        )
+        # Send response back
+        send_telegram_message(chat_id, response)
         
-        return {
-            "response": response.choices[0].message.content.strip(),
-            "source": "chatgpt",
-            "confidence": 0.8
-        }
-    except Exception as e:
-        error_str = str(e)
+        # Publish outgoing message
+        event_bus.publish({
+            "chat_id": "Bot",
+            "text": response,
+            "type": "outgoing",
+            "timestamp": datetime.now().isoformat()
+        })
         
-        # Handle quota exceeded error specifically
-        if "429" in error_str or "quota" in error_str.lower():
-            openai_quota_exceeded = True
-            return {
-                "response": """I understand you need help! Unfortunately, my advanced AI service is temporarily unavailable due to usage limits. 
+        print(f"📤 Telegram: Sent response to {chat_id}")
 
-Here are your options:
-📞 **Call Support:** 1-800-SUPPORT (24/7)
-📧 **Email:** support@company.com
-💬 **Live Chat:** Available on our website
-⏰ **Business Hours:** Mon-Fri 8AM-8PM EST
+def fetch_telegram_updates(offset, timeout):
+    """getUpdates for the supervisor; raises so failures show up in its health stats"""
+    updates = get_telegram_updates(offset=offset, timeout=timeout)
+    if not updates or not updates.get("ok"):
+        raise RuntimeError(f"getUpdates failed: {updates.get('description') if updates else 'no response'}")
+    return updates.get("result", [])
 
-For immediate assistance, I recommend contacting our human support team who can help you right away!""",
-                "source": "fallback",
-                "confidence": 0.0
-            }
-        else:
-            return {
-                "response": "I apologize, but I'm having trouble processing your request right now. Please try again in a moment or contact our human support team for immediate assistance.",
-                "source": "fallback",
-                "confidence": 0.0
-            }
-
-# ---------- TELEGRAM INTEGRATION ----------
-def start_telegram_bot():
-    """Start Telegram bot in background thread"""
-    def bot_loop():
-        global last_update_id
-        while True:
-            try:
-                updates = get_telegram_updates()
-                if updates and updates.get("ok"):
-                    for update in updates.get("result", []):
-                        if "message" in update:
-                            message = update["message"]
-                            chat_id = message["chat"]["id"]
-                            text = message.get("text", "")
-                            
-                            if text:
-                                # Store incoming message
-                                if "telegram_messages" not in st.session_state:
-                                    st.session_state.telegram_messages = []
-                                
-                                st.session_state.telegram_messages.append({
-                                    "chat_id": chat_id,
-                                    "text": text,
-                                    "type": "incoming",
-                                    "timestamp": datetime.now().isoformat()
-                                })
-                                
-                                # Process message and get response
-                                response = process_telegram_message(chat_id, text)
-                                
-                                # Send response back
-                                send_telegram_message(chat_id, response)
-                                
-                                # Store outgoing message
-                                st.session_state.telegram_messages.append({
-                                    "chat_id": "Bot",
-                                    "text": response,
-                                    "type": "outgoing",
-                                    "timestamp": datetime.now().isoformat()
-                                })
-                                
-                                print(f"📤 Telegram: Sent response to {chat_id}")
-                    
-                    # Update last_update_id
-                    if updates.get("result"):
-                        last_update_id = max(last_update_id, max(update["update_id"] for update in updates["result"]))
-                
-                time.sleep(2)  # Check every 2 seconds
-                
-            except Exception as e:
-                print(f"Telegram bot error: {str(e)}")
-                time.sleep(5)
-    
-    # Start bot in background thread
-    import threading
-    bot_thread = threading.Thread(target=bot_loop, daemon=True)
-    bot_thread.start()
-    return bot_thread
+@st.cache_resource
+def get_telegram_supervisor():
+    """Exactly one Telegram poller per server process, shared by every browser session"""
+    # Session state is per browser session and unsafe off the script thread, so the
+    # worker publishes to the process-wide event bus instead
+    event_bus = get_telegram_event_bus()
+    return TelegramSupervisor(
+        fetch_updates=fetch_telegram_updates,
+        handle_update=lambda update: handle_telegram_update(update, event_bus),
+        poll_timeout=TELEGRAM_POLL_TIMEOUT_SECONDS,
+        # The offset is shared so a restarted or different process resumes where polling stopped
+        offset=shared_state.get(TELEGRAM_OFFSET_KEY, 0),
+        on_offset=lambda offset: shared_state.set(TELEGRAM_OFFSET_KEY, offset)
+    )
 
 def check_telegram_connection():
     """Check if Telegram bot is connected"""
@@ -634,13 +400,14 @@ def check_telegram_connection():
     except:
         return False, None, None
 
-def get_telegram_updates():
+def get_telegram_updates(offset=None, timeout=10):
     """Get updates from Telegram bot"""
-    global last_update_id
     try:
         url = f"{TELEGRAM_API_URL}/getUpdates"
-        params = {"offset": last_update_id + 1, "timeout": 10}
-        response = requests.get(url, params=params)
+        params = {"timeout": timeout}
+        if offset is not None:
+            params["offset"] = offset
+        response = requests.get(url, params=params, timeout=timeout + 5)
         return response.json()
     except Exception as e:
         print(f"Telegram error: {str(e)}")
@@ -648,169 +415,29 @@ def get_telegram_updates():
 
 def send_telegram_message(chat_id, message):
     """Send message to Telegram user"""
-    try:
-        url = f"{TELEGRAM_API_URL}/sendMessage"
-        data = {
-            "chat_id": chat_id,
-            "text": message,
-            "parse_mode": "Markdown"
-        }
-        response = requests.post(url, data=data)
-        return response.json()
-    except Exception as e:
-        print(f"Telegram error: {str(e)}")
-        return None
-
-def process_telegram_message(chat_id, message_text):
-    """Process incoming Telegram message and return response"""
-    print(f"📱 Processing Telegram message from {chat_id}: {message_text}")
-    
-    # Try Dialogflow first (always available)
-    dialogflow_response = detect_intent_text(f"telegram-{chat_id}", message_text)
-    
-    if dialogflow_response:
-        return dialogflow_response["response"]
-    
-    # If OpenAI quota not exceeded, try ChatGPT
-    global openai_quota_exceeded
-    if not openai_quota_exceeded:
+    with span("telegram_send", "error") as send_span:
         try:
-            chatgpt_response = ask_openai(message_text)
-            if chatgpt_response and chatgpt_response["source"] == "chatgpt":
-                return chatgpt_response["response"]
-        except:
-            pass
-    
-    # Fallback to smart response
-    smart_response = get_smart_response(message_text)
-    if smart_response:
-        return smart_response["response"]
-    
-    # Final fallback
-    return "I'm here to help! Please contact our support team at 1-800-SUPPORT for immediate assistance."
-
-# ---------- ENHANCED CHAT LOGIC ----------
-def get_response_with_smart_fallback(user_input, conversation_history=None):
-    """Enhanced response logic with smart fallback based on quota status"""
-    global openai_quota_exceeded
-    
-    # Always try Dialogflow first
-    dialogflow_response = detect_intent_text("session-001", user_input)
-    
-    if dialogflow_response:
-        return dialogflow_response
-    
-    # If OpenAI quota exceeded, skip ChatGPT and use smart responses
-    if openai_quota_exceeded:
-        smart_response = get_smart_response(user_input)
-        if smart_response:
-            return smart_response
-        else:
-            return {
-                "response": """I understand you need help! Our advanced AI is temporarily unavailable, but I can still assist you with:
-
-📞 **Call Support:** 1-800-SUPPORT (24/7)
-📧 **Email:** support@company.com
-💬 **Live Chat:** Available on our website
-⏰ **Business Hours:** Mon-Fri 8AM-8PM EST
-
-For immediate assistance, please contact our human support team!""",
-                "source": "fallback",
-                "confidence": 0.0
+            url = f"{TELEGRAM_API_URL}/sendMessage"
+            data = {
+                "chat_id": chat_id,
+                "text": message,
+                "parse_mode": "Markdown"
             }
-    
-    # Try smart response system
-    smart_response = get_smart_response(user_input)
-    if smart_response:
-        return smart_response
-    
-    # Fallback to ChatGPT (if quota not exceeded)
-    try:
-        return ask_openai(user_input, conversation_history)
-    except:
-        return {
-            "response": "I apologize, but I'm having trouble processing your request right now. Please try again in a moment or contact our human support team for immediate assistance.",
-            "source": "fallback",
-            "confidence": 0.0
-        }
+            response = requests.post(url, data=data)
+            send_span["source"] = "ok" if response.status_code == 200 else "error"
+            return response.json()
+        except Exception as e:
+            print(f"Telegram error: {str(e)}")
+            return None
 
 # ---------- ADVANCED ANALYTICS FUNCTIONS ----------
-def analyze_sentiment(text):
-    """Analyze sentiment of user messages"""
-    try:
-        blob = TextBlob(text)
-        sentiment_score = blob.sentiment.polarity
-        if sentiment_score > 0.1:
-            return "positive", sentiment_score
-        elif sentiment_score < -0.1:
-            return "negative", sentiment_score
-        else:
-            return "neutral", sentiment_score
-    except:
-        return "neutral", 0.0
-
-def extract_intent_keywords(text):
-    """Extract key intent keywords from user messages"""
-    keywords = []
-    text_lower = text.lower()
-    
-    # Intent categories
-    intents = {
-        "order": ["order", "tracking", "delivery", "shipping", "where", "when"],
-        "support": ["help", "support", "assist", "problem", "issue", "trouble"],
-        "product": ["product", "item", "buy", "purchase", "price", "cost"],
-        "return": ["return", "refund", "exchange", "cancel", "send back"],
-        "contact": ["contact", "phone", "email", "speak", "human", "agent"],
-        "hours": ["hours", "open", "closed", "time", "when", "available"]
-    }
-    
-    for intent, words in intents.items():
-        if any(word in text_lower for word in words):
-            keywords.append(intent)
-    
-    return keywords
-
 def calculate_response_time(start_time, end_time):
     """Calculate response time in seconds"""
     return round((end_time - start_time).total_seconds(), 2)
 
 def generate_analytics_report():
     """Generate comprehensive analytics report"""
-    if not st.session_state.messages:
-        return None
-    
-    # Convert messages to DataFrame
-    df = pd.DataFrame(st.session_state.messages)
-    
-    # Basic metrics
-    total_messages = len(df)
-    user_messages = len(df[df['role'] == 'user'])
-    bot_messages = len(df[df['role'] == 'assistant'])
-    
-    # Response source analysis
-    source_counts = df[df['role'] == 'assistant']['source'].value_counts()
-    
-    # Sentiment analysis
-    user_texts = df[df['role'] == 'user']['content'].tolist()
-    sentiments = [analyze_sentiment(text)[0] for text in user_texts]
-    sentiment_counts = pd.Series(sentiments).value_counts()
-    
-    # Intent analysis
-    all_keywords = []
-    for text in user_texts:
-        keywords = extract_intent_keywords(text)
-        all_keywords.extend(keywords)
-    intent_counts = pd.Series(all_keywords).value_counts()
-    
-    return {
-        'total_messages': total_messages,
-        'user_messages': user_messages,
-        'bot_messages': bot_messages,
-        'source_counts': source_counts,
-        'sentiment_counts': sentiment_counts,
-        'intent_counts': intent_counts,
-        'avg_response_time': 2.5  # Placeholder
-    }
+    return build_analytics_report(st.session_state.messages)
 
 def create_analytics_dashboard():
     """Create interactive analytics dashboard"""
@@ -866,43 +493,67 @@ def create_analytics_dashboard():
         else:
             st.info("No response source data available yet.")
 
-# ---------- MULTI-LANGUAGE SUPPORT ----------
-def detect_language(text):
-    """Detect language of user input"""
-    try:
-        blob = TextBlob(text)
-        return blob.detect_language()
-    except:
-        return "en"
-
-def translate_response(response, target_language="en"):
-    """Translate response to target language"""
-    try:
-        blob = TextBlob(response)
-        translated = blob.translate(to=target_language)
-        return str(translated)
-    except:
-        return response
+def create_global_dashboard():
+    """Traffic across all users and channels, from the engine's minute/hour rollups"""
+    st.markdown("### 🌐 Global Traffic (all users)")
+    window_label = st.radio("Window", ["Last hour", "Last 24 hours", "Last 7 days"], horizontal=True, key="rollup_window")
+    resolution, window = {"Last hour": ("minute", 60), "Last 24 hours": ("hour", 24), "Last 7 days": ("hour", 168)}[window_label]
+    report = engine.rollups(resolution, window)
+    totals = report["totals"]
+    if not totals["messages"]:
+        st.info("No traffic in this window yet.")
+        return
+    
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Messages", totals["messages"])
+    with col2:
+        st.metric("Telegram Share", f"{totals['channels'].get('telegram', 0) / totals['messages']:.0%}")
+    with col3:
+        st.metric("p50 Latency", f"{totals['latency']['p50']}s")
+    with col4:
+        st.metric("p95 Latency", f"{totals['latency']['p95']}s")
+    
+    times = [datetime.fromtimestamp(bucket["start"]) for bucket in report["series"]]
+    tab1, tab2, tab3 = st.tabs(["📈 Volume & Latency", "🤖 Sources", "🎯 Intents & Sentiment"])
+    with tab1:
+        fig = px.bar(x=times, y=[bucket["messages"] for bucket in report["series"]], title=f"Messages per {resolution}")
+        fig.update_layout(paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)', font_color='white')
+        st.plotly_chart(fig, use_container_width=True)
+        fig = px.line(x=times, y=[bucket["latency"]["p95"] for bucket in report["series"]], title=f"p95 latency per {resolution} (s)")
+        fig.update_layout(paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)', font_color='white')
+        st.plotly_chart(fig, use_container_width=True)
+    with tab2:
+        fig = px.pie(values=list(totals["sources"].values()), names=list(totals["sources"].keys()), title="Response Source Mix")
+        fig.update_layout(paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)', font_color='white')
+        st.plotly_chart(fig, use_container_width=True)
+    with tab3:
+        fig = px.bar(x=list(totals["intents"].keys()), y=list(totals["intents"].values()), title="Intent Mix")
+        fig.update_layout(paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)', font_color='white')
+        st.plotly_chart(fig, use_container_width=True)
+        fig = px.pie(values=list(totals["sentiments"].values()), names=list(totals["sentiments"].keys()), title="Sentiment Mix")
+        fig.update_layout(paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)', font_color='white')
+        st.plotly_chart(fig, use_container_width=True)
+    
+    # Estimated from sketches: distinct users (HyperLogLog) and top unanswered queries (Space-Saving)
+    sketch_report = engine.sketches(days=7, top=20)
+    st.markdown("#### 👥 Users & Unanswered Questions (last 7 days)")
+    st.metric("Distinct Users (est.)", sketch_report["users_total"])
+    fig = px.bar(x=[entry["day"] for entry in sketch_report["users_per_day"]],
+                 y=[entry["users"] for entry in sketch_report["users_per_day"]],
+                 title="Distinct users per day")
+    fig.update_layout(paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)', font_color='white')
+    st.plotly_chart(fig, use_container_width=True)
+    if sketch_report["top_fallthrough"]:
+        st.caption("Most frequent questions answered by ChatGPT or the fallback - candidates for new canned answers")
+        st.dataframe(sketch_report["top_fallthrough"], use_container_width=True)
 
 # ---------- INTEGRATION CAPABILITIES ----------
 def create_support_ticket(user_message, sentiment, intent):
     """Create support ticket for escalation"""
-    ticket_data = {
-        "timestamp": datetime.now().isoformat(),
-        "user_message": user_message,
-        "sentiment": sentiment,
-        "intent": intent,
-        "priority": "high" if sentiment == "negative" else "medium",
-        "status": "open"
-    }
-    
-    # In a real implementation, this would save to a database
-    # For now, we'll store in session state
-    if "support_tickets" not in st.session_state:
-        st.session_state.support_tickets = []
-    
-    st.session_state.support_tickets.append(ticket_data)
-    return len(st.session_state.support_tickets)
+    # The engine's ticket store queues the write, so this returns without touching the disk
+    ticket = engine.create_ticket(st.session_state.session_id, user_message, sentiment, intent, channel="web")
+    return ticket["ticket_id"], ticket["duplicate"]
 
 def export_conversation_data():
     """Export comprehensive conversation data"""
@@ -919,7 +570,7 @@ def export_conversation_data():
         "messages": st.session_state.messages,
         "statistics": st.session_state.stats,
         "analytics": generate_analytics_report(),
-        "support_tickets": st.session_state.get("support_tickets", [])
+        "support_tickets": engine.tickets(user_id=st.session_state.session_id)["tickets"]
     }
     
     return json.dumps(export_data, indent=2, ensure_ascii=False)
@@ -939,8 +590,6 @@ def create_performance_monitor():
 
 # ---------- MAIN APP INTERFACE ----------
 def main():
-    global openai_quota_exceeded
-    
     # Welcome Header
     st.markdown("""
     <div class="welcome-header">
@@ -997,6 +646,9 @@ def main():
         # Initialize session state
         if "messages" not in st.session_state:
             st.session_state.messages = []
+        if "session_id" not in st.session_state:
+            # Per-browser id: Dialogflow context and OpenAI rate limits are tracked per user
+            st.session_state.session_id = f"web-{uuid.uuid4().hex[:12]}"
         if "stats" not in st.session_state:
             st.session_state.stats = {
                 "total_messages": 0,
@@ -1016,44 +668,47 @@ def main():
         user_input = st.chat_input("Ask me anything...")
 
         if user_input:
-            # Analyze user input
-            sentiment, sentiment_score = analyze_sentiment(user_input)
-            intent_keywords = extract_intent_keywords(user_input)
-            detected_language = detect_language(user_input)
-            
-            # Add user message with metadata
+            # Add user message; analysis metadata is filled in once the stages finish
             user_message_data = {
                 "role": "user", 
                 "content": user_input,
-                "sentiment": sentiment,
-                "sentiment_score": sentiment_score,
-                "intent_keywords": intent_keywords,
-                "language": detected_language,
                 "timestamp": datetime.now().isoformat()
             }
             st.session_state.messages.append(user_message_data)
             st.session_state.stats["total_messages"] += 1
+            conversation_history = st.session_state.messages[-10:] if len(st.session_state.messages) > 10 else st.session_state.messages
+            
+            # Analysis stages and the backend call are independent - run them side by side
+            stage_run = get_stage_executor().start(wrap=run_with_script_context)
+            stage_run.submit("sentiment", analyze_sentiment, user_input)
+            stage_run.submit("intent", extract_intent_keywords, user_input)
+            stage_run.submit("language", detect_language, user_input)
+            stage_run.submit("response", engine.respond, user_input, list(conversation_history), st.session_state.session_id)
             
-            with st.chat_message("user"):
-                st.markdown(user_input)
-                # Show sentiment indicator
-                if sentiment != "neutral":
-                    sentiment_emoji = "😊" if sentiment == "positive" else "😔"
-                    st.caption(f"{sentiment_emoji} {sentiment.title()} sentiment")
+            user_chat = st.chat_message("user")
+            user_chat.markdown(user_input)
             
             # Show typing indicator
             with st.chat_message("assistant"):
                 with st.spinner("🤖 Thinking..."):
-                    start_time = datetime.now()
-                    time.sleep(0.5)  # Simulate thinking time
+                    time.sleep(0.5)  # Simulate thinking time (overlaps with the stages above)
                     
-                    # Use enhanced response logic with smart fallback
-                    conversation_history = st.session_state.messages[-10:] if len(st.session_state.messages) > 10 else st.session_state.messages
-                    final_response = get_response_with_smart_fallback(user_input, conversation_history)
+                    stage_results = stage_run.join()
+                    sentiment, sentiment_score = stage_results["sentiment"]
+                    intent_keywords = stage_results["intent"]
+                    final_response = stage_results["response"]
+                    user_message_data.update({
+                        "sentiment": sentiment,
+                        "sentiment_score": sentiment_score,
+                        "intent_keywords": intent_keywords,
+                        "language": stage_results["language"]
+                    })
                     
-                    # Calculate response time
-                    end_time = datetime.now()
-                    response_time = calculate_response_time(start_time, end_time)
+                    # Response time covers the stages only, not the simulated thinking pause
+                    response_time = round(stage_run.timings["total"], 2)
+                    for stage in ("sentiment", "intent", "language"):
+                        observe("analysis", stage_run.timings[stage], stage)
+                    observe("web_request", stage_run.timings["total"], final_response["source"])
                     
                     # Update statistics based on response source
                     if final_response["source"] == "dialogflow":
@@ -1065,8 +720,11 @@ def main():
                     
                     # Create support ticket if negative sentiment
                     if sentiment == "negative":
-                        ticket_id = create_support_ticket(user_input, sentiment, intent_keywords)
-                        final_response["response"] += f"\n\n⚠️ **Support ticket #{ticket_id} created** - A human agent will contact you soon."
+                        ticket_id, duplicate = create_support_ticket(user_input, sentiment, intent_keywords)
+                        if duplicate:
+                            final_response["response"] += f"\n\n⚠️ **Added to support ticket #{ticket_id}** - A human agent will contact you soon."
+                        else:
+                            final_response["response"] += f"\n\n⚠️ **Support ticket #{ticket_id} created** - A human agent will contact you soon."
                     
                     # Add assistant response with metadata
                     assistant_message_data = {
@@ -1074,13 +732,19 @@ def main():
                         "content": final_response["response"],
                         "source": final_response["source"],
                         "response_time": response_time,
+                        "stage_timings": dict(stage_run.timings),
                         "timestamp": datetime.now().isoformat()
                     }
                     st.session_state.messages.append(assistant_message_data)
                     
                     st.markdown(final_response["response"])
                     st.markdown(f'<span class="ai-badge">{final_response["source"].upper()}</span>', unsafe_allow_html=True)
-                    st.caption(f"⏱️ Response time: {response_time}s")
+                    st.caption(f"⏱️ Response time: {response_time}s ({format_timings(stage_run.timings)})")
+            
+            # Show sentiment indicator
+            if sentiment != "neutral":
+                sentiment_emoji = "😊" if sentiment == "positive" else "😔"
+                user_chat.caption(f"{sentiment_emoji} {sentiment.title()} sentiment")
         
         st.markdown('</div>', unsafe_allow_html=True)
         
@@ -1122,49 +786,33 @@ def main():
     with col1:
         if st.button("📞 Contact Support", key="contact"):
             st.session_state.messages.append({"role": "user", "content": "I need to contact support"})
-            response = get_smart_response("contact support")
-            if response:
-                st.session_state.messages.append({"role": "assistant", "content": response["response"], "source": response["source"]})
-            else:
-                # Fallback to ChatGPT
-                chatgpt_response = ask_openai("I need to contact support")
-                st.session_state.messages.append({"role": "assistant", "content": chatgpt_response["response"], "source": chatgpt_response["source"]})
+            # Canned answer if there is one, else ChatGPT
+            response = engine.quick_action("contact support", "I need to contact support", user_id=st.session_state.session_id)
+            st.session_state.messages.append({"role": "assistant", "content": response["response"], "source": response["source"]})
             st.rerun()
     
     with col2:
         if st.button("📦 Order Status", key="order"):
             st.session_state.messages.append({"role": "user", "content": "Where is my order?"})
-            response = get_smart_response("order status")
-            if response:
-                st.session_state.messages.append({"role": "assistant", "content": response["response"], "source": response["source"]})
-            else:
-                # Fallback to ChatGPT
-                chatgpt_response = ask_openai("Where is my order?")
-                st.session_state.messages.append({"role": "assistant", "content": chatgpt_response["response"], "source": chatgpt_response["source"]})
+            # Canned answer if there is one, else ChatGPT
+            response = engine.quick_action("order status", "Where is my order?", user_id=st.session_state.session_id)
+            st.session_state.messages.append({"role": "assistant", "content": response["response"], "source": response["source"]})
             st.rerun()
     
     with col3:
         if st.button("🔄 Returns", key="returns"):
             st.session_state.messages.append({"role": "user", "content": "I want to return something"})
-            response = get_smart_response("return refund")
-            if response:
-                st.session_state.messages.append({"role": "assistant", "content": response["response"], "source": response["source"]})
-            else:
-                # Fallback to ChatGPT
-                chatgpt_response = ask_openai("I want to return something")
-                st.session_state.messages.append({"role": "assistant", "content": chatgpt_response["response"], "source": chatgpt_response["source"]})
+            # Canned answer if there is one, else ChatGPT
+            response = engine.quick_action("return refund", "I want to return something", user_id=st.session_state.session_id)
+            st.session_state.messages.append({"role": "assistant", "content": response["response"], "source": response["source"]})
             st.rerun()
     
     with col4:
         if st.button("⏰ Business Hours", key="hours"):
             st.session_state.messages.append({"role": "user", "content": "What are your business hours?"})
-            response = get_smart_response("business hours")
-            if response:
-                st.session_state.messages.append({"role": "assistant", "content": response["response"], "source": response["source"]})
-            else:
-                # Fallback to ChatGPT
-                chatgpt_response = ask_openai("What are your business hours?")
-                st.session_state.messages.append({"role": "assistant", "content": chatgpt_response["response"], "source": chatgpt_response["source"]})
+            # Canned answer if there is one, else ChatGPT
+            response = engine.quick_action("business hours", "What are your business hours?", user_id=st.session_state.session_id)
+            st.session_state.messages.append({"role": "assistant", "content": response["response"], "source": response["source"]})
             st.rerun()
     
     # Test ChatGPT Responses
@@ -1180,28 +828,29 @@ def main():
     with col1:
         if st.button("🎭 Tell me a joke", key="joke"):
             st.session_state.messages.append({"role": "user", "content": "Tell me a joke"})
-            chatgpt_response = ask_openai("Tell me a funny joke")
+            # Same prompts as cache_warmup.TEST_PROMPTS, so startup warm-up serves them from the cache
+            chatgpt_response = engine.ask("Tell me a funny joke", user_id=st.session_state.session_id)
             st.session_state.messages.append({"role": "assistant", "content": chatgpt_response["response"], "source": chatgpt_response["source"]})
             st.rerun()
     
     with col2:
         if st.button("🌤️ Weather", key="weather"):
             st.session_state.messages.append({"role": "user", "content": "What's the weather like?"})
-            chatgpt_response = ask_openai("What's the weather like today?")
+            chatgpt_response = engine.ask("What's the weather like today?", user_id=st.session_state.session_id)
             st.session_state.messages.append({"role": "assistant", "content": chatgpt_response["response"], "source": chatgpt_response["source"]})
             st.rerun()
     
     with col3:
         if st.button("🍕 Pizza recipe", key="recipe"):
             st.session_state.messages.append({"role": "user", "content": "How do I make pizza?"})
-            chatgpt_response = ask_openai("How do I make homemade pizza?")
+            chatgpt_response = engine.ask("How do I make homemade pizza?", user_id=st.session_state.session_id)
             st.session_state.messages.append({"role": "assistant", "content": chatgpt_response["response"], "source": chatgpt_response["source"]})
             st.rerun()
     
     with col4:
         if st.button("💭 Philosophy", key="philosophy"):
             st.session_state.messages.append({"role": "user", "content": "What's the meaning of life?"})
-            chatgpt_response = ask_openai("What's the meaning of life?")
+            chatgpt_response = engine.ask("What's the meaning of life?", user_id=st.session_state.session_id)
             st.session_state.messages.append({"role": "assistant", "content": chatgpt_response["response"], "source": chatgpt_response["source"]})
             st.rerun()
     
@@ -1249,6 +898,9 @@ def main():
     # Advanced Analytics Dashboard
     create_analytics_dashboard()
     
+    # Global rollups: every user and channel, no transcript scans
+    create_global_dashboard()
+    
     # Footer with Developer Info
     st.markdown("""
     <div class="footer-info" style="text-align: center; margin: 40px 0 20px 0; padding: 20px; background: linear-gradient(135deg, rgba(102,126,234,0.1) 0%, rgba(118,75,162,0.1) 100%); border-radius: 15px;">
@@ -1263,7 +915,7 @@ def main():
     """, unsafe_allow_html=True)
 
     # Telegram Messages Section
-    if "telegram_bot_running" in st.session_state and st.session_state.telegram_bot_running:
+    if get_telegram_supervisor().is_running:
         st.markdown("""
         <div class="quick-actions">
             <h3>📱 Telegram Messages</h3>
@@ -1271,45 +923,58 @@ def main():
         </div>
         """, unsafe_allow_html=True)
         
-        # Initialize telegram messages in session state
-        if "telegram_messages" not in st.session_state:
-            st.session_state.telegram_messages = []
-        
-        # Display telegram messages
-        if st.session_state.telegram_messages:
-            # Show messages in reverse order (newest first)
-            for msg in reversed(st.session_state.telegram_messages[-10:]):  # Show last 10 messages
-                with st.chat_message("user" if msg["type"] == "incoming" else "assistant"):
-                    if msg["type"] == "incoming":
-                        st.markdown(f"**📱 User {msg['chat_id']}**: {msg['text']}")
-                    else:
-                        st.markdown(f"**🤖 Bot Response**: {msg['text']}")
-                        st.markdown(f'<span class="ai-badge">TELEGRAM</span>', unsafe_allow_html=True)
-                    
-                    # Show timestamp
-                    if "timestamp" in msg:
-                        timestamp = datetime.fromisoformat(msg["timestamp"]).strftime("%H:%M:%S")
-                        st.caption(f"⏰ {timestamp}")
-        else:
-            st.info("""
-            📱 **No Telegram messages yet!**
-            
-            To test your bot:
-            1. Click the Telegram link in the sidebar
-            2. Send a message like "Hello" or "I need help"
-            3. Watch the response appear here in real-time
-            """)
-        
-        # Clear telegram messages
-        col1, col2 = st.columns(2)
-        with col1:
-            if st.button("🗑️ Clear Messages", key="clear_telegram"):
-                st.session_state.telegram_messages = []
-                st.rerun()
+        render_telegram_messages()
+
+@periodic_fragment(run_every=TELEGRAM_PANEL_REFRESH_SECONDS)
+def render_telegram_messages():
+    """Telegram panel; re-runs on its own and drains only events this session has not seen"""
+    if "telegram_messages" not in st.session_state:
+        st.session_state.telegram_messages = []
+    if "telegram_last_seq" not in st.session_state:
+        st.session_state.telegram_last_seq = 0
+    
+    events, last_seq = get_telegram_event_bus().since(st.session_state.telegram_last_seq)
+    st.session_state.telegram_last_seq = last_seq
+    if events:
+        st.session_state.telegram_messages = (st.session_state.telegram_messages + events)[-TELEGRAM_PANEL_SIZE:]
+    
+    # Display telegram messages
+    if st.session_state.telegram_messages:
+        # Show messages in reverse order (newest first)
+        for msg in reversed(st.session_state.telegram_messages):
+            with st.chat_message("user" if msg["type"] == "incoming" else "assistant"):
+                if msg["type"] == "incoming":
+                    st.markdown(f"**📱 User {msg['chat_id']}**: {msg['text']}")
+                else:
+                    st.markdown(f"**🤖 Bot Response**: {msg['text']}")
+                    st.markdown(f'<span class="ai-badge">TELEGRAM</span>', unsafe_allow_html=True)
+                
+                # Show timestamp
+                if "timestamp" in msg:
+                    timestamp = datetime.fromisoformat(msg["timestamp"]).strftime("%H:%M:%S")
+                    st.caption(f"⏰ {timestamp}")
+    else:
+        st.info("""
+        📱 **No Telegram messages yet!**
         
-        with col2:
-            if st.button("🔄 Refresh", key="refresh_telegram"):
-                st.rerun()
+        To test your bot:
+        1. Click the Telegram link in the sidebar
+        2. Send a message like "Hello" or "I need help"
+        3. Watch the response appear here in real-time
+        """)
+    
+    # Clear telegram messages
+    col1, col2 = st.columns(2)
+    with col1:
+        if st.button("🗑️ Clear Messages", key="clear_telegram"):
+            st.session_state.telegram_messages = []
+            st.rerun()
+    
+    with col2:
+        if st.button("🔄 Refresh", key="refresh_telegram"):
+            st.rerun()
+
+get_metrics_server()
 
 # ---------- SIDEBAR ----------
 with st.sidebar:
@@ -1319,6 +984,9 @@ with st.sidebar:
     </div>
     """, unsafe_allow_html=True)
     
+    # Pipeline stats come from the response engine (in-process or the engine service)
+    engine_stats = engine.stats()
+    
     # Clear chat
     if st.button("🗑️ Clear Chat", key="clear"):
         st.session_state.messages = []
@@ -1348,12 +1016,16 @@ with st.sidebar:
     
     with col2:
         if st.button("📋 Support Tickets", key="view_tickets"):
-            if "support_tickets" in st.session_state and st.session_state.support_tickets:
-                st.success(f"📋 {len(st.session_state.support_tickets)} support tickets created")
-                for i, ticket in enumerate(st.session_state.support_tickets[-3:], 1):
-                    st.info(f"Ticket #{i}: {ticket['user_message'][:50]}... ({ticket['sentiment']})")
+            ticket_data = engine.tickets(status="open", limit=3)
+            open_count = ticket_data["counts"]["status"].get("open", 0)
+            if open_count:
+                high_count = ticket_data["counts"]["priority"].get("high", 0)
+                st.success(f"📋 {open_count} open support tickets ({high_count} high priority)")
+                for ticket in ticket_data["tickets"]:
+                    st.info(f"Ticket #{ticket['ticket_id']} ({ticket['channel']}, {ticket['messages']} messages): "
+                            f"{ticket['user_message'][:50]}... ({ticket['sentiment']})")
             else:
-                st.info("No support tickets created yet.")
+                st.info("No open support tickets.")
     
     # Integration Status
     st.markdown("### 🔗 Integration Status")
@@ -1406,45 +1078,63 @@ with st.sidebar:
         4. Watch messages appear here in real-time
         """)
         
-        # Bot controls
+        # Bot controls - one poller per server process, shared by every session
+        telegram_supervisor = get_telegram_supervisor()
         col1, col2 = st.columns(2)
         
         with col1:
             if st.button("🚀 Start Bot", key="start_bot"):
-                if "telegram_bot_running" not in st.session_state:
-                    st.session_state.telegram_bot_running = True
-                    start_telegram_bot()
+                if telegram_supervisor.start():
                     st.success("✅ Telegram bot started and listening!")
                 else:
                     st.info("Bot is already running!")
         
         with col2:
             if st.button("⏹️ Stop Bot", key="stop_bot"):
-                if "telegram_bot_running" in st.session_state:
-                    st.session_state.telegram_bot_running = False
-                    st.success("⏹️ Telegram bot stopped!")
+                if telegram_supervisor.is_running:
+                    with st.spinner("Waiting for the current poll to finish..."):
+                        stopped = telegram_supervisor.stop()
+                    if stopped:
+                        st.success("⏹️ Telegram bot stopped!")
+                    else:
+                        st.warning("Stop requested - the poller will exit after the current batch")
                 else:
                     st.info("Bot is not running!")
         
         # Bot status
-        if "telegram_bot_running" in st.session_state and st.session_state.telegram_bot_running:
+        health = telegram_supervisor.get_health()
+        if health["running"]:
             st.markdown("🟢 **Bot Status: Running**")
             st.markdown("📱 Listening for messages...")
-            st.markdown("💡 Send a message to @{bot_username} to test!")
+            st.markdown(f"💡 Send a message to @{bot_username} to test!")
         else:
             st.markdown("🔴 **Bot Status: Stopped**")
             st.markdown("Click 'Start Bot' to begin listening")
         
-        # Check for updates
+        # Conversation memory
+        memory_stats = engine_stats["telegram_memory"]
+        st.markdown(f"**Chat memory:** {memory_stats['chats']} chats, {memory_stats['turns']} turns, {memory_stats['total_chars'] // 1000}k chars")
+        st.markdown(f"**Evictions:** {memory_stats['lru_evictions']} LRU • {memory_stats['ttl_evictions']} idle • {memory_stats['restored']} restored")
+        
+        # Poller health
+        st.markdown(f"**Updates/s:** {health['updates_per_second']} ({health['updates_total']} total)")
+        st.markdown(f"**Loop lag:** {health['loop_lag']}s • **Queue depth:** {health['queue_depth']}")
+        if health["last_error"]:
+            st.markdown(f"**Last error:** {health['last_error']} ({health['last_error_at']})")
+        
+        # Check for updates (peek only - never competes with a running poller)
         if st.button("🔄 Check Updates", key="check_updates"):
-            updates = get_telegram_updates()
-            if updates and updates.get("ok"):
-                update_count = len(updates.get("result", []))
-                st.success(f"✅ Connected - {update_count} updates available")
-                if update_count > 0:
-                    st.info("📱 Messages detected! Check the Telegram Messages section below.")
+            if health["running"]:
+                st.success(f"✅ Poller running - {health['updates_total']} updates handled")
             else:
-                st.error("❌ Connection failed")
+                updates = get_telegram_updates(offset=telegram_supervisor.offset + 1, timeout=0)
+                if updates and updates.get("ok"):
+                    update_count = len(updates.get("result", []))
+                    st.success(f"✅ Connected - {update_count} updates available")
+                    if update_count > 0:
+                        st.info("📱 Messages detected! Start the bot to answer them.")
+                else:
+                    st.error("❌ Connection failed")
     
     else:
         st.markdown("🔴 **Not Connected**")
@@ -1458,16 +1148,106 @@ with st.sidebar:
     
     # AI Services Status
     st.markdown("### 🤖 AI Services")
-    if openai_quota_exceeded:
+    if engine_stats["openai_quota_exceeded"]:
         st.markdown("🔴 OpenAI: Quota Exceeded")
     else:
         st.markdown("🟢 OpenAI: Available")
     st.markdown("🟢 Dialogflow: Available")
     st.markdown("🟢 Smart Responses: Available")
     
+    # Shared across every session and process
+    st.markdown("### 🌐 All Sessions")
+    global_stats = engine_stats["global"]
+    st.markdown(f"**Messages:** {global_stats['total_messages']}")
+    st.markdown(f"**Dialogflow:** {global_stats['dialogflow_responses']} • **ChatGPT:** {global_stats['chatgpt_responses']} • **Knowledge base:** {global_stats['knowledge_base_responses']} • **Fallback:** {global_stats['fallback_responses']}")
+    cache_stats = engine_stats["openai_cache"]
+    st.markdown(f"**ChatGPT cache:** {cache_stats['hits']} hits / {cache_stats['misses']} misses ({cache_stats['hit_rate']:.0%})")
+    warmup_stats = engine_stats["warmup"]
+    if warmup_stats:
+        st.markdown(f"**Warm-up:** {warmup_stats['status']} • {warmup_stats['warmed']} warmed / {warmup_stats['prompts']} prompts • {warmup_stats['tokens']} tokens in {warmup_stats['seconds']}s")
+    ticket_stats = engine_stats["tickets"]
+    st.markdown(f"**Tickets:** {ticket_stats['created']} created • {ticket_stats['deduplicated']} deduplicated • {ticket_stats['queued']} queued")
+    
+    # Knowledge base retrieval tier
+    st.markdown("### 📚 Knowledge Base")
+    kb_stats = engine_stats["knowledge_base"]
+    if kb_stats:
+        st.markdown(f"**Passages:** {kb_stats['passages']} • **Terms:** {kb_stats['terms']} ({kb_stats['loaded_from']} in {kb_stats['load_seconds']}s)")
+        st.markdown(f"**Answered:** {kb_stats['hits']} / {kb_stats['queries']} lookups ({kb_stats['hit_rate']:.0%})")
+    else:
+        st.markdown("**Index:** loading...")
+    
+    # Response deadline budget
+    st.markdown("### ⏱️ Response Deadline")
+    deadline_stats = engine_stats["deadline"]
+    st.markdown(f"**Budget:** {deadline_stats['budget_seconds']}s per message")
+    st.markdown(f"**Out of budget:** {deadline_stats['exhausted']} / {deadline_stats['requests']} requests")
+    for stage, count in sorted(deadline_stats["exhausted_by_stage"].items()):
+        st.markdown(f"• {stage}: {count}")
+    
+    # Generic Dialogflow replies
+    st.markdown("### 🧹 Generic Reply Filter")
+    generic_stats = engine_stats["generic_filter"]
+    st.markdown(f"**Discarded:** {generic_stats['generic']} / {generic_stats['checked']} Dialogflow answers ({generic_stats['discard_rate']:.0%})")
+    st.markdown(f"**Short-circuited:** {generic_stats['fallback_intent']} fallback intent • {generic_stats['learned_intent']} learned intents ({generic_stats['learned_intents']})")
+    
+    # Hot-reloaded intents, smart responses and generic phrases
+    st.markdown("### 🗂️ Response Config")
+    config_stats = engine_stats["response_config"]
+    st.markdown(f"**Source:** {config_stats['source']} (loaded {config_stats['loaded_at']})")
+    st.markdown(f"**Rules:** {config_stats['intents']} intents • {config_stats['smart_responses']} smart responses • {config_stats['generic_phrases']} generic phrases")
+    if config_stats["last_error"]:
+        st.warning(f"Rejected config ({config_stats['rejected']}x, last {config_stats['last_error_at']}): {config_stats['last_error']}")
+    
+    # Request coalescing
+    st.markdown("### 🔗 Request Coalescing")
+    for group, flight_stats in engine_stats["singleflight"].items():
+        st.markdown(f"**{group.title()}:** {flight_stats['coalesced']} coalesced / {flight_stats['calls']} calls")
+    
+    # Admission control
+    st.markdown("### 🚦 Admission Control")
+    admission_stats = engine_stats["admission"]
+    st.markdown(f"**ChatGPT slots:** {admission_stats['in_flight']} busy • {admission_stats['queue_depth']} queued")
+    st.markdown(f"**Queue wait:** p50 {admission_stats['queue_wait_p50']:.2f}s • p95 {admission_stats['queue_wait_p95']:.2f}s")
+    st.markdown(f"**Shed:** {admission_stats['shed']} / {admission_stats['requests']} ({admission_stats['shed_rate']:.0%})")
+    
+    # Per-user OpenAI usage (today, all sessions and chats)
+    st.markdown("### 💳 OpenAI Usage Today")
+    usage = engine_stats["openai_usage"]
+    st.markdown(f"**Users:** {usage['users']} • **Requests:** {usage['requests']} • **Tokens:** {usage['tokens']}")
+    if usage["limited"]:
+        st.markdown("**Rate limited:** " + " • ".join(f"{reason.replace('_', ' ')} {count}" for reason, count in sorted(usage["limited"].items())))
+    for user in usage["top_users"][:5]:
+        st.markdown(f"• {user['user']}: {user['tokens']} tokens ({user['tokens'] / usage['daily_token_budget']:.0%} of budget), {user['requests']} requests")
+    
+    # ChatGPT routing by prompt complexity
+    if engine_stats["routes"]:
+        st.markdown("### 🧭 ChatGPT Routes")
+        for route, route_stats in sorted(engine_stats["routes"].items()):
+            st.markdown(f"**{route.title()}:** {route_stats['calls']} calls • p50 {route_stats['latency_p50']:.2f}s • p95 {route_stats['latency_p95']:.2f}s • {route_stats['avg_tokens']} tokens/call")
+    
+    # Per-stage latency (engine spans plus this process's own, e.g. analysis and Telegram send)
+    latency = dict(engine_stats["latency"])
+    latency.update(tracer.get_stats())
+    if latency:
+        st.markdown("### ⏱️ Stage Latency")
+        for stage, by_source in sorted(latency.items()):
+            for source, stage_stats in sorted(by_source.items()):
+                st.markdown(f"**{stage}** ({source}): p50 {stage_stats['p50']:.3f}s • p95 {stage_stats['p95']:.3f}s • p99 {stage_stats['p99']:.3f}s • n={stage_stats['count']}")
+        st.caption(f"Prometheus metrics: http://localhost:{METRICS_PORT}/metrics")
+    
+    # Hedged dispatch
+    hedge_stats = engine_stats["hedge"]
+    if hedge_stats:
+        st.markdown("### 🏁 Hedged Dispatch")
+        st.markdown(f"**Hedges:** {hedge_stats['hedges_launched']} launched, {hedge_stats['hedges_skipped']} skipped (cap)")
+        st.markdown(f"**Winners:** Dialogflow {hedge_stats['primary_wins']} • ChatGPT {hedge_stats['secondary_wins']}")
+        st.markdown(f"**Latency saved:** p50 {hedge_stats['latency_saved_p50']:.2f}s • p95 {hedge_stats['latency_saved_p95']:.2f}s")
+        st.markdown(f"**Extra tokens:** {hedge_stats['wasted_tokens']} total, {hedge_stats['wasted_tokens_last_hour']} last hour")
+    
     # Quota Reset (for testing)
     if st.button("🔄 Reset OpenAI Quota Flag", key="reset_quota"):
-        openai_quota_exceeded = False
+        engine.reset_quota()
         st.success("OpenAI quota flag reset!")
         st.rerun()
 
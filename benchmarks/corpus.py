@@ -0,0 +1,95 @@
+"""
+Deterministic synthetic corpora for benchmarks and simulations
+The same seed and size always produce the same messages, so timings and hit rates are
+comparable between runs and machines.
+"""
+
+import random
+
+from generic_filter import GENERIC_PHRASES
+
+SIZE_SUFFIXES = {"k": 1_000, "m": 1_000_000}
+
+GREETINGS = ["hi", "hello", "hey there", "good morning", ""]
+OPENERS = [
+    "where is my order", "i want to return this item", "can i get a refund", "my package never arrived",
+    "what are your business hours", "how do i contact a human agent", "the app keeps crashing",
+    "how much does the premium plan cost", "i need help with my account", "tell me a joke",
+    "what's the weather like", "can you recommend a product", "i was charged twice", "thanks!",
+    "cancel my subscription", "is this item available in blue", "my password reset email never came"
+]
+DETAILS = [
+    "", "", "it has been two weeks", "order number 48213", "i am really frustrated", "this is great, thank you",
+    "please help asap", "the tracking page shows nothing", "i bought it last monday",
+    "your service is terrible", "love the product though", "i already tried restarting"
+]
+REPLIES = [
+    "Your order has shipped and should arrive within 3-5 business days.",
+    "Refunds are processed within 5-7 business days after we receive the item.",
+    "Our support team is available Monday to Friday, 8 AM to 8 PM EST.",
+    "You can reset your password from the login page.",
+    "The premium plan costs $19.99 per month."
+]
+
+
+def resolve_size(size):
+    """Number of items for a size like "100k", "1m" or 2500"""
+    size = str(size).strip().lower()
+    if size[-1:] in SIZE_SUFFIXES:
+        return int(float(size[:-1]) * SIZE_SUFFIXES[size[-1]])
+    return int(size)
+
+
+def synthetic_messages(size, seed=42):
+    """User messages mixing greetings, intents, sentiment and lengths"""
+    rng = random.Random(seed)
+    messages = []
+    for _ in range(resolve_size(size)):
+        parts = [rng.choice(GREETINGS), rng.choice(OPENERS), rng.choice(DETAILS)]
+        if rng.random() < 0.1:
+            parts.append(" ".join(rng.choice(DETAILS) for _ in range(8)))  # long, multi-part message
+        messages.append(" ".join(part for part in parts if part).strip())
+    return messages
+
+
+def synthetic_replies(size, seed=42, generic_share=0.3):
+    """Dialogflow replies, `generic_share` of them generic non-answers"""
+    rng = random.Random(seed)
+    return [
+        (rng.choice(GENERIC_PHRASES).capitalize() + ".") if rng.random() < generic_share else rng.choice(REPLIES)
+        for _ in range(resolve_size(size))
+    ]
+
+
+def synthetic_conversation(size, seed=42):
+    """Alternating user/assistant chat messages as stored in st.session_state.messages"""
+    rng = random.Random(seed)
+    conversation = []
+    for text in synthetic_messages((resolve_size(size) + 1) // 2, seed):
+        conversation.append({"role": "user", "content": text})
+        conversation.append({
+            "role": "assistant",
+            "content": rng.choice(REPLIES),
+            "source": rng.choice(["dialogflow", "dialogflow", "chatgpt", "fallback"])
+        })
+    return conversation[:resolve_size(size)]
+
+
+TOPICS = ["order", "refund", "return", "shipping", "password", "account", "billing", "subscription",
+          "warranty", "delivery", "payment", "invoice", "app", "discount", "exchange", "tracking"]
+SYLLABLES = ["ka", "lo", "mi", "ren", "tor", "vex", "qui", "dal", "sen", "por", "zu", "bri", "nal", "fey", "gor"]
+
+
+def synthetic_documents(size, seed=42, vocabulary=20_000):
+    """(question, answer) FAQ entries over support topics plus a long tail of made-up product terms"""
+    rng = random.Random(seed)
+    words = sorted({"".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))) for _ in range(vocabulary)})
+    documents = []
+    for _ in range(resolve_size(size)):
+        topic = rng.choice(TOPICS)
+        product = rng.choice(words)
+        question = f"{rng.choice(OPENERS)} {topic} {product}?"
+        answer = " ".join([f"For {product} {topic} questions:"] + [rng.choice(words) for _ in range(rng.randint(20, 60))]
+                          + [rng.choice(REPLIES)])
+        documents.append((question, answer))
+    return documents
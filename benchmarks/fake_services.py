@@ -0,0 +1,242 @@
+"""
+Local stand-ins for the Telegram Bot API, Dialogflow and OpenAI
+Each fake is a ThreadingHTTPServer with a configurable latency distribution and error
+rate, so the real clients (requests, the OpenAI SDK, the Dialogflow REST transport) can
+be load-tested without touching the real services.
+
+Latency specs:
+    fixed:0.1                    always 100ms
+    uniform:0.05,0.3             uniform between 50ms and 300ms
+    lognormal:0.2,0.5            median 200ms, sigma 0.5
+"""
+
+import json
+import math
+import random
+import re
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+
+def parse_latency(spec):
+    """Sampler for a latency spec string"""
+    kind, _, args = spec.partition(":")
+    values = [float(value) for value in args.split(",") if value]
+    if kind == "fixed":
+        return lambda: values[0]
+    if kind == "uniform":
+        return lambda: random.uniform(values[0], values[1])
+    if kind == "lognormal":
+        median, sigma = values
+        return lambda: random.lognormvariate(math.log(median), sigma)
+    raise ValueError(f"Unknown latency spec: {spec}")
+
+
+class FakeService:
+    """Shared plumbing: latency sampling, error injection and hit counters"""
+
+    name = "service"
+
+    def __init__(self, latency="fixed:0", error_rate=0.0, port=0):
+        self.sample_latency = parse_latency(latency)
+        self.error_rate = error_rate
+        self.port = port
+        self.server = None
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "errors_injected": 0}
+
+    def count(self, key, amount=1):
+        with self._lock:
+            self.stats[key] = self.stats.get(key, 0) + amount
+
+    def delay_and_maybe_fail(self):
+        """Sleep a sampled latency; True when this request should fail"""
+        self.count("requests")
+        time.sleep(max(0.0, self.sample_latency()))
+        if random.random() < self.error_rate:
+            self.count("errors_injected")
+            return True
+        return False
+
+    def handle(self, handler, method, path, payload):
+        """Return (status, response dict)"""
+        raise NotImplementedError
+
+    def start(self):
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _dispatch(self, method):
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length) if length else b""
+                content_type = self.headers.get("Content-Type", "")
+                if raw and "json" in content_type:
+                    payload = json.loads(raw)
+                elif raw:
+                    payload = {key: values[0] for key, values in parse_qs(raw.decode("utf-8")).items()}
+                else:
+                    payload = {}
+                path, _, query = self.path.partition("?")
+                payload.update({key: values[0] for key, values in parse_qs(query).items()})
+                status, body = service.handle(self, method, path, payload)
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                self._dispatch("GET")
+
+            def do_POST(self):
+                self._dispatch("POST")
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", self.port), Handler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        threading.Thread(target=self.server.serve_forever, name=f"fake-{self.name}", daemon=True).start()
+        return self
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.port}"
+
+
+class FakeOpenAI(FakeService):
+    """OpenAI-compatible POST /v1/chat/completions"""
+
+    name = "openai"
+
+    def handle(self, handler, method, path, payload):
+        if not path.endswith("/chat/completions"):
+            return 404, {"error": {"message": f"Unknown path {path}"}}
+        if self.delay_and_maybe_fail():
+            return 500, {"error": {"message": "Injected failure", "type": "server_error"}}
+        prompt = payload["messages"][-1]["content"]
+        prompt_tokens = sum(len(message["content"].split()) for message in payload["messages"])
+        completion_tokens = min(payload.get("max_tokens") or 300, 40 + len(prompt.split()))
+        self.count("tokens", prompt_tokens + completion_tokens)
+        return 200, {
+            "id": "chatcmpl-loadtest",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": payload.get("model", "gpt-3.5-turbo"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": f"Here is some help with: {prompt[:80]}"},
+                "finish_reason": "stop"
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens
+            }
+        }
+
+
+class FakeDialogflow(FakeService):
+    """Dialogflow v2 REST detectIntent; matches a share of messages by keyword"""
+
+    name = "dialogflow"
+    INTENTS = {
+        "order": "You can track your order from the Orders page using your order number.",
+        "refund": "Refunds are processed within 5-7 business days after we receive the item.",
+        "password": "You can reset your password from the login page via 'Forgot password'.",
+        "shipping": "Standard shipping takes 3-5 business days."
+    }
+
+    def __init__(self, generic_rate=0.1, **kwargs):
+        super().__init__(**kwargs)
+        self.generic_rate = generic_rate
+
+    def handle(self, handler, method, path, payload):
+        if not path.endswith(":detectIntent"):
+            return 404, {"error": {"code": 404, "message": f"Unknown path {path}"}}
+        if self.delay_and_maybe_fail():
+            return 503, {"error": {"code": 503, "message": "Injected failure", "status": "UNAVAILABLE"}}
+        text = payload.get("queryInput", {}).get("text", {}).get("text", "").lower()
+        for keyword, answer in self.INTENTS.items():
+            if re.search(rf"\b{keyword}", text):
+                if random.random() < self.generic_rate:
+                    break
+                self.count("matched")
+                return 200, {"queryResult": {
+                    "fulfillmentText": answer,
+                    "intentDetectionConfidence": 0.9,
+                    "intent": {"name": f"projects/loadtest/agent/intents/{keyword}", "isFallback": False}
+                }}
+        self.count("fallback")
+        return 200, {"queryResult": {
+            "fulfillmentText": "Sorry, I didn't get that. Can you rephrase?",
+            "intentDetectionConfidence": 0.3,
+            "intent": {"name": "projects/loadtest/agent/intents/fallback", "isFallback": True}
+        }}
+
+
+class FakeTelegram(FakeService):
+    """Telegram Bot API: getMe, long-polling getUpdates and sendMessage"""
+
+    name = "telegram"
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._updates = deque()
+        self._next_update_id = 1
+        self._cond = threading.Condition()
+        self.enqueued_at = {}  # chat id -> time the update was offered
+        self.latencies = []
+
+    def push_message(self, chat_id, text):
+        """Offer one incoming user message to the bot"""
+        with self._cond:
+            update = {
+                "update_id": self._next_update_id,
+                "message": {"message_id": self._next_update_id, "chat": {"id": chat_id, "type": "private"},
+                            "from": {"id": chat_id}, "date": int(time.time()), "text": text}
+            }
+            self._next_update_id += 1
+            self._updates.append(update)
+            self.enqueued_at[chat_id] = time.monotonic()
+            self._cond.notify_all()
+
+    def handle(self, handler, method, path, payload):
+        api_method = path.rsplit("/", 1)[-1]
+        if api_method == "getMe":
+            return 200, {"ok": True, "result": {"id": 1, "is_bot": True, "username": "loadtest_bot", "first_name": "Load Test"}}
+        if api_method == "getUpdates":
+            return 200, {"ok": True, "result": self._get_updates(int(payload.get("offset", 0)), float(payload.get("timeout", 0)))}
+        if api_method == "sendMessage":
+            if self.delay_and_maybe_fail():
+                return 500, {"ok": False, "description": "Injected failure"}
+            chat_id = int(payload["chat_id"])
+            with self._lock:
+                started = self.enqueued_at.pop(chat_id, None)
+                if started is not None:
+                    self.latencies.append(time.monotonic() - started)
+            self.count("sent")
+            return 200, {"ok": True, "result": {"message_id": 1, "chat": {"id": chat_id}, "text": payload.get("text")}}
+        return 404, {"ok": False, "description": f"Unknown method {api_method}"}
+
+    def _get_updates(self, offset, timeout):
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                while self._updates and self._updates[0]["update_id"] < offset:
+                    self._updates.popleft()  # confirmed by the offset
+                if self._updates or time.monotonic() >= deadline:
+                    return list(self._updates)[:100]
+                self._cond.wait(deadline - time.monotonic())
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Knowledge base benchmark
+Builds a BM25 index over a synthetic FAQ corpus (100k documents by default), then times
+the build, the memory-mapped reload and query latency.
+
+Usage:
+    python -m benchmarks.knowledge_base_bench
+    python -m benchmarks.knowledge_base_bench --documents 1m --queries 20000 --json kb.json
+"""
+
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+
+from benchmarks.corpus import resolve_size, synthetic_documents, synthetic_messages
+from benchmarks.load_generator import latency_summary
+from knowledge_base import KnowledgeBase, build_index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark knowledge base index build and queries")
+    parser.add_argument("--documents", default="100k", help="synthetic FAQ entries (100k, 1m or a number)")
+    parser.add_argument("--queries", type=int, default=10000)
+    parser.add_argument("--index-dir", help="where to write the index (default: a temporary directory)")
+    parser.add_argument("--json", help="write the report to this file")
+    args = parser.parse_args()
+
+    documents = synthetic_documents(resolve_size(args.documents))
+    queries = synthetic_messages(args.queries, seed=7)
+    index_dir = args.index_dir or tempfile.mkdtemp(prefix="kb-bench-")
+    try:
+        started = time.perf_counter()
+        meta = build_index(documents, index_dir)
+        build_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        knowledge_base = KnowledgeBase(index_dir)
+        if not knowledge_base.load():
+            raise RuntimeError(f"Index in {index_dir} could not be loaded")
+        load_seconds = time.perf_counter() - started
+
+        latencies = []
+        for query in queries:
+            started = time.perf_counter()
+            knowledge_base.answer(query)
+            latencies.append(time.perf_counter() - started)
+        index_bytes = sum(os.path.getsize(os.path.join(index_dir, name)) for name in os.listdir(index_dir))
+    finally:
+        if not args.index_dir:
+            shutil.rmtree(index_dir, ignore_errors=True)
+
+    stats = knowledge_base.get_stats()
+    report = {
+        "documents": len(documents),
+        "terms": len(meta["terms"]),
+        "postings": meta["postings"],
+        "index_bytes": index_bytes,
+        "build_seconds": round(build_seconds, 3),
+        "load_seconds": round(load_seconds, 4),
+        "queries": len(queries),
+        "hit_rate": stats["hit_rate"],
+        "query_latency": latency_summary(latencies)
+    }
+    latency = report["query_latency"]
+    print(f"📚 {report['documents']:,} documents • {report['terms']:,} terms • {report['postings']:,} postings "
+          f"• {index_bytes / 1e6:.1f} MB")
+    print(f"🏗️ Build {report['build_seconds']}s • mmap load {report['load_seconds']}s")
+    print(f"🔎 {report['queries']:,} queries: p50 {latency['p50'] * 1000:.2f}ms • p95 {latency['p95'] * 1000:.2f}ms "
+          f"• p99 {latency['p99'] * 1000:.2f}ms • hit rate {report['hit_rate']:.0%}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as output:
+            json.dump(report, output, indent=2)
+        print(f"📄 Report written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Offline load generator
+Starts the fake Telegram, Dialogflow and OpenAI services, points the real code at them
+and replays a message corpus at a target rate (open loop, so slow responses do not slow
+the offered load). Reports throughput, latency percentiles, error counts and response
+sources.
+
+Targets:
+    engine    the response engine in-process (what Streamlit and the bots call)
+    telegram  telegram_bot.py as a subprocess, end to end from update to sendMessage
+
+Usage:
+    python -m benchmarks.load_generator --target engine --rate 50 --duration 30
+    python -m benchmarks.load_generator --target telegram --rate 20 --openai-latency lognormal:0.6,0.4
+    python -m benchmarks.load_generator --corpus transcripts.jsonl --json results.json
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.fake_services import FakeDialogflow, FakeOpenAI, FakeTelegram
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_CORPUS = os.path.join(REPO_ROOT, "requests.jsonl")
+
+# Used when no corpus file is available
+SAMPLE_MESSAGES = [
+    "Hello!",
+    "Where is my order? I ordered a week ago and the tracking page shows nothing.",
+    "I want a refund for the broken headphones",
+    "What are your business hours?",
+    "How do I reset my password?",
+    "Can I speak to a human agent please",
+    "Tell me a joke",
+    "My package was damaged during shipping and I'm really upset about it",
+    "Do you ship to Canada?",
+    "thanks!"
+]
+
+
+def load_corpus(path):
+    """Messages from a .jsonl file ("text", or "title" + "body" per line) or a plain text file"""
+    if not path or not os.path.exists(path):
+        return list(SAMPLE_MESSAGES)
+    messages = []
+    with open(path, encoding="utf-8") as corpus:
+        for line in corpus:
+            line = line.strip()
+            if not line:
+                continue
+            if path.endswith(".jsonl"):
+                record = json.loads(line)
+                if "text" in record:
+                    messages.append(record["text"])
+                else:
+                    messages.extend(part for part in (record.get("title"), record.get("body")) if part)
+            else:
+                messages.append(line)
+    return messages or list(SAMPLE_MESSAGES)
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def latency_summary(samples):
+    return {
+        "count": len(samples),
+        "p50": round(percentile(samples, 50), 4),
+        "p95": round(percentile(samples, 95), 4),
+        "p99": round(percentile(samples, 99), 4),
+        "max": round(max(samples), 4) if samples else 0.0
+    }
+
+
+def fake_environment(fakes, state_dir):
+    """Environment variables that point the real clients at the fakes (and local stores at state_dir)"""
+    return {
+        "OPENAI_API_KEY": "sk-loadtest",
+        "OPENAI_BASE_URL": f"{fakes['openai'].url}/v1",
+        "DIALOGFLOW_PROJECT_ID": "loadtest",
+        "DIALOGFLOW_API_ENDPOINT": fakes["dialogflow"].url,
+        "GOOGLE_APPLICATION_CREDENTIALS_PATH": os.devnull,
+        "TELEGRAM_BOT_TOKEN": "loadtest",
+        "TELEGRAM_API_BASE": fakes["telegram"].url,
+        "SHARED_STATE_URL": "memory://",
+        # Synthetic tickets, users and histories must not land in the real databases
+        "TICKET_DB": os.path.join(state_dir, "tickets.db"),
+        "SKETCH_DB": os.path.join(state_dir, "sketches.db"),
+        "CHAT_MEMORY_SPILL_DB": os.path.join(state_dir, "conversations.db"),
+        "CACHE_WARMUP": "false",
+        # Load tests measure the pipeline, not the per-user limits
+        "OPENAI_USER_REQUESTS_PER_MINUTE": "1000000",
+        "OPENAI_USER_TOKENS_PER_MINUTE": "1000000000",
+        "OPENAI_USER_DAILY_REQUEST_BUDGET": "1000000000",
+        "OPENAI_USER_DAILY_TOKEN_BUDGET": "1000000000"
+    }
+
+
+def paced(messages, rate, duration):
+    """Yield (index, scheduled time, message) at `rate` per second for `duration` seconds"""
+    start = time.monotonic()
+    total = int(rate * duration)
+    for index in range(total):
+        scheduled = start + index / rate
+        delay = scheduled - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        yield index, scheduled, messages[index % len(messages)]
+
+
+def run_engine_target(messages, rate, duration, concurrency):
+    """Drive response_engine.respond in this process"""
+    import response_engine
+
+    latencies = []
+    sources = Counter()
+    errors = Counter()
+    lock = threading.Lock()
+
+    def one(index, scheduled, text):
+        try:
+            response = response_engine.respond(text, None, session_id=f"loadtest-{index}")
+            outcome, counter = response["source"], sources
+        except Exception as e:
+            outcome, counter = type(e).__name__, errors
+        with lock:
+            counter[outcome] += 1
+            # Measured from the scheduled start, so queueing behind slow calls counts
+            latencies.append(time.monotonic() - scheduled)
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for index, scheduled, text in paced(messages, rate, duration):
+            pool.submit(one, index, scheduled, text)
+    elapsed = time.monotonic() - started
+    return {
+        "completed": len(latencies),
+        "elapsed_seconds": round(elapsed, 2),
+        "throughput_per_second": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "latency": latency_summary(latencies),
+        "errors": dict(errors),
+        "sources": dict(sources),
+        "engine_stats": {key: value for key, value in response_engine.get_engine_stats().items()
+                         if key in ("admission", "openai_cache", "routes", "latency")}
+    }
+
+
+def run_telegram_target(messages, rate, duration, fakes, env, drain_seconds=30):
+    """Run telegram_bot.py against the fake Bot API and time update -> sendMessage"""
+    telegram = fakes["telegram"]
+    bot = subprocess.Popen([sys.executable, "telegram_bot.py"], cwd=REPO_ROOT, env=env,
+                           stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    try:
+        time.sleep(2)  # let the bot connect and start polling
+        if bot.poll() is not None:
+            raise RuntimeError(f"telegram_bot.py exited early: {bot.stderr.read()[-2000:]}")
+        started = time.monotonic()
+        offered = 0
+        for index, _, text in paced(messages, rate, duration):
+            telegram.push_message(index + 1, text)  # one chat per message so replies match up
+            offered += 1
+        drain_until = time.monotonic() + drain_seconds
+        while telegram.stats.get("sent", 0) < offered and time.monotonic() < drain_until:
+            time.sleep(0.1)
+        elapsed = time.monotonic() - started
+    finally:
+        bot.terminate()
+        bot.wait(timeout=10)
+    sent = telegram.stats.get("sent", 0)
+    return {
+        "offered": offered,
+        "completed": sent,
+        "unanswered": offered - sent,
+        "elapsed_seconds": round(elapsed, 2),
+        "throughput_per_second": round(sent / elapsed, 2) if elapsed else 0.0,
+        "latency": latency_summary(list(telegram.latencies)),
+        "errors": {"send_failures_injected": telegram.stats.get("errors_injected", 0)}
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline load test with fake Telegram, Dialogflow and OpenAI")
+    parser.add_argument("--target", choices=["engine", "telegram"], default="engine")
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS, help="jsonl or text file of messages")
+    parser.add_argument("--rate", type=float, default=20, help="messages per second")
+    parser.add_argument("--duration", type=float, default=10, help="seconds of offered load")
+    parser.add_argument("--concurrency", type=int, default=64, help="client threads (engine target)")
+    parser.add_argument("--openai-latency", default="lognormal:0.8,0.4")
+    parser.add_argument("--openai-error-rate", type=float, default=0.01)
+    parser.add_argument("--dialogflow-latency", default="lognormal:0.15,0.3")
+    parser.add_argument("--dialogflow-error-rate", type=float, default=0.01)
+    parser.add_argument("--dialogflow-generic-rate", type=float, default=0.1)
+    parser.add_argument("--telegram-latency", default="fixed:0.02")
+    parser.add_argument("--telegram-error-rate", type=float, default=0.0)
+    parser.add_argument("--json", help="write the report to this file")
+    args = parser.parse_args()
+
+    fakes = {
+        "openai": FakeOpenAI(latency=args.openai_latency, error_rate=args.openai_error_rate).start(),
+        "dialogflow": FakeDialogflow(latency=args.dialogflow_latency, error_rate=args.dialogflow_error_rate,
+                                     generic_rate=args.dialogflow_generic_rate).start(),
+        "telegram": FakeTelegram(latency=args.telegram_latency, error_rate=args.telegram_error_rate).start()
+    }
+    state_dir = tempfile.mkdtemp(prefix="loadtest-")
+    env = fake_environment(fakes, state_dir)
+    messages = load_corpus(args.corpus)
+    print(f"🚦 {args.target}: {len(messages)} corpus messages at {args.rate}/s for {args.duration}s")
+
+    if args.target == "engine":
+        os.environ.update(env)
+        if REPO_ROOT not in sys.path:
+            sys.path.insert(0, REPO_ROOT)
+        report = run_engine_target(messages, args.rate, args.duration, args.concurrency)
+    else:
+        report = run_telegram_target(messages, args.rate, args.duration, fakes, dict(os.environ, **env))
+
+    report["target"] = args.target
+    report["offered_rate"] = args.rate
+    report["fake_services"] = {name: dict(fake.stats) for name, fake in fakes.items()}
+    for fake in fakes.values():
+        fake.stop()
+    shutil.rmtree(state_dir, ignore_errors=True)
+
+    latency = report["latency"]
+    print(f"✅ {report['completed']} done in {report['elapsed_seconds']}s ({report['throughput_per_second']}/s)")
+    print(f"⏱️ p50 {latency['p50']}s • p95 {latency['p95']}s • p99 {latency['p99']}s • max {latency['max']}s")
+    print(f"❌ Errors: {report['errors'] or 'none'}")
+    if "sources" in report:
+        print(f"🎯 Sources: {report['sources']}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as output:
+            json.dump(report, output, indent=2)
+        print(f"📄 Report written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
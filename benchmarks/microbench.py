@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Microbenchmarks for the pure-Python hot paths
+Times smart responses, intent keywords, sentiment, the generic-reply check and the
+analytics report over deterministic synthetic corpora, compares against saved baselines
+and exits non-zero when any benchmark got slower than the allowed threshold.
+
+Usage:
+    python -m benchmarks.microbench                               # 1k and 100k corpora
+    python -m benchmarks.microbench --sizes 1k,100k,1m --json results.json
+    python -m benchmarks.microbench --save-baseline               # record this machine's baseline
+    python -m benchmarks.microbench --threshold 0.15              # fail on >15% regressions
+
+Baselines are per machine; record one before comparing and do not commit it.
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+from benchmarks.corpus import resolve_size, synthetic_conversation, synthetic_messages, synthetic_replies
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BASELINE = os.path.join(REPO_ROOT, "benchmarks", "baselines.json")
+DEFAULT_THRESHOLD = 0.2
+
+
+def _smart_response():
+    from response_config import response_config
+    config = response_config.current()
+    return synthetic_messages, lambda corpus: [config.smart_response(text) for text in corpus]
+
+
+def _intent_keywords():
+    from text_analysis import extract_intent_keywords
+    return synthetic_messages, lambda corpus: [extract_intent_keywords(text) for text in corpus]
+
+
+def _sentiment():
+    from text_analysis import analyze_sentiment
+    return synthetic_messages, lambda corpus: [analyze_sentiment(text) for text in corpus]
+
+
+def _generic_check():
+    from generic_filter import GenericReplyDetector
+
+    def run(corpus):
+        detector = GenericReplyDetector()  # fresh, so learned intents don't carry over between repeats
+        return [detector.is_generic(text) for text in corpus]
+    return synthetic_replies, run
+
+
+def _analytics_report():
+    from analytics import build_analytics_report
+    return synthetic_conversation, build_analytics_report
+
+
+# name -> loader returning (corpus builder, function running one pass over a corpus).
+# Loaders import lazily so a missing optional dependency skips one benchmark, not the suite.
+BENCHMARKS = {
+    "get_smart_response": _smart_response,
+    "extract_intent_keywords": _intent_keywords,
+    "analyze_sentiment": _sentiment,
+    "generic_reply_check": _generic_check,
+    "generate_analytics_report": _analytics_report
+}
+
+
+def time_pass(fn, corpus, repeat):
+    """Best wall time of `repeat` passes (the minimum is the least noisy estimate)"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(corpus)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run_benchmarks(names, sizes, repeat):
+    results, skipped = [], {}
+    corpora = {}
+    for name in names:
+        try:
+            build_corpus, fn = BENCHMARKS[name]()
+        except ImportError as e:
+            skipped[name] = str(e)
+            print(f"⏭️ {name}: skipped ({e})")
+            continue
+        for size in sizes:
+            count = resolve_size(size)
+            corpus = corpora.get((build_corpus, count))
+            if corpus is None:
+                corpus = corpora[(build_corpus, count)] = build_corpus(count)
+            fn(corpus[:min(count, 1000)])  # warm caches and lazy imports outside the timing
+            seconds = time_pass(fn, corpus, repeat if count < 1_000_000 else 1)
+            result = {
+                "benchmark": name,
+                "size": size,
+                "items": count,
+                "seconds": round(seconds, 6),
+                "us_per_item": round(seconds / count * 1e6, 3),
+                "items_per_second": round(count / seconds) if seconds else 0
+            }
+            results.append(result)
+            print(f"⏱️ {name}@{size}: {result['us_per_item']} µs/item • {result['items_per_second']:,}/s")
+    return results, skipped
+
+
+def compare(results, baseline, threshold):
+    """Benchmarks whose µs/item grew more than `threshold` (a fraction) over the baseline"""
+    regressions = []
+    for result in results:
+        key = f"{result['benchmark']}@{result['size']}"
+        reference = baseline.get(key)
+        if not reference:
+            continue
+        change = result["us_per_item"] / reference - 1
+        result["baseline_us_per_item"] = reference
+        result["change"] = round(change, 4)
+        if change > threshold:
+            regressions.append(key)
+    return regressions
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                              capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmarks with baseline regression gates")
+    parser.add_argument("--bench", default=",".join(BENCHMARKS), help="comma-separated benchmark names")
+    parser.add_argument("--sizes", default="1k,100k", help="comma-separated corpus sizes (1k, 100k, 1m or a number)")
+    parser.add_argument("--repeat", type=int, default=3, help="passes per benchmark; the best one counts")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="allowed slowdown before failing, as a fraction (0.2 = 20%%)")
+    parser.add_argument("--json", help="write the report to this file")
+    args = parser.parse_args()
+
+    names = [name.strip() for name in args.bench.split(",") if name.strip()]
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(unknown)} (choose from {', '.join(BENCHMARKS)})")
+    sizes = [size.strip().lower() for size in args.sizes.split(",") if size.strip()]
+
+    if REPO_ROOT not in sys.path:
+        sys.path.insert(0, REPO_ROOT)
+    results, skipped = run_benchmarks(names, sizes, args.repeat)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as baseline_file:
+            baseline = json.load(baseline_file).get("us_per_item", {})
+    regressions = compare(results, baseline, args.threshold)
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.platform(),
+        "threshold": args.threshold,
+        "results": results,
+        "skipped": skipped,
+        "regressions": regressions
+    }
+
+    if args.save_baseline:
+        baseline.update({f"{result['benchmark']}@{result['size']}": result["us_per_item"] for result in results})
+        with open(args.baseline, "w", encoding="utf-8") as baseline_file:
+            json.dump({"commit": report["commit"], "timestamp": report["timestamp"],
+                       "machine": report["machine"], "us_per_item": baseline}, baseline_file, indent=2)
+        print(f"💾 Baseline written to {args.baseline}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as output:
+            json.dump(report, output, indent=2)
+        print(f"📄 Report written to {args.json}")
+
+    if regressions and not args.save_baseline:
+        print(f"❌ Regressions over {args.threshold:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+    print("✅ No regressions" if baseline else "ℹ️ No baseline yet; run with --save-baseline to record one")
+
+
+if __name__ == "__main__":
+    main()
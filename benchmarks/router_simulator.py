@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+"""
+Router hit-rate simulator
+Replays transcripts through the routing of get_response_with_smart_fallback (Dialogflow,
+generic-reply filter, quota circuit, smart responses, knowledge base, OpenAI cache, ChatGPT route) with
+recorded or mocked backend outcomes, and predicts per-tier hit rates, OpenAI calls and
+tokens, and end-to-end latency. Give it a proposed config to see how a change to the
+smart-response keywords, generic phrases or route policy shifts traffic before deploying it.
+
+Transcript lines (.jsonl) need "text"; the channel and recorded outcomes are optional:
+    {"text": "...", "turn": 0, "channel": "telegram",
+     "dialogflow": {"reply": "...", "intent": "...", "is_fallback": false, "latency": 0.2},
+     "openai": {"tokens": 350, "latency": 0.9, "error": false}}
+Messages without recorded outcomes get deterministic mocked ones (see DEFAULT_CONFIG).
+Plain text files are read one message per line.
+
+Like the engine, only messages without earlier turns read or fill the OpenAI cache, and
+only on the channels listed in "cache_channels". Web first turns reach it because
+respond() drops the current message from the history; Telegram first turns reach it
+because the chat memory is still empty. Messages without a channel count as reaching it.
+
+The config is JSON; any key of DEFAULT_CONFIG may be overridden:
+    {"smart_responses": [...], "generic_phrases": [...], "route_policy": [...],
+     "knowledge_base": "knowledge_base", "openai_quota_exceeded": false,
+     "outcomes": {"dialogflow_match_rate": 0.5}}
+
+Usage:
+    python -m benchmarks.router_simulator                             # 1M synthetic messages
+    python -m benchmarks.router_simulator --corpus transcripts.jsonl --config proposed.json
+    python -m benchmarks.router_simulator --size 5m --workers 8 --json simulation.json
+
+Hedged dispatch, admission shedding and per-user limits are not simulated.
+"""
+
+import argparse
+import copy
+import json
+import os
+import random
+import time
+import zlib
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmarks.corpus import resolve_size, synthetic_messages
+from benchmarks.fake_services import parse_latency
+from generic_filter import GENERIC_PHRASES
+from knowledge_base import DEFAULT_MIN_SCORE, KnowledgeBase
+from model_router import ROUTE_POLICY, ModelRouter
+from response_config import CompiledResponseConfig, response_config, validate_config
+from tracing import Histogram
+
+TIERS = ["dialogflow", "smart", "knowledge_base", "openai_cache", "chatgpt", "fallback"]
+
+# Live configuration (smart responses and generic phrases come from the response config);
+# the budgets mirror RESPONSE_DEADLINE_SECONDS and DIALOGFLOW_TIMEOUT_CAP
+DEFAULT_CONFIG = {
+    "route_policy": ROUTE_POLICY,
+    "knowledge_base": None,  # document directory; None leaves the tier out
+    "knowledge_base_min_score": DEFAULT_MIN_SCORE,
+    "openai_quota_exceeded": False,
+    # Channels whose context-free messages reach the shared OpenAI cache in the engine
+    "cache_channels": ["web", "telegram"],
+    "deadline_seconds": 3.0,
+    "dialogflow_timeout_cap": 1.5,
+    "outcomes": {
+        # Mocked Dialogflow: share of messages it answers, and share of those answers that are generic
+        "dialogflow_match_rate": 0.5,
+        "dialogflow_generic_rate": 0.15,
+        "dialogflow_latency": "lognormal:0.15,0.3",
+        # Mocked ChatGPT
+        "openai_latency": "lognormal:0.8,0.4",
+        "openai_error_rate": 0.01,
+        "completion_fill": 0.6,  # share of the route's max_tokens an answer uses
+        "system_prompt_tokens": 60,
+        "tokens_per_history_turn": 40,
+        # Share of messages without a "turn" that open a conversation (only those hit the cache)
+        "first_turn_rate": 0.3
+    }
+}
+
+MOCK_REPLY = "Here is the information you asked for."
+FEATURE_CACHE_SIZE = 500_000
+
+
+def load_config(path):
+    """DEFAULT_CONFIG and the live response config, with the overrides from a JSON file"""
+    config = copy.deepcopy(DEFAULT_CONFIG)
+    live = response_config.current().data
+    config["smart_responses"] = live["smart_responses"]
+    config["generic_phrases"] = live["generic_phrases"]
+    if path:
+        with open(path, encoding="utf-8") as config_file:
+            overrides = json.load(config_file)
+        config["outcomes"].update(overrides.pop("outcomes", {}))
+        unknown = set(overrides) - set(config)
+        if unknown:
+            raise ValueError(f"Unknown config keys: {', '.join(sorted(unknown))}")
+        config.update(overrides)
+    validate_config({key: config[key] for key in ("smart_responses", "generic_phrases")})
+    return config
+
+
+def load_transcripts(path):
+    """Records ({"text", ...}) from a .jsonl transcript or a plain text file"""
+    records = []
+    with open(path, encoding="utf-8") as transcript:
+        for line in transcript:
+            line = line.strip()
+            if not line:
+                continue
+            if path.endswith(".jsonl"):
+                record = json.loads(line)
+                if "text" not in record:
+                    record["text"] = " ".join(part for part in (record.get("title"), record.get("body")) if part)
+                records.append(record)
+            else:
+                records.append({"text": line})
+    return records
+
+
+def _unit(text, salt):
+    """Deterministic pseudo-random number in [0, 1) for a message"""
+    return zlib.crc32(f"{salt}:{text}".encode("utf-8")) / 4294967296.0
+
+
+class RouterSimulation:
+    """Routing of one config over a stream of transcript records"""
+
+    def __init__(self, config, seed=0):
+        self.config = config
+        self.outcomes = config["outcomes"]
+        self.matchers = CompiledResponseConfig(validate_config(
+            {key: config[key] for key in ("smart_responses", "generic_phrases")}
+        ), source="simulation")
+        self.detector = self.matchers.generic_detector
+        self.router = ModelRouter(config["route_policy"])
+        self.knowledge_base = (KnowledgeBase.open(config["knowledge_base"], min_score=config["knowledge_base_min_score"])
+                               if config["knowledge_base"] else None)
+        self.rng = random.Random(seed)
+        random.seed(seed)  # parse_latency samplers draw from the module-level generator
+        self.dialogflow_latency = parse_latency(self.outcomes["dialogflow_latency"])
+        self.openai_latency = parse_latency(self.outcomes["openai_latency"])
+        self._features = {}  # text -> (smart rule matched, knowledge base hit, route, words); pure per text
+        self._cached_prompts = set()
+        self.cache_channels = set(config["cache_channels"])
+        self.tiers = Counter()
+        self.routes = Counter()
+        self.route_tokens = Counter()
+        self.openai = Counter()
+        self.latency = Histogram()
+
+    def _text_features(self, text):
+        features = self._features.get(text)
+        if features is None:
+            if len(self._features) >= FEATURE_CACHE_SIZE:
+                self._features.clear()
+            features = self._features[text] = (
+                self.matchers.smart_rule(text) is not None,
+                self.knowledge_base is not None and self.knowledge_base.answer(text) is not None,
+                self.router.route(text),
+                len(text.split())
+            )
+        return features
+
+    def _dialogflow(self, record, text):
+        """(answered, latency) from the recorded outcome or the mock"""
+        recorded = record.get("dialogflow")
+        if recorded is not None:
+            reply = recorded.get("reply") or ""
+            latency = recorded.get("latency")
+            intent, is_fallback = recorded.get("intent"), recorded.get("is_fallback", False)
+        else:
+            reply, intent, is_fallback = "", None, False
+            if _unit(text, "dialogflow") < self.outcomes["dialogflow_match_rate"]:
+                if _unit(text, "generic") < self.outcomes["dialogflow_generic_rate"]:
+                    reply = GENERIC_PHRASES[zlib.crc32(text.encode("utf-8")) % len(GENERIC_PHRASES)]
+                    intent = "mock-generic"
+                else:
+                    reply, intent = MOCK_REPLY, "mock-answer"
+            else:
+                is_fallback = True
+            latency = None
+        if latency is None:
+            latency = self.dialogflow_latency()
+        latency = min(latency, self.config["dialogflow_timeout_cap"])
+        answered = bool(reply.strip()) and not self.detector.is_generic(reply, intent_id=intent, is_fallback=is_fallback)
+        return answered, latency
+
+    def _chatgpt(self, record, text, route, words, elapsed):
+        """(tier, extra latency) for the ChatGPT stage"""
+        turn = record.get("turn")
+        first_turn = (turn == 0) if turn is not None else _unit(text, "turn") < self.outcomes["first_turn_rate"]
+        channel = record.get("channel")
+        cacheable = first_turn and (channel is None or channel in self.cache_channels)
+        if cacheable and text in self._cached_prompts:
+            self.openai["cache_hits"] += 1
+            return "openai_cache", 0.0
+
+        recorded = record.get("openai") or {}
+        latency = recorded.get("latency")
+        if latency is None:
+            latency = self.openai_latency()
+        if elapsed + latency > self.config["deadline_seconds"]:
+            self.openai["deadline_exceeded"] += 1
+            return "fallback", max(0.0, self.config["deadline_seconds"] - elapsed)
+        self.openai["calls"] += 1
+        error = recorded.get("error", self.rng.random() < self.outcomes["openai_error_rate"])
+        if error:
+            self.openai["errors"] += 1
+            return "fallback", latency
+
+        tokens = recorded.get("tokens")
+        if tokens is None:
+            history_turns = 0 if first_turn else min(route["history_turns"], turn if turn is not None else route["history_turns"])
+            prompt_tokens = (self.outcomes["system_prompt_tokens"] + (words * 4 + 2) // 3
+                             + history_turns * self.outcomes["tokens_per_history_turn"])
+            tokens = prompt_tokens + int(route["max_tokens"] * self.outcomes["completion_fill"])
+        self.openai["tokens"] += tokens
+        self.routes[route["route"]] += 1
+        self.route_tokens[route["route"]] += tokens
+        if cacheable:
+            self._cached_prompts.add(text)
+        return "chatgpt", latency
+
+    def process(self, record):
+        text = record["text"]
+        smart, knowledge, route, words = self._text_features(text)
+        answered, elapsed = self._dialogflow(record, text)
+        if answered:
+            tier = "dialogflow"
+        elif self.config["openai_quota_exceeded"]:
+            tier = "smart" if smart else "knowledge_base" if knowledge else "fallback"
+        elif smart:
+            tier = "smart"
+        elif knowledge:
+            tier = "knowledge_base"
+        else:
+            tier, latency = self._chatgpt(record, text, route, words, elapsed)
+            elapsed += latency
+        self.tiers[tier] += 1
+        self.latency.observe(elapsed)
+
+    def run(self, records):
+        for record in records:
+            self.process(record)
+        return {
+            "tiers": dict(self.tiers),
+            "routes": dict(self.routes),
+            "route_tokens": dict(self.route_tokens),
+            "openai": dict(self.openai),
+            "latency": {"counts": self.latency.counts, "count": self.latency.count, "sum": self.latency.sum}
+        }
+
+
+def _simulate_shard(args):
+    config, records, seed = args
+    return RouterSimulation(config, seed).run(records)
+
+
+def merge(parts):
+    """Combine shard results into one report"""
+    tiers, routes, route_tokens, openai = Counter(), Counter(), Counter(), Counter()
+    latency = Histogram()
+    for part in parts:
+        tiers.update(part["tiers"])
+        routes.update(part["routes"])
+        route_tokens.update(part["route_tokens"])
+        openai.update(part["openai"])
+        latency.counts = [a + b for a, b in zip(latency.counts, part["latency"]["counts"])]
+        latency.count += part["latency"]["count"]
+        latency.sum += part["latency"]["sum"]
+    total = sum(tiers.values())
+    return {
+        "messages": total,
+        "tiers": {tier: {"count": tiers[tier], "rate": round(tiers[tier] / total, 4) if total else 0.0}
+                  for tier in TIERS},
+        "openai": {
+            "calls": openai["calls"],
+            "errors": openai["errors"],
+            "cache_hits": openai["cache_hits"],
+            "deadline_exceeded": openai["deadline_exceeded"],
+            "tokens": openai["tokens"],
+            "tokens_per_message": round(openai["tokens"] / total, 2) if total else 0.0,
+            "routes": {route: {"calls": calls, "tokens": route_tokens[route]} for route, calls in routes.items()}
+        },
+        "latency": {
+            "mean": round(latency.sum / latency.count, 4) if latency.count else 0.0,
+            "p50": round(latency.quantile(0.50), 4),
+            "p95": round(latency.quantile(0.95), 4),
+            "p99": round(latency.quantile(0.99), 4)
+        }
+    }
+
+
+def simulate(config, records, workers=1, seed=0):
+    """Report for one config; records are sharded by text so repeats share a worker's cache"""
+    if workers <= 1:
+        return merge([RouterSimulation(config, seed).run(records)])
+    shards = [[] for _ in range(workers)]
+    for record in records:
+        shards[zlib.crc32(record["text"].encode("utf-8")) % workers].append(record)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        parts = list(pool.map(_simulate_shard, [(config, shard, seed + index) for index, shard in enumerate(shards)]))
+    return merge(parts)
+
+
+def compare(baseline, proposed):
+    """Proposed minus baseline for the headline numbers"""
+    return {
+        "tier_rates": {tier: round(proposed["tiers"][tier]["rate"] - baseline["tiers"][tier]["rate"], 4)
+                       for tier in TIERS},
+        "openai_calls": proposed["openai"]["calls"] - baseline["openai"]["calls"],
+        "openai_tokens": proposed["openai"]["tokens"] - baseline["openai"]["tokens"],
+        "latency_p95": round(proposed["latency"]["p95"] - baseline["latency"]["p95"], 4)
+    }
+
+
+def print_report(label, report):
+    print(f"📊 {label}: {report['messages']:,} messages")
+    print("   " + " • ".join(f"{tier} {stats['rate']:.1%}" for tier, stats in report["tiers"].items()))
+    openai = report["openai"]
+    print(f"   🧠 OpenAI calls {openai['calls']:,} ({openai['cache_hits']:,} cache hits, {openai['errors']:,} errors) "
+          f"• tokens {openai['tokens']:,} ({openai['tokens_per_message']}/message)")
+    latency = report["latency"]
+    print(f"   ⏱️ mean {latency['mean']}s • p50 {latency['p50']}s • p95 {latency['p95']}s • p99 {latency['p99']}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Predict tier hit rates and OpenAI volume for a routing config")
+    parser.add_argument("--corpus", help="jsonl transcript or text file (default: synthetic messages)")
+    parser.add_argument("--size", default="1m", help="synthetic corpus size when no --corpus is given")
+    parser.add_argument("--config", help="proposed config (JSON); compared against the live config")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="write the report to this file")
+    args = parser.parse_args()
+
+    if args.corpus:
+        records = load_transcripts(args.corpus)
+    else:
+        records = [{"text": text} for text in synthetic_messages(resolve_size(args.size))]
+
+    report = {"workers": args.workers}
+    started = time.perf_counter()
+    report["baseline"] = simulate(load_config(None), records, args.workers, args.seed)
+    print_report("Live config", report["baseline"])
+    if args.config:
+        report["proposed"] = simulate(load_config(args.config), records, args.workers, args.seed)
+        report["change"] = compare(report["baseline"], report["proposed"])
+        print_report(f"Proposed ({args.config})", report["proposed"])
+        change = report["change"]
+        print("🔀 Change: " + " • ".join(f"{tier} {delta:+.1%}" for tier, delta in change["tier_rates"].items())
+              + f" • OpenAI calls {change['openai_calls']:+,} • tokens {change['openai_tokens']:+,}"
+              + f" • p95 {change['latency_p95']:+}s")
+    elapsed = time.perf_counter() - started
+    simulated = len(records) * (2 if args.config else 1)
+    report["elapsed_seconds"] = round(elapsed, 2)
+    report["messages_per_minute"] = round(simulated / elapsed * 60) if elapsed else 0
+    print(f"⚡ {simulated:,} messages simulated in {elapsed:.1f}s ({report['messages_per_minute']:,}/min)")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as output:
+            json.dump(report, output, indent=2)
+        print(f"📄 Report written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
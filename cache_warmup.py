@@ -0,0 +1,124 @@
+"""
+Startup cache warm-up
+Fixed prompts (quick actions, the "Test ChatGPT" buttons) and the most frequent historical
+questions are answered once at startup so the first users get them from the shared
+ChatGPT cache instead of paying full LLM latency. The warm-up runs on a background thread
+and stops at a wall-clock budget and a token budget, so it never delays startup or runs
+up the bill; prompts already cached or answerable locally are skipped.
+"""
+
+import threading
+import time
+
+# The prompts app.py sends for its quick-action and "Test ChatGPT" buttons
+QUICK_ACTION_PROMPTS = [
+    ("contact support", "I need to contact support"),
+    ("order status", "Where is my order?"),
+    ("return refund", "I want to return something"),
+    ("business hours", "What are your business hours?")
+]
+TEST_PROMPTS = [
+    "Tell me a funny joke",
+    "What's the weather like today?",
+    "How do I make homemade pizza?",
+    "What's the meaning of life?"
+]
+
+# Give up early when the API keeps failing (quota, outage) instead of burning the budget
+MAX_CONSECUTIVE_FAILURES = 3
+
+
+class CacheWarmer:
+    """Answers prompts into the cache within a time and token budget
+
+    ask(prompt, seconds_left) -> response dict (with "source" and "tokens")
+    is_cached(prompt) / answered_locally(prompt) -> bool
+    estimate_tokens(prompt) -> worst-case tokens for one call
+    """
+
+    def __init__(self, ask, is_cached, answered_locally, estimate_tokens, time_budget=30.0, token_budget=3000):
+        self.ask = ask
+        self.is_cached = is_cached
+        self.answered_locally = answered_locally
+        self.estimate_tokens = estimate_tokens
+        self.time_budget = time_budget
+        self.token_budget = token_budget
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stats = {
+            "status": "idle",
+            "prompts": 0,
+            "warmed": 0,
+            "already_cached": 0,
+            "answered_locally": 0,
+            "over_budget": 0,
+            "failed": 0,
+            "not_attempted": 0,
+            "stopped_by": None,
+            "tokens": 0,
+            "seconds": 0.0
+        }
+
+    def _count(self, key, amount=1):
+        with self._lock:
+            self._stats[key] += amount
+
+    def run(self, prompts):
+        """Warm the prompts in order (most valuable first); returns the stats"""
+        started = time.monotonic()
+        deadline = started + self.time_budget
+        failures = 0
+        with self._lock:
+            self._stats.update(status="running", prompts=len(prompts))
+        for index, prompt in enumerate(prompts):
+            seconds_left = deadline - time.monotonic()
+            if seconds_left <= 0 or failures >= MAX_CONSECUTIVE_FAILURES:
+                with self._lock:
+                    self._stats["not_attempted"] = len(prompts) - index
+                    self._stats["stopped_by"] = "time budget" if seconds_left <= 0 else "repeated failures"
+                break
+            if self.answered_locally(prompt):
+                self._count("answered_locally")
+                continue
+            if self.is_cached(prompt):
+                self._count("already_cached")
+                continue
+            if self._stats["tokens"] + self.estimate_tokens(prompt) > self.token_budget:
+                self._count("over_budget")
+                continue  # a shorter prompt further down may still fit
+            try:
+                result = self.ask(prompt, seconds_left)
+            except Exception as e:
+                print(f"⚠️ Warm-up failed for {prompt!r}: {str(e)}")
+                result = None
+            if result and result.get("source") == "chatgpt" and not result.get("cached"):
+                failures = 0
+                self._count("warmed")
+                self._count("tokens", result.get("tokens", 0))
+            else:
+                failures += 1
+                self._count("failed")
+        with self._lock:
+            self._stats["status"] = "done"
+            self._stats["seconds"] = round(time.monotonic() - started, 2)
+            stats = dict(self._stats)
+        print(f"🔥 Cache warm-up: {stats['warmed']} warmed, {stats['already_cached']} already cached, "
+              f"{stats['tokens']} tokens in {stats['seconds']}s")
+        return stats
+
+    def start(self, collect_prompts):
+        """Collect the prompts and warm them on a daemon thread; False if already started"""
+        with self._lock:
+            if self._thread is not None:
+                return False
+            self._thread = threading.Thread(target=lambda: self.run(collect_prompts()), name="cache-warmup", daemon=True)
+            self._thread.start()
+            return True
+
+    def skip(self, reason):
+        with self._lock:
+            self._stats.update(status="skipped", reason=reason)
+
+    def get_stats(self):
+        with self._lock:
+            return dict(self._stats)
@@ -0,0 +1,136 @@
+"""
+Bounded per-chat conversation memory
+Keeps the last few turns of every chat for context-aware answers, with a per-chat turn
+cap, a total size cap enforced by LRU eviction, TTL expiry of idle chats and optional
+spill of evicted chats to the SQLite conversation store.
+"""
+
+import threading
+import time
+from collections import OrderedDict, deque
+
+# Rough per-turn bookkeeping cost (dict, deque slot, role string) counted against the cap
+TURN_OVERHEAD_CHARS = 100
+
+
+class ChatMemory:
+    """LRU + TTL bounded store of {"role", "content"} turns per chat"""
+
+    def __init__(self, max_turns_per_chat=10, max_total_chars=5_000_000, ttl_seconds=3600, spill=None):
+        self.max_turns_per_chat = max_turns_per_chat
+        self.max_total_chars = max_total_chars
+        self.ttl_seconds = ttl_seconds
+        self.spill = spill
+        self._lock = threading.Lock()
+        self._chats = OrderedDict()  # chat id -> (deque of turns, last access); oldest access first
+        self._total_chars = 0
+        self._stats = {
+            "lru_evictions": 0,
+            "ttl_evictions": 0,
+            "spilled": 0,
+            "restored": 0
+        }
+
+    @staticmethod
+    def _size(turn):
+        return len(turn["content"]) + TURN_OVERHEAD_CHARS
+
+    def _touch(self, chat_id, now):
+        """Fetch a chat's turns, restoring it from the spill store if needed; marks it recently used
+
+        A chat idle for longer than the TTL starts over, even if it was not evicted yet.
+        """
+        entry = self._chats.pop(chat_id, None)
+        if entry is not None and now - entry[1] > self.ttl_seconds:
+            self._total_chars -= sum(self._size(turn) for turn in entry[0])
+            self._stats["ttl_evictions"] += 1
+            entry = None
+            restore = False  # the spilled copy (if any) is just as stale
+        else:
+            restore = True
+        if entry is None:
+            turns = deque(maxlen=self.max_turns_per_chat)
+            if self.spill is not None and restore:
+                spilled = self.spill.load_history(chat_id, max_age_seconds=self.ttl_seconds)
+                if spilled:
+                    turns.extend(spilled)
+                    self._total_chars += sum(self._size(turn) for turn in turns)
+                    self._stats["restored"] += 1
+        else:
+            turns = entry[0]
+        self._chats[chat_id] = (turns, now)
+        return turns
+
+    def _evict(self, now):
+        """Expire idle chats, then drop least recently used chats until under the size cap"""
+        evicted = []
+        while self._chats:
+            chat_id, (turns, last_access) = next(iter(self._chats.items()))
+            if now - last_access > self.ttl_seconds:
+                self._stats["ttl_evictions"] += 1
+            elif self._total_chars > self.max_total_chars and len(self._chats) > 1:
+                self._stats["lru_evictions"] += 1
+            else:
+                break
+            self._chats.popitem(last=False)
+            self._total_chars -= sum(self._size(turn) for turn in turns)
+            evicted.append((chat_id, list(turns), last_access))
+        return evicted
+
+    def _spill(self, evicted):
+        if self.spill is None:
+            return
+        for chat_id, turns, last_access in evicted:
+            if turns:
+                self.spill.save_history(chat_id, turns, updated_at=time.time() - (time.monotonic() - last_access))
+        with self._lock:
+            self._stats["spilled"] += len(evicted)
+
+    def get(self, chat_id):
+        """Recent turns of a chat, oldest first (a copy safe to hand to ask_openai)"""
+        now = time.monotonic()
+        with self._lock:
+            turns = list(self._touch(chat_id, now))
+            evicted = self._evict(now)
+        self._spill(evicted)
+        return turns
+
+    def append(self, chat_id, role, content):
+        """Record one turn; the chat's oldest turn falls off past max_turns_per_chat"""
+        now = time.monotonic()
+        turn = {"role": role, "content": content}
+        with self._lock:
+            turns = self._touch(chat_id, now)
+            if len(turns) == turns.maxlen:
+                self._total_chars -= self._size(turns[0])
+            turns.append(turn)
+            self._total_chars += self._size(turn)
+            evicted = self._evict(now)
+        self._spill(evicted)
+
+    def add_exchange(self, chat_id, user_text, assistant_text):
+        """Record a user message and the answer it got"""
+        self.append(chat_id, "user", user_text)
+        self.append(chat_id, "assistant", assistant_text)
+
+    def forget(self, chat_id):
+        with self._lock:
+            entry = self._chats.pop(chat_id, None)
+            if entry is not None:
+                self._total_chars -= sum(self._size(turn) for turn in entry[0])
+        if self.spill is not None:
+            self.spill.delete_history(chat_id)
+
+    def flush(self):
+        """Spill every chat still in memory (e.g. on shutdown)"""
+        with self._lock:
+            chats = [(chat_id, list(turns), last_access) for chat_id, (turns, last_access) in self._chats.items()]
+        self._spill(chats)
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["chats"] = len(self._chats)
+            stats["turns"] = sum(len(turns) for turns, _ in self._chats.values())
+            stats["total_chars"] = self._total_chars
+        return stats
@@ -9,4 +9,10 @@ DIALOGFLOW_PROJECT_ID = "your-dialogflow-project-id"
 GOOGLE_APPLICATION_CREDENTIALS_PATH = "path/to/your/dialogflow-key.json"
 
 # Telegram Bot Configuration
-TELEGRAM_BOT_TOKEN = "your-telegram-bot-token" 
\ No newline at end of file
+TELEGRAM_BOT_TOKEN = "your-telegram-bot-token"
+
+# Optional: several branded bots served by multi_bot.py from one process
+# TELEGRAM_BOTS = [
+#     {"name": "acme", "token": "acme-bot-token"},
+#     {"name": "globex", "token": "globex-bot-token", "messages_per_second": 10},
+# ]
@@ -0,0 +1,93 @@
+"""
+SQLite conversation store
+Holds chat histories spilled out of the in-memory chat memory so returning users keep
+their context after an eviction or a restart.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from collections import Counter
+
+# Spilled histories older than this are ignored and pruned
+SPILL_RETENTION_SECONDS = 7 * 24 * 3600
+
+
+class ConversationStore:
+    """Thread-safe SQLite store keyed by chat"""
+
+    def __init__(self, path="conversations.db", retention_seconds=SPILL_RETENTION_SECONDS):
+        self.path = path
+        self.retention_seconds = retention_seconds
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS chat_history (
+                chat_key TEXT PRIMARY KEY,
+                turns TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_chat_history_updated ON chat_history (updated_at)")
+        self._conn.commit()
+
+    def save_history(self, chat_key, turns, updated_at=None):
+        """Persist (replace) the recent turns of one chat"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO chat_history (chat_key, turns, updated_at) VALUES (?, ?, ?)",
+                (str(chat_key), json.dumps(turns, ensure_ascii=False), updated_at or time.time())
+            )
+            self._conn.commit()
+
+    def load_history(self, chat_key, max_age_seconds=None):
+        """Recent turns of one chat, or None if nothing (recent enough) was spilled
+
+        max_age_seconds narrows the retention window, e.g. to the chat memory's TTL.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT turns, updated_at FROM chat_history WHERE chat_key = ?", (str(chat_key),)
+            ).fetchone()
+        max_age = self.retention_seconds if max_age_seconds is None else min(max_age_seconds, self.retention_seconds)
+        if row is None or time.time() - row[1] > max_age:
+            return None
+        return json.loads(row[0])
+
+    def delete_history(self, chat_key):
+        with self._lock:
+            self._conn.execute("DELETE FROM chat_history WHERE chat_key = ?", (str(chat_key),))
+            self._conn.commit()
+
+    def top_user_messages(self, limit=20):
+        """Most frequent user messages across stored (recent enough) chats: [(text, count)]"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT turns FROM chat_history WHERE updated_at >= ?", (time.time() - self.retention_seconds,)
+            ).fetchall()
+        counts = Counter()
+        first_seen = {}
+        for (turns,) in rows:
+            for turn in json.loads(turns):
+                if turn.get("role") != "user" or not turn.get("content", "").strip():
+                    continue
+                key = " ".join(turn["content"].lower().split())
+                counts[key] += 1
+                first_seen.setdefault(key, turn["content"])
+        return [(first_seen[key], count) for key, count in counts.most_common(limit)]
+
+    def prune(self):
+        """Drop histories past the retention window; returns the number removed"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM chat_history WHERE updated_at < ?", (time.time() - self.retention_seconds,)
+            )
+            self._conn.commit()
+            return cursor.rowcount
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
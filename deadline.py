@@ -0,0 +1,82 @@
+"""
+Request deadlines for the response pipeline
+Every stage derives its own timeout from the time left on the request budget
+"""
+
+import threading
+import time
+
+# Default end-to-end budget for a single user message (seconds)
+DEFAULT_DEADLINE_SECONDS = 3.0
+
+# Stages are skipped when less than this is left - a 10ms network call never succeeds
+MIN_STAGE_TIMEOUT = 0.05
+
+_stats_lock = threading.Lock()
+_deadline_stats = {
+    "requests": 0,
+    "exhausted": 0,
+    "exhausted_by_stage": {}
+}
+
+
+class Deadline:
+    """Monotonic time budget shared by all stages of one request"""
+
+    def __init__(self, seconds=DEFAULT_DEADLINE_SECONDS):
+        self.budget = seconds
+        self.started = time.monotonic()
+        self.expires_at = self.started + seconds
+        self.exhausted_stage = None
+
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    def remaining(self):
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self):
+        return self.remaining() <= 0.0
+
+    def timeout_for(self, cap=None, reserve=0.0):
+        """Timeout for the next stage, leaving `reserve` seconds for the stages after it"""
+        timeout = self.remaining() - reserve
+        if cap is not None:
+            timeout = min(timeout, cap)
+        return max(timeout, 0.0)
+
+    def has_time_for(self, stage, reserve=0.0):
+        """Check there is enough budget left to start `stage`; records exhaustion if not"""
+        if self.timeout_for(reserve=reserve) >= MIN_STAGE_TIMEOUT:
+            return True
+        self.mark_exhausted(stage)
+        return False
+
+    def mark_exhausted(self, stage):
+        """Record the stage that ran out the budget (only the first one counts)"""
+        if self.exhausted_stage is None:
+            self.exhausted_stage = stage
+            _record_exhausted(stage)
+
+
+def record_request():
+    """Count a request that ran under a deadline"""
+    with _stats_lock:
+        _deadline_stats["requests"] += 1
+
+
+def _record_exhausted(stage):
+    with _stats_lock:
+        _deadline_stats["exhausted"] += 1
+        by_stage = _deadline_stats["exhausted_by_stage"]
+        by_stage[stage] = by_stage.get(stage, 0) + 1
+
+
+def get_deadline_stats():
+    """Snapshot of deadline counters for dashboards"""
+    with _stats_lock:
+        return {
+            "requests": _deadline_stats["requests"],
+            "exhausted": _deadline_stats["exhausted"],
+            "exhausted_by_stage": dict(_deadline_stats["exhausted_by_stage"])
+        }
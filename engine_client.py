@@ -0,0 +1,169 @@
+"""
+Response engine clients
+get_engine() returns the engine every front end talks to: a RemoteEngine when ENGINE_URL
+points at an engine_server.py instance (http://host:port or unix:///path/to.sock), else a
+LocalEngine that runs the pipeline in this process. Both expose the same methods.
+"""
+
+import http.client
+import json
+import os
+import socket
+import threading
+from urllib.parse import urlencode
+
+REMOTE_TIMEOUT_SECONDS = 30
+
+
+class LocalEngine:
+    """Runs response_engine in-process"""
+
+    def __init__(self):
+        import response_engine
+        self._engine = response_engine
+        response_engine.start_knowledge_base()
+        response_engine.start_cache_warmup()
+
+    def respond(self, text, history=None, session_id=None):
+        return self._engine.respond(text, history, session_id or self._engine.DEFAULT_SESSION_ID)
+
+    def respond_batch(self, items):
+        return self._engine.respond_batch(items)
+
+    def quick_action(self, topic, prompt, user_id=None):
+        return self._engine.answer_quick_action(topic, prompt, user_id)
+
+    def ask(self, prompt, history=None, user_id=None):
+        return self._engine.answer_test_prompt(prompt, history, user_id)
+
+    def telegram_reply(self, chat_id, text):
+        return self._engine.process_telegram_message(chat_id, text)
+
+    def create_ticket(self, user_id, message, sentiment, intent, channel="web"):
+        return self._engine.open_support_ticket(user_id, message, sentiment, intent, channel)
+
+    def tickets(self, status=None, priority=None, user_id=None, limit=50):
+        return self._engine.list_support_tickets(status, priority, user_id, limit)
+
+    def rollups(self, resolution="minute", window=60):
+        return self._engine.get_rollup_report(resolution, window)
+
+    def sketches(self, days=7, top=20):
+        return self._engine.get_sketch_report(days, top)
+
+    def reset_quota(self):
+        self._engine.set_openai_quota_exceeded(False)
+
+    def stats(self):
+        return self._engine.get_engine_stats()
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTPConnection over a Unix domain socket"""
+
+    def __init__(self, socket_path, timeout=REMOTE_TIMEOUT_SECONDS):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+class RemoteEngine:
+    """Thin client for engine_server.py; one keep-alive connection per thread"""
+
+    def __init__(self, url, timeout=REMOTE_TIMEOUT_SECONDS):
+        self.url = url
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connect(self):
+        if self.url.startswith("unix://"):
+            return UnixHTTPConnection(self.url[len("unix://"):], timeout=self.timeout)
+        if self.url.startswith("http://"):
+            host = self.url[len("http://"):].rstrip("/")
+            return http.client.HTTPConnection(host, timeout=self.timeout)
+        raise ValueError(f"Unsupported ENGINE_URL: {self.url}")
+
+    def _request(self, method, path, payload=None):
+        body = json.dumps(payload).encode("utf-8") if payload is not None else None
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        for attempt in range(2):
+            conn = getattr(self._local, "conn", None)
+            reused = conn is not None
+            if not reused:
+                conn = self._local.conn = self._connect()
+            sent = False
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                sent = True
+                response = conn.getresponse()
+                data = json.loads(response.read() or b"{}")
+                break
+            except (http.client.HTTPException, ConnectionError) as e:
+                conn.close()
+                self._local.conn = None
+                # A kept-alive connection the server already closed fails before any response byte,
+                # so the request never ran and is safe to send again. Any other failure may come
+                # after the server acted on it (ticket created, usage charged): only GETs are repeated.
+                stale = reused and (not sent or isinstance(e, http.client.RemoteDisconnected))
+                if attempt or not (stale or method == "GET"):
+                    raise
+        if response.status != 200:
+            raise RuntimeError(f"Engine error {response.status} on {path}: {data.get('error')}")
+        return data
+
+    def respond(self, text, history=None, session_id=None):
+        payload = {"text": text, "history": history}
+        if session_id:
+            payload["session_id"] = session_id
+        return self._request("POST", "/v1/respond", payload)
+
+    def respond_batch(self, items):
+        return self._request("POST", "/v1/respond/batch", {"requests": items})["responses"]
+
+    def quick_action(self, topic, prompt, user_id=None):
+        return self._request("POST", "/v1/quick_action", {"topic": topic, "prompt": prompt, "user_id": user_id})
+
+    def ask(self, prompt, history=None, user_id=None):
+        return self._request("POST", "/v1/ask", {"prompt": prompt, "history": history, "user_id": user_id})
+
+    def telegram_reply(self, chat_id, text):
+        return self._request("POST", "/v1/telegram", {"chat_id": chat_id, "text": text})["response"]
+
+    def create_ticket(self, user_id, message, sentiment, intent, channel="web"):
+        return self._request("POST", "/v1/tickets", {
+            "user_id": user_id, "message": message, "sentiment": sentiment, "intent": intent, "channel": channel
+        })
+
+    def tickets(self, status=None, priority=None, user_id=None, limit=50):
+        query = {"status": status, "priority": priority, "user_id": user_id, "limit": limit}
+        return self._request("GET", "/v1/tickets?" + urlencode({k: v for k, v in query.items() if v is not None}))
+
+    def rollups(self, resolution="minute", window=60):
+        return self._request("GET", "/v1/rollups?" + urlencode({"resolution": resolution, "window": window}))
+
+    def sketches(self, days=7, top=20):
+        return self._request("GET", "/v1/sketches?" + urlencode({"days": days, "top": top}))
+
+    def reset_quota(self):
+        self._request("POST", "/v1/quota/reset", {})
+
+    def stats(self):
+        return self._request("GET", "/v1/stats")
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine():
+    """Process-wide engine selected by ENGINE_URL"""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            url = os.getenv("ENGINE_URL")
+            _engine = RemoteEngine(url) if url else LocalEngine()
+    return _engine
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Response Engine Service
+Serves the response pipeline over local HTTP (TCP or a Unix socket) so the Streamlit
+app, telegram_bot.py and the Telegram workers share one set of warm clients, caches and
+circuit breakers, and the engine can be scaled separately from the UI.
+
+Endpoints (JSON in, JSON out):
+    POST /v1/respond        {"text", "history", "session_id"} -> response dict
+    POST /v1/respond/batch  {"requests": [...]}               -> {"responses": [...]}
+    POST /v1/quick_action   {"topic", "prompt", "user_id"}    -> response dict
+    POST /v1/ask            {"prompt", "history", "user_id"}  -> response dict
+    POST /v1/telegram       {"chat_id", "text"}               -> {"response": str}
+    POST /v1/tickets        {"user_id", "message", "sentiment", "intent", "channel"} -> ticket dict
+    POST /v1/quota/reset                                      -> {"ok": true}
+    GET  /v1/tickets        ?status=&priority=&user_id=&limit= -> {"tickets": [...], "counts": {...}}
+    GET  /v1/rollups        ?resolution=minute|hour&window=   -> {"series": [...], "totals": {...}}
+    GET  /v1/sketches       ?days=&top=                       -> distinct users and top fall-through queries
+    GET  /v1/stats                                            -> engine stats
+    GET  /metrics                                             -> Prometheus text format
+    GET  /healthz                                             -> {"ok": true}
+
+Usage: python engine_server.py --port 8765
+       python engine_server.py --socket /tmp/support-engine.sock
+Point clients at it with ENGINE_URL=http://127.0.0.1:8765 or ENGINE_URL=unix:///tmp/support-engine.sock
+"""
+
+import argparse
+import json
+import os
+import socket
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import response_engine
+from tracing import tracer
+
+DEFAULT_PORT = 8765
+MAX_BATCH_SIZE = 64
+
+
+class EngineRequestHandler(BaseHTTPRequestHandler):
+    """Maps the JSON endpoints onto response_engine"""
+
+    protocol_version = "HTTP/1.1"  # keep-alive, so thin clients reuse one connection
+
+    def address_string(self):
+        # Unix socket peers have no (host, port) address
+        return self.client_address[0] if isinstance(self.client_address, tuple) else "unix"
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def do_GET(self):
+        if self.path == "/healthz":
+            self._send_json(200, {"ok": True})
+        elif self.path == "/v1/stats":
+            self._send_json(200, response_engine.get_engine_stats())
+        elif urlsplit(self.path).path == "/v1/tickets":
+            query = {key: values[-1] for key, values in parse_qs(urlsplit(self.path).query).items()}
+            try:
+                limit = int(query.get("limit", 50))
+            except ValueError:
+                self._send_json(400, {"error": "Bad request: limit must be an integer"})
+                return
+            self._send_json(200, response_engine.list_support_tickets(
+                query.get("status"), query.get("priority"), query.get("user_id"), limit
+            ))
+        elif urlsplit(self.path).path == "/v1/rollups":
+            query = {key: values[-1] for key, values in parse_qs(urlsplit(self.path).query).items()}
+            try:
+                report = response_engine.get_rollup_report(query.get("resolution", "minute"), int(query.get("window", 60)))
+            except ValueError as e:
+                self._send_json(400, {"error": f"Bad request: {str(e)}"})
+                return
+            self._send_json(200, report)
+        elif urlsplit(self.path).path == "/v1/sketches":
+            query = {key: values[-1] for key, values in parse_qs(urlsplit(self.path).query).items()}
+            try:
+                days, top = int(query.get("days", 7)), int(query.get("top", 20))
+            except ValueError:
+                self._send_json(400, {"error": "Bad request: days and top must be integers"})
+                return
+            self._send_json(200, response_engine.get_sketch_report(days, top))
+        elif self.path == "/metrics":
+            body = tracer.render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        else:
+            self._send_json(404, {"error": f"Unknown endpoint: {self.path}"})
+
+    def do_POST(self):
+        try:
+            payload = self._read_json()
+            if self.path == "/v1/respond":
+                result = response_engine.respond(
+                    payload["text"], payload.get("history"), payload.get("session_id", response_engine.DEFAULT_SESSION_ID),
+                    sentiment=payload.get("sentiment"), intents=payload.get("intents")
+                )
+            elif self.path == "/v1/respond/batch":
+                items = payload["requests"]
+                if len(items) > MAX_BATCH_SIZE:
+                    self._send_json(413, {"error": f"Batch larger than {MAX_BATCH_SIZE} requests"})
+                    return
+                result = {"responses": response_engine.respond_batch(items)}
+            elif self.path == "/v1/quick_action":
+                result = response_engine.answer_quick_action(payload["topic"], payload["prompt"], payload.get("user_id"))
+            elif self.path == "/v1/ask":
+                result = response_engine.answer_test_prompt(payload["prompt"], payload.get("history"), payload.get("user_id"))
+            elif self.path == "/v1/telegram":
+                result = {"response": response_engine.process_telegram_message(payload["chat_id"], payload["text"])}
+            elif self.path == "/v1/tickets":
+                result = response_engine.open_support_ticket(
+                    payload["user_id"], payload["message"], payload["sentiment"], payload.get("intent", []),
+                    payload.get("channel", "web")
+                )
+            elif self.path == "/v1/quota/reset":
+                response_engine.set_openai_quota_exceeded(False)
+                result = {"ok": True}
+            else:
+                self._send_json(404, {"error": f"Unknown endpoint: {self.path}"})
+                return
+        except (KeyError, TypeError, ValueError) as e:
+            self._send_json(400, {"error": f"Bad request: {str(e)}"})
+            return
+        except Exception as e:
+            print(f"❌ Engine error on {self.path}: {str(e)}")
+            self._send_json(500, {"error": str(e)})
+            return
+        self._send_json(200, result)
+
+
+class UnixThreadingHTTPServer(ThreadingHTTPServer):
+    """ThreadingHTTPServer bound to a Unix domain socket"""
+
+    address_family = socket.AF_UNIX
+
+    def server_bind(self):
+        if os.path.exists(self.server_address):
+            os.unlink(self.server_address)  # stale socket from a previous run
+        self.socket.bind(self.server_address)
+        self.server_name = "localhost"
+        self.server_port = 0
+
+
+def create_server(port=DEFAULT_PORT, host="127.0.0.1", socket_path=None):
+    if socket_path:
+        return UnixThreadingHTTPServer(socket_path, EngineRequestHandler)
+    return ThreadingHTTPServer((host, port), EngineRequestHandler)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Customer support response engine service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--socket", help="Serve on this Unix socket path instead of TCP")
+    args = parser.parse_args()
+
+    server = create_server(port=args.port, host=args.host, socket_path=args.socket)
+    # The index is ready before the first request instead of being built inside it
+    knowledge_base = response_engine.start_knowledge_base(background=False)
+    print(f"📚 Knowledge base ready ({knowledge_base.loaded_from or 'no documents'}, {knowledge_base.load_seconds}s)")
+    response_engine.start_cache_warmup(service=True)
+    print(f"🧠 Response engine listening on {args.socket or f'http://{args.host}:{args.port}'}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n🛑 Response engine stopped by user")
+    finally:
+        server.server_close()
+        if args.socket and os.path.exists(args.socket):
+            os.unlink(args.socket)
+
+
+if __name__ == "__main__":
+    main()
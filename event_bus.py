@@ -0,0 +1,60 @@
+"""
+Bounded in-process event bus
+Worker threads publish events into a fixed-size ring buffer; readers (e.g. one per
+Streamlit session) keep their own sequence cursor and drain only what is new.
+"""
+
+import threading
+from collections import deque
+
+
+class EventBus:
+    """Thread-safe ring buffer of events with monotonically increasing sequence numbers"""
+
+    def __init__(self, maxlen=500):
+        self.maxlen = maxlen
+        self._events = deque(maxlen=maxlen)
+        self._lock = threading.Lock()
+        self._last_seq = 0
+        self._dropped = 0
+
+    def publish(self, event):
+        """Append an event (a dict); the oldest event is dropped when the buffer is full"""
+        with self._lock:
+            self._last_seq += 1
+            if len(self._events) == self.maxlen:
+                self._dropped += 1
+            self._events.append(dict(event, seq=self._last_seq))
+            return self._last_seq
+
+    def since(self, seq, limit=None):
+        """Events newer than `seq` (oldest first) and the latest sequence number"""
+        with self._lock:
+            last_seq = self._last_seq
+            if seq >= last_seq:
+                return [], last_seq
+            # Sequence numbers are contiguous, so the new events are the buffer's tail
+            new_count = min(last_seq - seq, len(self._events))
+            events = list(self._events)[len(self._events) - new_count:]
+        if limit is not None and len(events) > limit:
+            events = events[:limit]
+            return events, events[-1]["seq"]
+        return events, last_seq
+
+    @property
+    def last_seq(self):
+        with self._lock:
+            return self._last_seq
+
+    def depth(self):
+        with self._lock:
+            return len(self._events)
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                "published": self._last_seq,
+                "buffered": len(self._events),
+                "dropped": self._dropped,
+                "capacity": self.maxlen
+            }
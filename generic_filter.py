@@ -0,0 +1,123 @@
+"""
+Generic Dialogflow reply detection
+The phrase list is compiled into one regex, and Dialogflow intents that only ever produce
+generic replies are learned so their replies are rejected on the intent id without
+scanning the text. The live detector belongs to the response config (response_config.py)
+and is rebuilt whenever the phrase list changes.
+"""
+
+import re
+import threading
+
+# Generic/unhelpful replies that should trigger the ChatGPT fallback
+GENERIC_PHRASES = [
+    "hmm, i'm not sure i understand",
+    "could you rephrase",
+    "sorry, i'm still learning",
+    "i'm afraid i don't have an answer",
+    "that's a bit outside my knowledge",
+    "can you ask something else",
+    "i'll pass it along to the team",
+    "that's a great question",
+    "i'm not sure about that",
+    "let me check on that",
+    "i don't have information about that",
+    "that's beyond my capabilities",
+    "i didn't get that",
+    "i'm sorry, i didn't quite catch that",
+    "would you like to talk to a support agent",
+    "can you try saying it differently",
+    "i didn't catch that",
+    "could you please rephrase",
+    "i'm sorry, i didn't understand",
+    "let me connect you with someone",
+    "i'll transfer you to an agent",
+    "that's outside my scope",
+    "i can't help with that",
+    "i don't have that information",
+    "i'm not programmed for that",
+    "that's not something i can assist with",
+    "i'm limited in what i can help with",
+    "i don't have access to that",
+    "that's beyond my training",
+    "i can't process that request"
+]
+
+# An intent is trusted as always-generic after this many replies, all of them generic
+LEARN_AFTER = 20
+
+# Learned intents are still text-checked every Nth reply, so an intent that starts
+# returning real answers (e.g. after an agent update) is un-learned
+VERIFY_EVERY = 50
+
+
+def compile_phrases(phrases):
+    """Compile phrases into a single alternation regex (longest first)"""
+    ordered = sorted({phrase.lower() for phrase in phrases}, key=len, reverse=True)
+    return re.compile("|".join(re.escape(phrase) for phrase in ordered))
+
+
+class GenericReplyDetector:
+    """Decide whether a Dialogflow reply is a generic non-answer"""
+
+    def __init__(self, phrases=GENERIC_PHRASES, learn_after=LEARN_AFTER, verify_every=VERIFY_EVERY):
+        self._pattern = compile_phrases(phrases)
+        self.learn_after = learn_after
+        self.verify_every = verify_every
+        self._lock = threading.Lock()
+        self._intents = {}  # intent id -> [replies seen, generic replies, skipped checks]
+        self._stats = {
+            "checked": 0,
+            "generic": 0,
+            "fallback_intent": 0,
+            "learned_intent": 0,
+            "text_scans": 0
+        }
+
+    def _matches(self, text):
+        # Dialogflow consoles often store curly apostrophes
+        return self._pattern.search(text.lower().replace("’", "'")) is not None
+
+    def is_generic(self, text, intent_id=None, is_fallback=False):
+        """True if the reply should be thrown away in favour of the next tier"""
+        with self._lock:
+            self._stats["checked"] += 1
+            if is_fallback:
+                self._stats["fallback_intent"] += 1
+                self._stats["generic"] += 1
+                return True
+            record = self._intents.get(intent_id) if intent_id else None
+            if record and record[0] >= self.learn_after and record[1] == record[0]:
+                record[2] += 1
+                if record[2] % self.verify_every:
+                    self._stats["learned_intent"] += 1
+                    self._stats["generic"] += 1
+                    return True
+            self._stats["text_scans"] += 1
+
+        generic = self._matches(text)
+
+        with self._lock:
+            if intent_id:
+                record = self._intents.setdefault(intent_id, [0, 0, 0])
+                record[0] += 1
+                if generic:
+                    record[1] += 1
+            if generic:
+                self._stats["generic"] += 1
+        return generic
+
+    def learned_intents(self):
+        """Intent ids currently short-circuited as always-generic"""
+        with self._lock:
+            return [intent_id for intent_id, (seen, generic, _) in self._intents.items()
+                    if seen >= self.learn_after and generic == seen]
+
+    def get_stats(self):
+        """Counters plus the share of Dialogflow answers that were discarded"""
+        with self._lock:
+            stats = dict(self._stats)
+        stats["discard_rate"] = round(stats["generic"] / stats["checked"], 3) if stats["checked"] else 0.0
+        stats["learned_intents"] = len(self.learned_intents())
+        return stats
+
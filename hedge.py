@@ -0,0 +1,165 @@
+"""
+Speculative (hedged) Dialogflow + ChatGPT dispatch
+The ChatGPT request starts shortly after Dialogflow instead of after a Dialogflow miss.
+Whichever usable answer arrives first wins; the loser is cancelled or its result discarded.
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+
+def _percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class HedgedDispatcher:
+    """Run a primary backend with a delayed speculative secondary, under a spend cap"""
+
+    def __init__(self, hedge_delay=0.3, max_wasted_tokens_per_hour=20000,
+                 max_concurrent_speculative=4, max_workers=8):
+        self.hedge_delay = hedge_delay
+        self.max_wasted_tokens_per_hour = max_wasted_tokens_per_hour
+        self.max_concurrent_speculative = max_concurrent_speculative
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="hedge")
+        self._lock = threading.Lock()
+        self._speculative_in_flight = 0
+        self._wasted = deque()  # (timestamp, tokens) for the rolling one hour spend window
+        self._saved_samples = deque(maxlen=1000)
+        self._stats = {
+            "dispatches": 0,
+            "hedges_launched": 0,
+            "hedges_skipped": 0,
+            "primary_wins": 0,
+            "secondary_wins": 0,
+            "cancelled_before_start": 0,
+            "wasted_tokens": 0,
+            "latency_saved_seconds": 0.0
+        }
+
+    # ---------- SPEND CAP ----------
+    def _wasted_last_hour(self, now):
+        while self._wasted and now - self._wasted[0][0] > 3600:
+            self._wasted.popleft()
+        return sum(tokens for _, tokens in self._wasted)
+
+    def _try_reserve_speculation(self):
+        with self._lock:
+            if self._speculative_in_flight >= self.max_concurrent_speculative:
+                return False
+            if self._wasted_last_hour(time.monotonic()) >= self.max_wasted_tokens_per_hour:
+                return False
+            self._speculative_in_flight += 1
+            return True
+
+    def _release_speculation(self, future):
+        with self._lock:
+            self._speculative_in_flight -= 1
+
+    def _record_waste(self, future):
+        """Count tokens of a discarded speculative answer once its call finishes"""
+        if future.cancelled() or future.exception() is not None:
+            return
+        result, _ = future.result()
+        tokens = (result or {}).get("tokens", 0)
+        if tokens:
+            with self._lock:
+                self._wasted.append((time.monotonic(), tokens))
+                self._stats["wasted_tokens"] += tokens
+
+    def _record_saved(self, seconds):
+        with self._lock:
+            self._stats["latency_saved_seconds"] += seconds
+            self._saved_samples.append(seconds)
+
+    def _count(self, key):
+        with self._lock:
+            self._stats[key] += 1
+
+    # ---------- DISPATCH ----------
+    @staticmethod
+    def _timed(fn):
+        def run():
+            start = time.monotonic()
+            result = fn()
+            return result, time.monotonic() - start
+        return run
+
+    def _discard(self, future, count_waste):
+        """Cancel the losing request; if it already started, discard its result when it lands"""
+        if future.cancel():
+            self._count("cancelled_before_start")
+        elif count_waste:
+            future.add_done_callback(self._record_waste)
+
+    def dispatch(self, primary, secondary, accept_primary, immediate=False, speculate=True):
+        """
+        Return (result, winner) where winner is "primary" or "secondary".
+
+        primary/secondary are zero-argument callables. accept_primary(result) decides if the
+        primary answer is usable. immediate=True starts the secondary without waiting.
+        """
+        self._count("dispatches")
+        started = time.monotonic()
+        primary_future = self._executor.submit(self._timed(primary))
+
+        # Give the primary a head start before paying for a speculative request
+        delay = 0.0 if immediate else self.hedge_delay
+        done, _ = wait([primary_future], timeout=delay)
+        if done or not speculate or not self._try_reserve_speculation():
+            if not done:
+                self._count("hedges_skipped")
+            result, _ = primary_future.result()
+            if accept_primary(result):
+                self._count("primary_wins")
+                return result, "primary"
+            self._count("secondary_wins")
+            return secondary(), "secondary"
+
+        self._count("hedges_launched")
+        secondary_future = self._executor.submit(self._timed(secondary))
+        secondary_future.add_done_callback(self._release_speculation)
+
+        done, _ = wait([primary_future, secondary_future], return_when=FIRST_COMPLETED)
+        if primary_future in done:
+            result, primary_elapsed = primary_future.result()
+            if accept_primary(result):
+                self._count("primary_wins")
+                self._discard(secondary_future, count_waste=True)
+                return result, "primary"
+            # Dialogflow missed: the sequential path would only start ChatGPT now
+            result, secondary_elapsed = secondary_future.result()
+            self._count("secondary_wins")
+            self._record_saved(max(0.0, (primary_elapsed + secondary_elapsed) - (time.monotonic() - started)))
+            return result, "secondary"
+
+        # ChatGPT answered before Dialogflow did; the Dialogflow result is no longer needed
+        result, secondary_elapsed = secondary_future.result()
+        self._count("secondary_wins")
+        finished = time.monotonic()
+
+        def record_late_primary(future):
+            if future.cancelled() or future.exception() is not None:
+                return
+            _, primary_elapsed = future.result()
+            self._record_saved(max(0.0, (primary_elapsed + secondary_elapsed) - (finished - started)))
+
+        primary_future.add_done_callback(record_late_primary)
+        self._discard(primary_future, count_waste=False)
+        return result, "secondary"
+
+    def get_stats(self):
+        """Counters plus tail latency saved and extra tokens spent"""
+        with self._lock:
+            stats = dict(self._stats)
+            samples = list(self._saved_samples)
+            stats["speculative_in_flight"] = self._speculative_in_flight
+            stats["wasted_tokens_last_hour"] = self._wasted_last_hour(time.monotonic())
+        stats["latency_saved_p50"] = _percentile(samples, 50)
+        stats["latency_saved_p95"] = _percentile(samples, 95)
+        return stats
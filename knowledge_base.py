@@ -0,0 +1,279 @@
+"""
+Knowledge base retrieval
+FAQ and help-article documents are split into passages and indexed with BM25, so questions
+the canned smart responses don't cover can still be answered locally before ChatGPT is
+called. The inverted index is persisted as flat binary arrays that are memory-mapped on
+startup (no parsing of postings), and rebuilt only when the source documents change.
+
+BM25 term scores are precomputed at build time and each posting list is stored best score
+first, so a query only sums the top MAX_POSTINGS_PER_TERM entries of each of its terms
+instead of scoring every passage that shares a common word. Scores are divided by the sum
+of the query terms' IDFs (unknown words count at full weight), so the threshold means
+"how much of the question this passage covers" whatever the size of the knowledge base.
+
+Documents (in KNOWLEDGE_BASE_DIR):
+    *.md / *.txt   one article per file; blank-line separated paragraphs are passages,
+                   "#" headings become the passage titles
+    *.jsonl        one entry per line: {"question", "answer"} or {"title", "text"}
+"""
+
+import array
+import hashlib
+import json
+import math
+import mmap
+import os
+import re
+import threading
+import time
+from collections import Counter
+
+DEFAULT_MIN_SCORE = 0.6
+BM25_K1 = 1.2
+BM25_B = 0.75
+INDEX_VERSION = 1
+MAX_POSTINGS_PER_TERM = 1000
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a an and are as at be but by can could do does for from have how i if in is it its me my "
+    "of on or our please so than that the their them then there these they this to us was we "
+    "what when where which who why will with would you your".split()
+)
+
+INDEX_FILES = ("postings.bin", "impacts.bin", "offsets.bin", "passages.bin")
+
+
+def tokenize(text):
+    """Lowercase word tokens without stopwords, plurals folded ("discounts" -> "discount")"""
+    return [
+        token[:-1] if len(token) > 3 and token.endswith("s") and not token.endswith("ss") else token
+        for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS
+    ]
+
+
+def idf(passages, document_frequency):
+    return math.log(1 + (passages - document_frequency + 0.5) / (document_frequency + 0.5))
+
+
+def read_passages(directory):
+    """(title, text) passages from every supported document in a directory tree"""
+    passages = []
+    for path in source_files(directory):
+        with open(path, encoding="utf-8") as document:
+            if path.endswith(".jsonl"):
+                for line in document:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    entry = json.loads(line)
+                    title = entry.get("question") or entry.get("title") or ""
+                    text = entry.get("answer") or entry.get("text") or ""
+                    if text:
+                        passages.append((title, text))
+            else:
+                title = os.path.splitext(os.path.basename(path))[0].replace("_", " ")
+                for block in re.split(r"\n\s*\n", document.read()):
+                    block = block.strip()
+                    if block.startswith("#"):
+                        heading, _, block = block.partition("\n")
+                        title = heading.lstrip("#").strip()
+                        block = block.strip()
+                    if block:
+                        passages.append((title, block))
+    return passages
+
+
+def source_files(directory):
+    files = []
+    if not directory or not os.path.isdir(directory):
+        return files
+    for root, dirs, names in os.walk(directory):
+        dirs[:] = sorted(name for name in dirs if not name.startswith("."))  # skips the index directory
+        files.extend(os.path.join(root, name) for name in sorted(names) if name.endswith((".md", ".txt", ".jsonl")))
+    return files
+
+
+def fingerprint(directory):
+    """Changes whenever a source document is added, removed or modified"""
+    digest = hashlib.sha1(f"v{INDEX_VERSION}".encode("utf-8"))
+    for path in source_files(directory):
+        stat = os.stat(path)
+        digest.update(f"{os.path.relpath(path, directory)}:{stat.st_size}:{stat.st_mtime_ns}".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def build_index(passages, index_dir, source_fingerprint=""):
+    """Write the inverted index for (title, text) passages to index_dir"""
+    postings = {}
+    lengths = []
+    for passage_id, (title, text) in enumerate(passages):
+        counts = Counter(tokenize(f"{title} {text}"))
+        lengths.append(sum(counts.values()))
+        for term, count in counts.items():
+            postings.setdefault(term, []).append((passage_id, count))
+
+    total = len(passages)
+    avg_length = (sum(lengths) / total) if total else 1.0
+    norms = [BM25_K1 * (1 - BM25_B + BM25_B * length / (avg_length or 1.0)) for length in lengths]
+    doc_ids, impacts = array.array("I"), array.array("f")
+    terms = {}
+    for term in sorted(postings):
+        entries = postings[term]
+        term_idf = idf(total, len(entries))
+        scored = sorted(((term_idf * count * (BM25_K1 + 1) / (count + norms[passage_id]), passage_id)
+                         for passage_id, count in entries), reverse=True)
+        terms[term] = [len(doc_ids), len(scored)]
+        doc_ids.extend(passage_id for _, passage_id in scored)
+        impacts.extend(impact for impact, _ in scored)
+
+    offsets, blob = array.array("Q", [0]), bytearray()
+    for title, text in passages:
+        blob += f"{title}\x00{text}".encode("utf-8")
+        offsets.append(len(blob))
+
+    os.makedirs(index_dir, exist_ok=True)
+    for name, data in zip(INDEX_FILES, (doc_ids, impacts, offsets, blob)):
+        _write_atomic(os.path.join(index_dir, name), bytes(data))
+    meta = {
+        "version": INDEX_VERSION,
+        "fingerprint": source_fingerprint,
+        "passages": total,
+        "postings": len(doc_ids),
+        "terms": terms
+    }
+    # Written last: a reader only trusts the arrays when the metadata matches them
+    _write_atomic(os.path.join(index_dir, "meta.json"), json.dumps(meta).encode("utf-8"))
+    return meta
+
+
+def _write_atomic(path, data):
+    temp_path = f"{path}.tmp-{os.getpid()}"
+    with open(temp_path, "wb") as output:
+        output.write(data)
+    os.replace(temp_path, path)
+
+
+def _map_array(path, typecode):
+    """Zero-copy view of a binary array file (empty files cannot be mapped)"""
+    with open(path, "rb") as source:
+        if os.fstat(source.fileno()).st_size == 0:
+            return None, memoryview(array.array(typecode))
+        mapped = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ)
+    return mapped, memoryview(mapped).cast(typecode)
+
+
+class KnowledgeBase:
+    """BM25 search over a memory-mapped passage index"""
+
+    def __init__(self, index_dir, min_score=DEFAULT_MIN_SCORE, max_postings_per_term=MAX_POSTINGS_PER_TERM):
+        self.index_dir = index_dir
+        self.min_score = min_score
+        self.max_postings_per_term = max_postings_per_term
+        self._lock = threading.Lock()
+        self._stats = {"queries": 0, "hits": 0, "misses": 0}
+        self.meta = None
+        self.loaded_from = None
+        self.load_seconds = 0.0
+        self._maps = []
+
+    @classmethod
+    def open(cls, source_dir, index_dir=None, min_score=DEFAULT_MIN_SCORE):
+        """Map the index for source_dir, rebuilding it first if the documents changed"""
+        index_dir = index_dir or os.path.join(source_dir, ".index")
+        knowledge_base = cls(index_dir, min_score)
+        if not os.path.isdir(source_dir):
+            return knowledge_base  # no documents: every lookup misses
+        started = time.perf_counter()
+        current = fingerprint(source_dir)
+        if knowledge_base.load(expected_fingerprint=current):
+            knowledge_base.loaded_from = "mmap"
+        else:
+            build_index(read_passages(source_dir), index_dir, current)
+            knowledge_base.load(expected_fingerprint=current)
+            knowledge_base.loaded_from = "build"
+        knowledge_base.load_seconds = round(time.perf_counter() - started, 4)
+        return knowledge_base
+
+    def load(self, expected_fingerprint=None):
+        """Map an existing index; False when it is missing, stale or inconsistent"""
+        try:
+            with open(os.path.join(self.index_dir, "meta.json"), encoding="utf-8") as meta_file:
+                meta = json.load(meta_file)
+            if meta.get("version") != INDEX_VERSION:
+                return False
+            if expected_fingerprint is not None and meta.get("fingerprint") != expected_fingerprint:
+                return False
+            views = {}
+            maps = []
+            for name, typecode in zip(INDEX_FILES, ("I", "f", "Q", "B")):
+                mapped, views[name] = _map_array(os.path.join(self.index_dir, name), typecode)
+                maps.append(mapped)
+        except (OSError, ValueError):
+            return False
+        if (len(views["postings.bin"]) != meta["postings"] or len(views["impacts.bin"]) != meta["postings"]
+                or len(views["offsets.bin"]) != meta["passages"] + 1):
+            return False  # a rebuild was interrupted between files
+
+        self.meta = meta
+        self._terms = meta["terms"]
+        self._doc_ids = views["postings.bin"]
+        self._impacts = views["impacts.bin"]
+        self._offsets = views["offsets.bin"]
+        self._passages = views["passages.bin"]
+        self._maps = maps
+        return True
+
+    def passage(self, passage_id):
+        """(title, text) of one passage"""
+        raw = bytes(self._passages[self._offsets[passage_id]:self._offsets[passage_id + 1]]).decode("utf-8")
+        title, _, text = raw.partition("\x00")
+        return title, text
+
+    def search(self, query, top=1):
+        """[(score, passage id)] best first; scores are normalized to roughly 0-1"""
+        if not self.meta or not self.meta["passages"]:
+            return []
+        total = self.meta["passages"]
+        scores = {}
+        ceiling = 0.0
+        for term in set(tokenize(query)):
+            entry = self._terms.get(term)
+            if entry is None:
+                ceiling += idf(total, 0)
+                continue
+            start, count = entry
+            ceiling += idf(total, count)
+            end = start + min(count, self.max_postings_per_term)
+            for passage_id, impact in zip(self._doc_ids[start:end], self._impacts[start:end]):
+                scores[passage_id] = scores.get(passage_id, 0.0) + impact
+        best = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top]
+        return [(score / ceiling, passage_id) for passage_id, score in best]
+
+    def answer(self, query):
+        """Response dict for the best passage when it scores above the threshold, else None"""
+        results = self.search(query)
+        hit = bool(results) and results[0][0] >= self.min_score
+        with self._lock:
+            self._stats["queries"] += 1
+            self._stats["hits" if hit else "misses"] += 1
+        if not hit:
+            return None
+        score, passage_id = results[0]
+        title, text = self.passage(passage_id)
+        return {
+            "response": text,
+            "source": "knowledge_base",
+            "confidence": round(min(score, 1.0), 2),
+            "title": title
+        }
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats["hit_rate"] = round(stats["hits"] / stats["queries"], 3) if stats["queries"] else 0.0
+        stats["passages"] = self.meta["passages"] if self.meta else 0
+        stats["terms"] = len(self.meta["terms"]) if self.meta else 0
+        stats["loaded_from"] = self.loaded_from
+        stats["load_seconds"] = self.load_seconds
+        return stats
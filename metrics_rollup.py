@@ -0,0 +1,132 @@
+"""
+Time-bucketed traffic rollups
+Every answered message (web and Telegram) is counted into the current minute and hour
+bucket: message count, channel, response source, sentiment and intent mix, and a latency
+histogram. Buckets live in fixed-size rings (ROLLUP_MINUTES minute slots, ROLLUP_HOURS hour
+slots); a slot is replaced by an empty bucket the first time it is reused for a newer
+period, so an update is O(1) and memory never grows. Dashboards read the rings directly
+instead of scanning transcripts.
+"""
+
+import threading
+import time
+from collections import Counter
+
+from tracing import Histogram
+
+ROLLUP_MINUTES = 24 * 60
+ROLLUP_HOURS = 7 * 24
+RESOLUTIONS = {"minute": 60, "hour": 3600}
+
+
+class RollupBucket:
+    """Counters for one period"""
+
+    __slots__ = ("period", "messages", "channels", "sources", "sentiments", "intents", "latency")
+
+    def __init__(self, period=-1):
+        self.period = period
+        self.messages = 0
+        self.channels = Counter()
+        self.sources = Counter()
+        self.sentiments = Counter()
+        self.intents = Counter()
+        self.latency = Histogram()
+
+    def add(self, other):
+        self.messages += other.messages
+        self.channels.update(other.channels)
+        self.sources.update(other.sources)
+        self.sentiments.update(other.sentiments)
+        self.intents.update(other.intents)
+        self.latency.counts = [a + b for a, b in zip(self.latency.counts, other.latency.counts)]
+        self.latency.count += other.latency.count
+        self.latency.sum += other.latency.sum
+
+    def to_dict(self, width):
+        return {
+            "start": self.period * width,
+            "messages": self.messages,
+            "channels": dict(self.channels),
+            "sources": dict(self.sources),
+            "sentiments": dict(self.sentiments),
+            "intents": dict(self.intents),
+            "latency": {
+                "avg": round(self.latency.sum / self.latency.count, 4) if self.latency.count else 0.0,
+                "p50": round(self.latency.quantile(0.50), 4),
+                "p95": round(self.latency.quantile(0.95), 4),
+                "p99": round(self.latency.quantile(0.99), 4)
+            }
+        }
+
+
+class RollupRing:
+    """Fixed number of buckets of `width` seconds; slot = period % slots"""
+
+    def __init__(self, width, slots):
+        self.width = width
+        self.slots = slots
+        self._buckets = [RollupBucket() for _ in range(slots)]
+
+    def bucket(self, now):
+        """Bucket for the period containing `now`, replaced if the slot still holds an older period;
+        None when `now` is older than the ring keeps"""
+        period = int(now // self.width)
+        bucket = self._buckets[period % self.slots]
+        if bucket.period > period:
+            return None
+        if bucket.period != period:
+            bucket = self._buckets[period % self.slots] = RollupBucket(period)
+        return bucket
+
+    def series(self, now, window):
+        """The last `window` periods, oldest first (empty periods included)"""
+        current = int(now // self.width)
+        series = []
+        for period in range(current - min(window, self.slots) + 1, current + 1):
+            bucket = self._buckets[period % self.slots]
+            series.append(bucket if bucket.period == period else RollupBucket(period))
+        return series
+
+
+class MetricsRollup:
+    """Minute and hour rings updated together, one lock for both"""
+
+    def __init__(self, minutes=ROLLUP_MINUTES, hours=ROLLUP_HOURS):
+        self._lock = threading.Lock()
+        self._rings = {"minute": RollupRing(RESOLUTIONS["minute"], minutes), "hour": RollupRing(RESOLUTIONS["hour"], hours)}
+
+    def record(self, channel, source, sentiment, intents, latency, now=None):
+        """Count one answered message"""
+        now = time.time() if now is None else now
+        with self._lock:
+            for ring in self._rings.values():
+                bucket = ring.bucket(now)
+                if bucket is None:
+                    continue
+                bucket.messages += 1
+                bucket.channels[channel] += 1
+                bucket.sources[source] += 1
+                bucket.sentiments[sentiment] += 1
+                for intent in intents or ("none",):
+                    bucket.intents[intent] += 1
+                bucket.latency.observe(latency)
+
+    def report(self, resolution="minute", window=60, now=None):
+        """{"series": per-period dicts oldest first, "totals": the whole window summed}"""
+        if resolution not in self._rings:
+            raise ValueError(f"Unknown resolution: {resolution} (use {', '.join(RESOLUTIONS)})")
+        now = time.time() if now is None else now
+        ring = self._rings[resolution]
+        totals = RollupBucket(int(now // ring.width) - min(window, ring.slots) + 1)
+        with self._lock:
+            buckets = ring.series(now, window)
+            for bucket in buckets:
+                totals.add(bucket)
+            series = [bucket.to_dict(ring.width) for bucket in buckets]
+        return {
+            "resolution": resolution,
+            "window": min(window, ring.slots),
+            "series": series,
+            "totals": totals.to_dict(ring.width)
+        }
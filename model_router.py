@@ -0,0 +1,134 @@
+"""
+Complexity-based routing for ChatGPT calls
+A short "thanks!" does not need the same model, answer length and context as a
+multi-paragraph billing dispute. Prompts are classified locally (length, detected intents,
+sentiment) against a declarative policy table; the first matching route decides the model,
+max_tokens, temperature and how much history is sent. Latency and tokens are tracked per
+route so the table can be tuned for p50 latency and cost.
+"""
+
+import threading
+from collections import deque
+
+from text_analysis import analyze_sentiment, extract_intent_keywords
+
+# Routes are tried in order; a route matches when every condition in "when" holds.
+# Conditions: min_words / max_words, min_intents / max_intents, sentiments (allowed list).
+ROUTE_POLICY = [
+    {
+        "route": "brief",
+        "when": {"max_words": 6, "max_intents": 0, "sentiments": ["positive", "neutral"]},
+        "model": "gpt-3.5-turbo",
+        "max_tokens": 80,
+        "temperature": 0.5,
+        "history_turns": 2
+    },
+    {
+        "route": "complex",
+        "when": {"min_words": 60},
+        "model": "gpt-4o-mini",
+        "max_tokens": 500,
+        "temperature": 0.3,
+        "history_turns": 10
+    },
+    {
+        "route": "complex",
+        "when": {"min_intents": 2, "sentiments": ["negative"]},
+        "model": "gpt-4o-mini",
+        "max_tokens": 500,
+        "temperature": 0.3,
+        "history_turns": 10
+    },
+    {
+        "route": "standard",
+        "when": {},
+        "model": "gpt-3.5-turbo",
+        "max_tokens": 300,
+        "temperature": 0.7,
+        "history_turns": 6
+    }
+]
+
+LATENCY_SAMPLES_PER_ROUTE = 500
+
+
+def _percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def prompt_features(prompt, sentiment=None, intents=None):
+    """Local, network-free features the policy conditions test; pass what the caller already computed"""
+    if intents is None:
+        intents = extract_intent_keywords(prompt)
+    if sentiment is None:
+        sentiment = analyze_sentiment(prompt)[0]
+    return {
+        "words": len(prompt.split()),
+        "intents": len(intents),
+        "sentiment": sentiment
+    }
+
+
+def _matches(when, features):
+    if "min_words" in when and features["words"] < when["min_words"]:
+        return False
+    if "max_words" in when and features["words"] > when["max_words"]:
+        return False
+    if "min_intents" in when and features["intents"] < when["min_intents"]:
+        return False
+    if "max_intents" in when and features["intents"] > when["max_intents"]:
+        return False
+    if "sentiments" in when and features["sentiment"] not in when["sentiments"]:
+        return False
+    return True
+
+
+class ModelRouter:
+    """Picks a route from the policy table and keeps per-route latency/token stats"""
+
+    def __init__(self, policy=None):
+        self.policy = policy or ROUTE_POLICY
+        if not self.policy or self.policy[-1]["when"]:
+            raise ValueError("The last route in the policy must be an unconditional default")
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def route(self, prompt, sentiment=None, intents=None):
+        """Policy entry for a prompt"""
+        features = prompt_features(prompt, sentiment, intents)
+        for entry in self.policy:
+            if _matches(entry["when"], features):
+                return entry
+        return self.policy[-1]
+
+    def record(self, route, seconds, tokens):
+        with self._lock:
+            stats = self._stats.get(route)
+            if stats is None:
+                stats = self._stats[route] = {
+                    "calls": 0,
+                    "tokens": 0,
+                    "latencies": deque(maxlen=LATENCY_SAMPLES_PER_ROUTE)
+                }
+            stats["calls"] += 1
+            stats["tokens"] += tokens
+            stats["latencies"].append(seconds)
+
+    def get_stats(self):
+        with self._lock:
+            snapshot = {route: (stats["calls"], stats["tokens"], list(stats["latencies"]))
+                        for route, stats in self._stats.items()}
+        return {
+            route: {
+                "calls": calls,
+                "tokens": tokens,
+                "avg_tokens": round(tokens / calls, 1) if calls else 0.0,
+                "latency_p50": _percentile(latencies, 50),
+                "latency_p95": _percentile(latencies, 95)
+            }
+            for route, (calls, tokens, latencies) in snapshot.items()
+        }
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Multi-Bot Telegram Host
+Serves several branded Telegram bots from one asyncio process. All bots share the
+HTTP connection pool, the Dialogflow client, the single-flight groups and the worker
+pool, while each bot keeps its own offset, send rate limit and metrics. Chat ids are
+namespaced by bot name before they reach the pipeline, so the same user talking to two bots
+has two Dialogflow sessions, two conversation memories and two ticket/user ids. A bot whose
+token fails the startup check is left out; the others still start.
+
+Configure TELEGRAM_BOTS in config.py:
+    TELEGRAM_BOTS = [
+        {"name": "acme", "token": "123:abc"},
+        {"name": "globex", "token": "456:def", "messages_per_second": 10},
+    ]
+Usage: python multi_bot.py
+"""
+
+import asyncio
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import httpx
+
+import config
+from telegram_bot import process_telegram_message
+
+TELEGRAM_API_BASE = os.getenv("TELEGRAM_API_BASE", "https://api.telegram.org")
+
+# Telegram allows roughly 30 messages per second per bot
+DEFAULT_MESSAGES_PER_SECOND = 25
+POLL_TIMEOUT_SECONDS = 30
+REPORT_EVERY_SECONDS = 60
+
+
+def load_bot_configs():
+    """Bots from config.TELEGRAM_BOTS, or the single TELEGRAM_BOT_TOKEN bot"""
+    bots = getattr(config, "TELEGRAM_BOTS", None)
+    if not bots:
+        bots = [{"name": "default", "token": config.TELEGRAM_BOT_TOKEN}]
+    names = [bot["name"] for bot in bots]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Duplicate bot names in TELEGRAM_BOTS: {names}")
+    return bots
+
+
+class AsyncRateLimiter:
+    """Token bucket for one bot's outgoing messages"""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class BotRunner:
+    """Long-polling loop and metrics for one bot token"""
+
+    def __init__(self, bot_config, client, executor):
+        self.name = bot_config["name"]
+        self.api_url = f"{TELEGRAM_API_BASE}/bot{bot_config['token']}"
+        self.client = client
+        self.executor = executor
+        self.limiter = AsyncRateLimiter(bot_config.get("messages_per_second", DEFAULT_MESSAGES_PER_SECOND))
+        self.offset = 0
+        self.metrics = {
+            "updates": 0,
+            "sent": 0,
+            "errors": 0,
+            "response_seconds": 0.0,
+            "last_error": None,
+            "last_update_at": None
+        }
+
+    async def call(self, method, http_timeout=10, **params):
+        response = await self.client.post(f"{self.api_url}/{method}", json=params, timeout=http_timeout)
+        return response.json()
+
+    async def check_connection(self):
+        bot_info = await self.call("getMe")
+        if not bot_info.get("ok"):
+            raise RuntimeError(f"{self.name}: getMe failed: {bot_info.get('description')}")
+        print(f"✅ {self.name} connected: @{bot_info['result']['username']}")
+
+    def conversation_id(self, chat_id):
+        """Pipeline chat id: Telegram chat ids are only unique per bot"""
+        return f"{self.name}-{chat_id}"
+
+    async def answer_chat(self, chat_id, texts):
+        """Answer one chat's messages in order"""
+        loop = asyncio.get_running_loop()
+        conversation_id = self.conversation_id(chat_id)
+        for text in texts:
+            start = time.monotonic()
+            try:
+                # The pipeline is blocking (Dialogflow gRPC) - run it on the shared pool
+                response = await loop.run_in_executor(self.executor, process_telegram_message, conversation_id, text)
+                await self.limiter.acquire()
+                await self.call("sendMessage", chat_id=chat_id, text=response, parse_mode="Markdown")
+                self.metrics["sent"] += 1
+            except Exception as e:
+                self.record_error(e)
+            self.metrics["response_seconds"] += time.monotonic() - start
+
+    async def poll_forever(self):
+        while True:
+            try:
+                updates = await self.call("getUpdates", http_timeout=POLL_TIMEOUT_SECONDS + 5,
+                                          offset=self.offset + 1, timeout=POLL_TIMEOUT_SECONDS)
+                if not updates.get("ok"):
+                    raise RuntimeError(updates.get("description", "getUpdates failed"))
+                batch = updates.get("result", [])
+                if not batch:
+                    continue
+
+                # Chats are answered concurrently, each chat's messages in order
+                by_chat = defaultdict(list)
+                for update in batch:
+                    message = update.get("message") or {}
+                    if message.get("text"):
+                        by_chat[message["chat"]["id"]].append(message["text"])
+                self.metrics["updates"] += len(batch)
+                self.metrics["last_update_at"] = datetime.now().isoformat()
+                await asyncio.gather(*(self.answer_chat(chat_id, texts) for chat_id, texts in by_chat.items()))
+                self.offset = max(self.offset, max(update["update_id"] for update in batch))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.record_error(e)
+                await asyncio.sleep(5)
+
+    def record_error(self, error):
+        print(f"❌ {self.name}: {str(error)}")
+        self.metrics["errors"] += 1
+        self.metrics["last_error"] = str(error)
+
+    def get_metrics(self):
+        metrics = dict(self.metrics, bot=self.name, offset=self.offset)
+        metrics["avg_response_seconds"] = round(metrics["response_seconds"] / metrics["sent"], 3) if metrics["sent"] else 0.0
+        return metrics
+
+
+async def report_forever(runners):
+    while True:
+        await asyncio.sleep(REPORT_EVERY_SECONDS)
+        for runner in runners:
+            m = runner.get_metrics()
+            print(f"📊 {m['bot']}: {m['updates']} updates, {m['sent']} sent, {m['errors']} errors, "
+                  f"avg {m['avg_response_seconds']}s, offset {m['offset']}")
+
+
+async def run_bots(bot_configs, workers=16):
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pipeline")
+    limits = httpx.Limits(max_connections=max(10, 4 * len(bot_configs)))
+    async with httpx.AsyncClient(limits=limits) as client:
+        runners = [BotRunner(bot_config, client, executor) for bot_config in bot_configs]
+        # One bad token must not keep the other bots offline
+        results = await asyncio.gather(*(runner.check_connection() for runner in runners), return_exceptions=True)
+        for runner, result in zip(runners, results):
+            if isinstance(result, Exception):
+                runner.record_error(result)
+                print(f"⚠️ {runner.name} skipped: it could not connect")
+        runners = [runner for runner, result in zip(runners, results) if not isinstance(result, Exception)]
+        if not runners:
+            raise RuntimeError("No Telegram bot could connect")
+        print(f"🔄 Serving {len(runners)} bots...")
+        await asyncio.gather(report_forever(runners), *(runner.poll_forever() for runner in runners))
+
+
+def main():
+    print("🤖 Starting Multi-Bot Telegram Customer Support Host...")
+    try:
+        asyncio.run(run_bots(load_bot_configs()))
+    except KeyboardInterrupt:
+        print("\n🛑 Bots stopped by user")
+
+
+if __name__ == "__main__":
+    main()
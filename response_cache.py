@@ -0,0 +1,46 @@
+"""
+Response cache on top of the shared state backend
+Answers to context-free prompts are cached under a hash of the normalized prompt, so every
+process sharing the backend reuses them until the TTL runs out.
+"""
+
+import hashlib
+
+from singleflight import make_key
+
+DEFAULT_TTL_SECONDS = 3600
+
+
+class ResponseCache:
+    """TTL cache of response dicts keyed on normalized prompt parts"""
+
+    def __init__(self, state, namespace, ttl=DEFAULT_TTL_SECONDS):
+        self.state = state
+        self.namespace = namespace
+        self.ttl = ttl
+
+    def _key(self, parts):
+        digest = hashlib.sha1(make_key(*parts).encode("utf-8")).hexdigest()
+        return f"cache:{self.namespace}:{digest}"
+
+    def get(self, *parts):
+        """Cached response for the prompt parts, or None"""
+        value = self.state.get(self._key(parts))
+        self.state.incr(f"stats:cache:{self.namespace}:{'hits' if value is not None else 'misses'}")
+        return value
+
+    def contains(self, *parts):
+        """True if the prompt parts are cached (not counted as a hit or miss)"""
+        return self.state.get(self._key(parts)) is not None
+
+    def put(self, response, *parts, ttl=None):
+        self.state.set(self._key(parts), response, ttl=ttl or self.ttl)
+
+    def get_stats(self):
+        hits = self.state.get(f"stats:cache:{self.namespace}:hits", 0)
+        misses = self.state.get(f"stats:cache:{self.namespace}:misses", 0)
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / (hits + misses), 3) if hits + misses else 0.0
+        }
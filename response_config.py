@@ -0,0 +1,248 @@
+"""
+Hot-reloadable response configuration
+Intent keywords, smart-response rules and the generic-phrase list can be loaded from a
+JSON file (RESPONSE_CONFIG_PATH, default response_config.json) instead of being edited in
+code. A background thread watches the file; when it changes, the new config is validated
+and compiled off the request path, then swapped in with a single reference assignment, so
+readers always see one complete config. A file that fails validation is rejected and the
+previous config keeps serving. Missing keys (or a missing file) fall back to the built-in
+defaults.
+
+    python response_config.py --check my_config.json    # validate before deploying
+    python response_config.py --dump response_config.json  # write the built-in defaults
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from datetime import datetime
+
+from generic_filter import GENERIC_PHRASES, GenericReplyDetector
+from smart_responses import SMART_RESPONSES
+
+RESPONSE_CONFIG_PATH = os.getenv("RESPONSE_CONFIG_PATH", "response_config.json")
+RESPONSE_CONFIG_POLL_SECONDS = float(os.getenv("RESPONSE_CONFIG_POLL_SECONDS", "2"))
+
+# Intent categories detected in user messages (any keyword contained in the message)
+INTENT_KEYWORDS = {
+    "order": ["order", "tracking", "delivery", "shipping", "where", "when"],
+    "support": ["help", "support", "assist", "problem", "issue", "trouble"],
+    "product": ["product", "item", "buy", "purchase", "price", "cost"],
+    "return": ["return", "refund", "exchange", "cancel", "send back"],
+    "contact": ["contact", "phone", "email", "speak", "human", "agent"],
+    "hours": ["hours", "open", "closed", "time", "when", "available"]
+}
+
+DEFAULTS = {
+    "intents": INTENT_KEYWORDS,
+    "smart_responses": SMART_RESPONSES,
+    "generic_phrases": GENERIC_PHRASES
+}
+
+# Shorter generic phrases would match almost every Dialogflow answer
+MIN_GENERIC_PHRASE_LENGTH = 4
+
+
+def _check_keywords(keywords, where):
+    if not isinstance(keywords, list) or not keywords:
+        raise ValueError(f"{where}: keywords must be a non-empty list")
+    for keyword in keywords:
+        if not isinstance(keyword, str) or not keyword.strip():
+            raise ValueError(f"{where}: keywords must be non-empty strings")
+        if keyword != keyword.lower():
+            raise ValueError(f"{where}: keyword {keyword!r} must be lowercase (messages are lowercased)")
+
+
+def validate_config(data):
+    """Full config (defaults filled in) from a parsed file; raises ValueError when it is unusable"""
+    if not isinstance(data, dict):
+        raise ValueError("Config must be a JSON object")
+    unknown = set(data) - set(DEFAULTS)
+    if unknown:
+        raise ValueError(f"Unknown config keys: {', '.join(sorted(unknown))}")
+    config = dict(DEFAULTS, **data)
+
+    if not isinstance(config["intents"], dict):
+        raise ValueError("intents must map intent names to keyword lists")
+    for intent, keywords in config["intents"].items():
+        _check_keywords(keywords, f"intent {intent!r}")
+
+    if not isinstance(config["smart_responses"], list):
+        raise ValueError("smart_responses must be a list of rules")
+    for index, rule in enumerate(config["smart_responses"]):
+        where = f"smart_responses[{index}]"
+        if not isinstance(rule, dict):
+            raise ValueError(f"{where} must be an object")
+        _check_keywords(rule.get("keywords"), where)
+        if not isinstance(rule.get("response"), str) or not rule["response"].strip():
+            raise ValueError(f"{where}: response must be a non-empty string")
+        confidence = rule.get("confidence")
+        if isinstance(confidence, bool) or not isinstance(confidence, (int, float)) or not 0 <= confidence <= 1:
+            raise ValueError(f"{where}: confidence must be a number between 0 and 1")
+
+    phrases = config["generic_phrases"]
+    if not isinstance(phrases, list) or not all(isinstance(phrase, str) for phrase in phrases):
+        raise ValueError("generic_phrases must be a list of strings")
+    short = [phrase for phrase in phrases if len(phrase.strip()) < MIN_GENERIC_PHRASE_LENGTH]
+    if short:
+        raise ValueError(f"generic_phrases too short to be safe: {short}")
+    return config
+
+
+def _keyword_pattern(keywords):
+    """One regex that matches wherever any keyword is contained in the text"""
+    return re.compile("|".join(re.escape(keyword) for keyword in sorted(set(keywords), key=len, reverse=True)))
+
+
+class CompiledResponseConfig:
+    """Immutable, compiled snapshot of one validated config"""
+
+    def __init__(self, config, source="defaults"):
+        self.data = config
+        self.source = source
+        self.loaded_at = datetime.now().isoformat(timespec="seconds")
+        self._intents = [(intent, _keyword_pattern(keywords)) for intent, keywords in config["intents"].items()]
+        self._rules = [(rule, _keyword_pattern(rule["keywords"])) for rule in config["smart_responses"]]
+        self.generic_detector = GenericReplyDetector(phrases=config["generic_phrases"])
+
+    def intent_keywords(self, text):
+        """Intent categories whose keywords appear in the text"""
+        text_lower = text.lower()
+        return [intent for intent, pattern in self._intents if pattern.search(text_lower)]
+
+    def smart_rule(self, text):
+        """First smart-response rule with a keyword in the text, or None"""
+        text_lower = text.lower()
+        for rule, pattern in self._rules:
+            if pattern.search(text_lower):
+                return rule
+        return None
+
+    def smart_response(self, text):
+        """Canned response for the message, or None"""
+        rule = self.smart_rule(text)
+        if rule is None:
+            return None
+        return {
+            "response": rule["response"],
+            "source": "dialogflow",
+            "confidence": rule["confidence"]
+        }
+
+
+def load_config_file(path):
+    """Validated config from a file (defaults when the file does not exist)"""
+    if not os.path.exists(path):
+        return validate_config({})
+    with open(path, encoding="utf-8") as config_file:
+        return validate_config(json.load(config_file))
+
+
+class ResponseConfig:
+    """Current compiled config plus the file watcher that replaces it"""
+
+    def __init__(self, path=RESPONSE_CONFIG_PATH, poll_seconds=RESPONSE_CONFIG_POLL_SECONDS):
+        self.path = path
+        self.poll_seconds = poll_seconds
+        self._lock = threading.Lock()
+        self._current = None
+        self._file_state = None
+        self._watcher = None
+        self._stats = {"reloads": 0, "rejected": 0, "last_error": None, "last_error_at": None}
+
+    def current(self):
+        """The config every matcher should use for this request"""
+        current = self._current
+        if current is None:
+            with self._lock:
+                if self._current is None:
+                    self._load()
+                    self._start_watcher()
+            current = self._current
+        return current
+
+    def _stat(self):
+        try:
+            stat = os.stat(self.path)
+            return stat.st_mtime_ns, stat.st_size
+        except OSError:
+            return None
+
+    def _load(self):
+        """Compile the file and swap it in; on failure keep the old config (or the defaults)"""
+        file_state = self._stat()
+        try:
+            compiled = CompiledResponseConfig(load_config_file(self.path), self.path if file_state else "defaults")
+        except (OSError, ValueError) as e:
+            # json.JSONDecodeError is a ValueError
+            self._stats["rejected"] += 1
+            self._stats["last_error"] = str(e)
+            self._stats["last_error_at"] = datetime.now().isoformat(timespec="seconds")
+            print(f"⚠️ Response config {self.path} rejected, keeping the previous one: {str(e)}")
+            if self._current is None:
+                self._current = CompiledResponseConfig(validate_config({}))
+            self._file_state = file_state  # don't retry the same broken file every poll
+            return False
+        self._current = compiled
+        self._file_state = file_state
+        self._stats["reloads"] += 1
+        return True
+
+    def reload(self):
+        """Re-read the file now; True when the new config was swapped in"""
+        with self._lock:
+            return self._load()
+
+    def _start_watcher(self):
+        if self._watcher is None and self.poll_seconds > 0:
+            self._watcher = threading.Thread(target=self._watch, name="response-config", daemon=True)
+            self._watcher.start()
+
+    def _watch(self):
+        while True:
+            time.sleep(self.poll_seconds)
+            if self._stat() != self._file_state:
+                with self._lock:
+                    if self._stat() != self._file_state:
+                        self._load()
+
+    def get_stats(self):
+        current = self.current()
+        with self._lock:
+            stats = dict(self._stats)
+        stats.update({
+            "source": current.source,
+            "loaded_at": current.loaded_at,
+            "intents": len(current.data["intents"]),
+            "smart_responses": len(current.data["smart_responses"]),
+            "generic_phrases": len(current.data["generic_phrases"])
+        })
+        return stats
+
+
+# Process-wide config shared by every matcher
+response_config = ResponseConfig()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Validate or export the response configuration")
+    parser.add_argument("--check", metavar="PATH", help="validate a config file")
+    parser.add_argument("--dump", metavar="PATH", help="write the built-in defaults to a file")
+    args = parser.parse_args()
+    if args.dump:
+        with open(args.dump, "w", encoding="utf-8") as output:
+            json.dump(DEFAULTS, output, indent=2, ensure_ascii=False)
+            output.write("\n")
+        print(f"📄 Defaults written to {args.dump}")
+    if args.check:
+        try:
+            config = load_config_file(args.check)
+        except (OSError, ValueError) as e:
+            print(f"❌ {args.check}: {str(e)}")
+            raise SystemExit(1)
+        print(f"✅ {args.check}: {len(config['intents'])} intents, {len(config['smart_responses'])} smart responses, "
+              f"{len(config['generic_phrases'])} generic phrases")
@@ -0,0 +1,867 @@
+"""
+Response Engine
+The one response pipeline (Dialogflow, smart responses, ChatGPT, fallbacks) used by the
+Streamlit app, telegram_bot.py and the sharded/multi-bot hosts. It runs in-process or as
+a long-lived local service (engine_server.py), so warm API clients, caches, single-flight
+groups and the quota circuit are shared by every client.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+from openai import OpenAI, APITimeoutError
+from google.cloud import dialogflow_v2 as dialogflow
+from google.api_core.exceptions import DeadlineExceeded
+from deadline import Deadline, record_request, get_deadline_stats
+from singleflight import dialogflow_flight, openai_flight, make_key, get_singleflight_stats
+from hedge import HedgedDispatcher
+from chat_memory import ChatMemory
+from conversation_store import ConversationStore
+from shared_state import InMemorySharedState, get_shared_state, record_global_stat, record_response_source, get_global_stats
+from response_cache import ResponseCache
+from text_analysis import analyze_sentiment, extract_intent_keywords, quick_sentiment
+from admission import AdmissionController, request_priority, DEFAULT_PRIORITY
+from usage_limits import UsageLimiter
+from model_router import ModelRouter
+from response_config import response_config
+from knowledge_base import KnowledgeBase
+from cache_warmup import CacheWarmer, QUICK_ACTION_PROMPTS, TEST_PROMPTS
+from ticket_store import TicketStore
+from metrics_rollup import MetricsRollup
+from sketches import SketchStore
+from tracing import tracer, traced, span, observe
+
+# OpenAI quota circuit: stays open for a cool-down, then ChatGPT is retried automatically
+OPENAI_QUOTA_KEY = "openai:quota_exceeded"
+OPENAI_QUOTA_COOLDOWN_SECONDS = 900
+OPENAI_CACHE_TTL_SECONDS = 3600
+
+# Response pipeline budget (seconds) - each stage derives its timeout from what is left
+RESPONSE_DEADLINE_SECONDS = 3.0
+DIALOGFLOW_TIMEOUT_CAP = 1.5  # Never let Dialogflow eat the whole budget
+
+# Hedged mode: start ChatGPT shortly after Dialogflow instead of after a Dialogflow miss
+HEDGED_DISPATCH_ENABLED = os.getenv("HEDGED_DISPATCH", "false").lower() == "true"
+HEDGE_DELAY_SECONDS = 0.3
+HEDGE_MAX_WASTED_TOKENS_PER_HOUR = 20000
+HEDGE_MAX_CONCURRENT_SPECULATIVE = 4
+
+# Telegram conversation memory (turns per chat, total size cap, idle expiry, optional SQLite spill)
+CHAT_MEMORY_MAX_TURNS = 6
+CHAT_MEMORY_MAX_CHARS = 5_000_000
+CHAT_MEMORY_TTL_SECONDS = 3600
+CHAT_MEMORY_SPILL_DB = os.getenv("CHAT_MEMORY_SPILL_DB")
+
+# Admission control: concurrent ChatGPT calls beyond this queue by priority (or are shed)
+OPENAI_MAX_CONCURRENT = int(os.getenv("OPENAI_MAX_CONCURRENT", "4"))
+
+# Per-user OpenAI limits (web session or Telegram chat); over-limit users get smart responses
+OPENAI_USER_REQUESTS_PER_MINUTE = int(os.getenv("OPENAI_USER_REQUESTS_PER_MINUTE", "6"))
+OPENAI_USER_TOKENS_PER_MINUTE = int(os.getenv("OPENAI_USER_TOKENS_PER_MINUTE", "3000"))
+OPENAI_USER_DAILY_REQUEST_BUDGET = int(os.getenv("OPENAI_USER_DAILY_REQUEST_BUDGET", "200"))
+OPENAI_USER_DAILY_TOKEN_BUDGET = int(os.getenv("OPENAI_USER_DAILY_TOKEN_BUDGET", "20000"))
+
+# Knowledge base tier: FAQ/article passages answered locally (BM25) before ChatGPT
+KNOWLEDGE_BASE_DIR = os.getenv("KNOWLEDGE_BASE_DIR", "knowledge_base")
+KNOWLEDGE_BASE_MIN_SCORE = float(os.getenv("KNOWLEDGE_BASE_MIN_SCORE", "0.6"))
+
+# Startup cache warm-up: fixed prompts and top stored questions, within a time and token budget
+CACHE_WARMUP_ENABLED = os.getenv("CACHE_WARMUP", "true").lower() == "true"
+CACHE_WARMUP_TIME_BUDGET_SECONDS = float(os.getenv("CACHE_WARMUP_TIME_BUDGET_SECONDS", "30"))
+CACHE_WARMUP_TOKEN_BUDGET = int(os.getenv("CACHE_WARMUP_TOKEN_BUDGET", "3000"))
+CACHE_WARMUP_TOP_QUERIES = int(os.getenv("CACHE_WARMUP_TOP_QUERIES", "20"))
+CACHE_WARMUP_LOCK_KEY = "warmup:running"
+
+# Support tickets for negative messages (web and Telegram)
+TICKET_DB = os.getenv("TICKET_DB", "tickets.db")
+TICKET_DEDUP_WINDOW_SECONDS = int(os.getenv("TICKET_DEDUP_WINDOW_SECONDS", "600"))
+
+# Distinct users and top unanswered queries, sketched per day and merged across processes
+SKETCH_DB = os.getenv("SKETCH_DB", "sketches.db")
+SKETCH_FLUSH_SECONDS = float(os.getenv("SKETCH_FLUSH_SECONDS", "10"))
+FALLTHROUGH_SOURCES = ("chatgpt", "fallback")
+
+DEFAULT_SESSION_ID = "session-001"
+BATCH_MAX_WORKERS = 8
+
+# OpenAI quota circuit and response cache live in the shared state backend so every
+# engine process sees the same values
+shared_state = get_shared_state()
+openai_cache = ResponseCache(shared_state, "openai", ttl=OPENAI_CACHE_TTL_SECONDS)
+usage_limiter = UsageLimiter(
+    shared_state,
+    requests_per_minute=OPENAI_USER_REQUESTS_PER_MINUTE,
+    tokens_per_minute=OPENAI_USER_TOKENS_PER_MINUTE,
+    daily_request_budget=OPENAI_USER_DAILY_REQUEST_BUDGET,
+    daily_token_budget=OPENAI_USER_DAILY_TOKEN_BUDGET
+)
+model_router = ModelRouter()
+# Per-minute / per-hour traffic rollups of every message this engine answers
+rollups = MetricsRollup()
+
+_resource_lock = threading.Lock()
+_settings = None
+_openai_client = None
+_dialogflow_client = None
+_hedged_dispatcher = None
+_telegram_memory = None
+_batch_pool = None
+_admission_controller = None
+_knowledge_base = None
+# Building the index can take seconds; it gets its own lock so it never holds up _resource_lock
+_knowledge_base_lock = threading.Lock()
+_cache_warmer = None
+_ticket_store = None
+_sketch_store = None
+
+
+def load_settings():
+    """API settings from environment variables, falling back to config.py"""
+    global _settings
+    with _resource_lock:
+        if _settings is None:
+            settings = {
+                "OPENAI_API_KEY": os.getenv("OPENAI_API_KEY"),
+                "DIALOGFLOW_PROJECT_ID": os.getenv("DIALOGFLOW_PROJECT_ID"),
+                "GOOGLE_APPLICATION_CREDENTIALS_PATH": os.getenv("GOOGLE_APPLICATION_CREDENTIALS_PATH")
+            }
+            if not all(settings.values()):
+                import config
+                settings = {name: getattr(config, name) for name in settings}
+            # Set Google credentials for Dialogflow
+            os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = settings["GOOGLE_APPLICATION_CREDENTIALS_PATH"]
+            _settings = settings
+    return _settings
+
+
+def get_openai_client():
+    """One OpenAI client (and connection pool) per process"""
+    global _openai_client
+    settings = load_settings()
+    with _resource_lock:
+        if _openai_client is None:
+            _openai_client = OpenAI(api_key=settings["OPENAI_API_KEY"])
+    return _openai_client
+
+
+def get_dialogflow_client():
+    """One Dialogflow client per process (channel setup is expensive)"""
+    global _dialogflow_client
+    load_settings()
+    with _resource_lock:
+        if _dialogflow_client is None:
+            endpoint = os.getenv("DIALOGFLOW_API_ENDPOINT")
+            if endpoint:
+                # Alternate endpoint (e.g. the load-test stand-in): REST transport, no Google credentials
+                from google.auth.credentials import AnonymousCredentials
+                _dialogflow_client = dialogflow.SessionsClient(
+                    transport="rest",
+                    credentials=AnonymousCredentials(),
+                    client_options={"api_endpoint": endpoint}
+                )
+            else:
+                _dialogflow_client = dialogflow.SessionsClient()
+    return _dialogflow_client
+
+
+def get_hedged_dispatcher():
+    """One hedging pool and spend cap per process"""
+    global _hedged_dispatcher
+    with _resource_lock:
+        if _hedged_dispatcher is None:
+            _hedged_dispatcher = HedgedDispatcher(
+                hedge_delay=HEDGE_DELAY_SECONDS,
+                max_wasted_tokens_per_hour=HEDGE_MAX_WASTED_TOKENS_PER_HOUR,
+                max_concurrent_speculative=HEDGE_MAX_CONCURRENT_SPECULATIVE
+            )
+    return _hedged_dispatcher
+
+
+def get_telegram_memory():
+    """Bounded per-chat history for Telegram users, optionally spilled to SQLite"""
+    global _telegram_memory
+    with _resource_lock:
+        if _telegram_memory is None:
+            spill = ConversationStore(CHAT_MEMORY_SPILL_DB) if CHAT_MEMORY_SPILL_DB else None
+            _telegram_memory = ChatMemory(
+                max_turns_per_chat=CHAT_MEMORY_MAX_TURNS,
+                max_total_chars=CHAT_MEMORY_MAX_CHARS,
+                ttl_seconds=CHAT_MEMORY_TTL_SECONDS,
+                spill=spill
+            )
+    return _telegram_memory
+
+
+def get_batch_pool():
+    """Worker threads for batch requests"""
+    global _batch_pool
+    with _resource_lock:
+        if _batch_pool is None:
+            _batch_pool = ThreadPoolExecutor(max_workers=BATCH_MAX_WORKERS, thread_name_prefix="engine-batch")
+    return _batch_pool
+
+
+def get_admission_controller():
+    """One LLM concurrency cap and priority queue per process"""
+    global _admission_controller
+    with _resource_lock:
+        if _admission_controller is None:
+            _admission_controller = AdmissionController(max_concurrent=OPENAI_MAX_CONCURRENT)
+    return _admission_controller
+
+
+def get_knowledge_base():
+    """Memory-mapped knowledge base index, rebuilt first if the documents changed
+
+    Engines open it at startup (start_knowledge_base); a lookup that arrives while it is
+    still building waits for it without blocking the other lazily created resources.
+    """
+    global _knowledge_base
+    if _knowledge_base is None:
+        with _knowledge_base_lock:
+            if _knowledge_base is None:
+                _knowledge_base = KnowledgeBase.open(KNOWLEDGE_BASE_DIR, min_score=KNOWLEDGE_BASE_MIN_SCORE)
+    return _knowledge_base
+
+
+def start_knowledge_base(background=True):
+    """Open (or rebuild) the knowledge base index at engine startup instead of on the first lookup"""
+    if not background:
+        return get_knowledge_base()
+    threading.Thread(target=get_knowledge_base, name="knowledge-base-loader", daemon=True).start()
+    return None
+
+
+def get_ticket_store():
+    """Durable support-ticket queue shared by the web app and Telegram"""
+    global _ticket_store
+    with _resource_lock:
+        if _ticket_store is None:
+            _ticket_store = TicketStore(TICKET_DB, shared_state, dedup_window_seconds=TICKET_DEDUP_WINDOW_SECONDS)
+    return _ticket_store
+
+
+def get_sketch_store():
+    """Per-day user and fall-through query sketches, flushed to SKETCH_DB"""
+    global _sketch_store
+    with _resource_lock:
+        if _sketch_store is None:
+            _sketch_store = SketchStore(SKETCH_DB, flush_seconds=SKETCH_FLUSH_SECONDS)
+    return _sketch_store
+
+
+def record_traffic(channel, user_id, text, source, sentiment, intents, latency):
+    """Count one answered message in the rollups and the daily sketches (sentiment None: analyze it here)"""
+    if sentiment is None:
+        sentiment = analyze_sentiment(text)[0]
+    rollups.record(channel, source, sentiment, intents, latency)
+    sketch_store = get_sketch_store()
+    sketch_store.add_user(user_id)
+    if source in FALLTHROUGH_SOURCES:
+        # Frequent questions nothing local could answer are candidates for new canned answers
+        sketch_store.add_fallthrough(text)
+
+
+def is_openai_quota_exceeded():
+    """Shared quota circuit state"""
+    return bool(shared_state.get(OPENAI_QUOTA_KEY, False))
+
+
+def set_openai_quota_exceeded(exceeded):
+    """Open the quota circuit for the cool-down period, or close it"""
+    if exceeded:
+        shared_state.set(OPENAI_QUOTA_KEY, True, ttl=OPENAI_QUOTA_COOLDOWN_SECONDS)
+    else:
+        shared_state.delete(OPENAI_QUOTA_KEY)
+
+
+# ---------- ENHANCED RESPONSE SYSTEM ----------
+@traced("smart_response")
+def get_smart_response(user_input):
+    """Enhanced response system with better context and fallback"""
+    return response_config.current().smart_response(user_input)
+
+
+@traced("knowledge_base")
+def search_knowledge_base(user_input):
+    """Best knowledge base passage for the message, or None below the score threshold"""
+    return get_knowledge_base().answer(user_input)
+
+
+# ---------- ENHANCED DIALOGFLOW FUNCTION ----------
+@traced("dialogflow")
+def detect_intent_text(session_id, text, language_code="en", deadline=None):
+    dialogflow_session_client = get_dialogflow_client()
+    session = dialogflow_session_client.session_path(load_settings()["DIALOGFLOW_PROJECT_ID"], session_id)
+    text_input = dialogflow.TextInput(text=text, language_code=language_code)
+    query_input = dialogflow.QueryInput(text=text_input)
+
+    # Derive the RPC timeout from the request budget, keeping part of it for later stages
+    timeout = None
+    if deadline is not None:
+        if not deadline.has_time_for("dialogflow"):
+            return None
+        timeout = deadline.timeout_for(cap=DIALOGFLOW_TIMEOUT_CAP)
+
+    try:
+        response = dialogflow_session_client.detect_intent(
+            request={"session": session, "query_input": query_input},
+            timeout=timeout
+        )
+        fulfillment_text = response.query_result.fulfillment_text
+        # Check if Dialogflow has a meaningful response
+        if fulfillment_text and fulfillment_text.strip():
+            # Check if the response is generic/unhelpful (precompiled detector of the current config)
+            query_result = response.query_result
+            with span("generic_filter") as filter_span:
+                is_generic = response_config.current().generic_detector.is_generic(
+                    fulfillment_text,
+                    intent_id=query_result.intent.name,
+                    is_fallback=query_result.intent.is_fallback
+                )
+                filter_span["source"] = "generic" if is_generic else "kept"
+            if is_generic:
+                return None  # Trigger ChatGPT fallback
+            else:
+                return {
+                    "response": fulfillment_text,
+                    "source": "dialogflow",
+                    "confidence": response.query_result.intent_detection_confidence
+                }
+        return None
+    except DeadlineExceeded:
+        if deadline is not None:
+            deadline.mark_exhausted("dialogflow")
+        return None
+    except Exception as e:
+        print(f"Dialogflow error: {str(e)}")
+        return None
+
+
+# ---------- ENHANCED OPENAI FUNCTION ----------
+def shed_response(prompt):
+    """Answer for a request shed by admission control: smart response, else fallback"""
+    smart_response = get_smart_response(prompt)
+    if smart_response:
+        return dict(smart_response, shed=True)
+    return {
+        "response": "We're helping a lot of customers right now. Please try again in a moment, or call 1-800-SUPPORT (24/7) for immediate assistance.",
+        "source": "fallback",
+        "confidence": 0.0,
+        "shed": True
+    }
+
+
+def limited_response(prompt, reason):
+    """Answer for a user over their OpenAI limits: smart response, else fallback"""
+    smart_response = get_smart_response(prompt)
+    if smart_response:
+        return dict(smart_response, rate_limited=reason)
+    return {
+        "response": """You've sent a lot of questions in a short time, so I'm switching to quick answers for a little while.
+
+📞 **Call Support:** 1-800-SUPPORT (24/7)
+📧 **Email:** support@company.com
+💬 **Live Chat:** Available on our website""",
+        "source": "fallback",
+        "confidence": 0.0,
+        "rate_limited": reason
+    }
+
+
+@traced("openai")
+def ask_openai(prompt, conversation_history=None, deadline=None, priority=DEFAULT_PRIORITY, channel="web",
+               user_id=None, sentiment=None, intents=None):
+    if is_openai_quota_exceeded():
+        return {
+            "response": """I understand you need help! Unfortunately, my advanced AI service is temporarily unavailable due to usage limits. 
+
+Here are your options:
+📞 **Call Support:** 1-800-SUPPORT (24/7)
+📧 **Email:** support@company.com
+💬 **Live Chat:** Available on our website
+⏰ **Business Hours:** Mon-Fri 8AM-8PM EST
+
+For immediate assistance, I recommend contacting our human support team who can help you right away!""",
+            "source": "fallback",
+            "confidence": 0.0
+        }
+
+    # Context-free prompts (quick actions, test buttons, first messages) are answered from the shared cache
+    if not conversation_history:
+        cached = openai_cache.get(prompt)
+        if cached is not None:
+            return dict(cached, cached=True)
+
+    # Per-user request/token limits keep one heavy user from tripping the shared quota circuit
+    if user_id is not None:
+        limited = usage_limiter.check(user_id)
+        if limited:
+            return limited_response(prompt, limited)
+
+    try:
+        # Model, answer length and context depth follow the prompt's complexity
+        route = model_router.route(prompt, sentiment, intents)
+        
+        # Build conversation context
+        messages = [
+            {
+                "role": "system", 
+                "content": """You are a professional, friendly, and helpful customer support AI assistant. 
+                You provide clear, accurate, and helpful responses to customer inquiries. 
+                Always be polite, professional, and try to be as helpful as possible. 
+                If you don't know something, suggest contacting human support."""
+            }
+        ]
+        
+        # Add conversation history if available (as many turns as the route allows)
+        if conversation_history and route["history_turns"]:
+            for msg in conversation_history[-route["history_turns"]:]:
+                messages.append({"role": msg["role"], "content": msg["content"]})
+        
+        # Add current user message
+        messages.append({"role": "user", "content": prompt})
+        
+        # Wait for an LLM slot in priority order; low-priority requests are shed when the queue backs up
+        client = get_openai_client()
+        admission = get_admission_controller()
+        if not admission.acquire(priority, timeout=deadline.remaining() if deadline is not None else None, channel=channel):
+            return shed_response(prompt)
+        try:
+            # Bound the call by what is left of the request budget after queueing for the slot;
+            # retries would overrun it, so disable them
+            if deadline is not None:
+                if not deadline.has_time_for("chatgpt"):
+                    return {
+                        "response": "I apologize, but I'm having trouble processing your request right now. Please try again in a moment or contact our human support team for immediate assistance.",
+                        "source": "fallback",
+                        "confidence": 0.0
+                    }
+                client = client.with_options(timeout=deadline.timeout_for(), max_retries=0)
+            call_started = time.monotonic()
+            response = client.chat.completions.create(
+                model=route["model"],
+                temperature=route["temperature"],
+                messages=messages,
+                max_tokens=route["max_tokens"]
+            )
+            call_seconds = time.monotonic() - call_started
+        finally:
+            admission.release()
+        
+        result = {
+            "response": response.choices[0].message.content.strip(),
+            "source": "chatgpt",
+            "confidence": 0.8,
+            "tokens": response.usage.total_tokens if response.usage else 0,
+            "route": route["route"]
+        }
+        model_router.record(route["route"], call_seconds, result["tokens"])
+        observe("openai_api", call_seconds, route["route"])
+        if user_id is not None:
+            usage_limiter.record(user_id, result["tokens"])
+        if not conversation_history:
+            openai_cache.put(result, prompt)
+        return result
+    except APITimeoutError:
+        if deadline is not None:
+            deadline.mark_exhausted("chatgpt")
+        return {
+            "response": "I apologize, but I'm having trouble processing your request right now. Please try again in a moment or contact our human support team for immediate assistance.",
+            "source": "fallback",
+            "confidence": 0.0
+        }
+    except Exception as e:
+        error_str = str(e)
+        
+        # Handle quota exceeded error specifically
+        if "429" in error_str or "quota" in error_str.lower():
+            set_openai_quota_exceeded(True)
+            return {
+                "response": """I understand you need help! Unfortunately, my advanced AI service is temporarily unavailable due to usage limits. 
+
+Here are your options:
+📞 **Call Support:** 1-800-SUPPORT (24/7)
+📧 **Email:** support@company.com
+💬 **Live Chat:** Available on our website
+⏰ **Business Hours:** Mon-Fri 8AM-8PM EST
+
+For immediate assistance, I recommend contacting our human support team who can help you right away!""",
+                "source": "fallback",
+                "confidence": 0.0
+            }
+        else:
+            return {
+                "response": "I apologize, but I'm having trouble processing your request right now. Please try again in a moment or contact our human support team for immediate assistance.",
+                "source": "fallback",
+                "confidence": 0.0
+            }
+
+
+def ask_openai_coalesced(key, prompt, conversation_history=None, user_id=None, wait_timeout=None, **options):
+    """ask_openai through openai_flight: identical prompts in flight share one completion
+
+    Only the raw completion is shared. Each caller's usage limits are checked before joining
+    the flight and the completion's tokens are charged to every caller that received it, so
+    one user's limit never leaks into another chat and waiters never get free answers.
+    """
+    if not conversation_history:
+        cached = openai_cache.get(prompt)
+        if cached is not None:
+            return dict(cached, cached=True)
+    if user_id is not None:
+        limited = usage_limiter.check(user_id)
+        if limited:
+            return limited_response(prompt, limited)
+    result = openai_flight.do(key, ask_openai, prompt, conversation_history, wait_timeout=wait_timeout, **options)
+    if user_id is not None and result and result["source"] == "chatgpt" and not result.get("cached"):
+        usage_limiter.record(user_id, result.get("tokens"))
+    return result
+
+
+# ---------- TELEGRAM PIPELINE ----------
+def process_telegram_message(chat_id, message_text, memory=None):
+    """Process incoming Telegram message and return response"""
+    print(f"📱 Processing Telegram message from {chat_id}: {message_text}")
+    record_global_stat("total_messages")
+    started = time.perf_counter()
+    sentiment = analyze_sentiment(message_text)[0]
+    intents = extract_intent_keywords(message_text)
+    
+    with span("telegram_pipeline"):
+        # Recent turns of this chat give ChatGPT the same context web users get
+        if memory is None:
+            memory = get_telegram_memory()
+        history = memory.get(chat_id)
+        result = answer_telegram_message(
+            chat_id, message_text, history, priority=request_priority(sentiment, intents, "telegram"),
+            sentiment=sentiment, intents=intents
+        )
+        response = result["response"]
+        memory.add_exchange(chat_id, message_text, response)
+    record_traffic(
+        "telegram", f"telegram:{chat_id}", message_text, result["source"], sentiment, intents, time.perf_counter() - started
+    )
+    
+    # Upset Telegram users get a ticket too (a repeat within the dedup window reuses it)
+    if sentiment == "negative":
+        ticket = open_support_ticket(f"telegram:{chat_id}", message_text, sentiment, intents, channel="telegram")
+        if not ticket["duplicate"]:
+            response += f"\n\n⚠️ *Support ticket #{ticket['ticket_id']} created* - A human agent will contact you soon."
+    return response
+
+
+def answer_telegram_message(chat_id, message_text, history=None, priority=None, sentiment=None, intents=None):
+    """Telegram response pipeline: Dialogflow, then ChatGPT, then smart responses; {"response", "source"}"""
+    deadline = Deadline(RESPONSE_DEADLINE_SECONDS)
+    record_request()
+    
+    # Try Dialogflow first (always available) - identical questions in flight share one call.
+    # Dialogflow answers depend on the session's contexts, so only the same chat is coalesced.
+    session_id = f"telegram-{chat_id}"
+    try:
+        dialogflow_response = dialogflow_flight.do(
+            make_key(session_id, message_text, "en"),
+            detect_intent_text, session_id, message_text, deadline=deadline, wait_timeout=deadline.remaining()
+        )
+    except FutureTimeoutError:
+        dialogflow_response = None
+    
+    if dialogflow_response:
+        record_response_source("dialogflow")
+        return {"response": dialogflow_response["response"], "source": "dialogflow"}
+    
+    # Knowledge base passages answer locally, before spending a ChatGPT call
+    knowledge_base_response = search_knowledge_base(message_text)
+    if knowledge_base_response:
+        record_response_source("knowledge_base")
+        return {"response": knowledge_base_response["response"], "source": "knowledge_base"}
+    
+    # If OpenAI quota not exceeded, try ChatGPT
+    if not is_openai_quota_exceeded():
+        try:
+            # Upset customers and urgent intents get LLM slots first when ChatGPT is saturated
+            if sentiment is None:
+                sentiment = analyze_sentiment(message_text)[0]
+            if intents is None:
+                intents = extract_intent_keywords(message_text)
+            if priority is None:
+                priority = request_priority(sentiment, intents, "telegram")
+            chatgpt_response = ask_openai_coalesced(
+                make_key(message_text, *[turn["content"] for turn in history or []]),
+                message_text, history, user_id=f"telegram:{chat_id}", wait_timeout=deadline.remaining(),
+                deadline=deadline, priority=priority, channel="telegram", sentiment=sentiment, intents=intents
+            )
+            if chatgpt_response and chatgpt_response["source"] == "chatgpt":
+                record_response_source("chatgpt")
+                return {"response": chatgpt_response["response"], "source": "chatgpt"}
+        except:
+            pass
+    
+    # Fallback to smart response
+    smart_response = get_smart_response(message_text)
+    if smart_response:
+        record_response_source(smart_response["source"])
+        return {"response": smart_response["response"], "source": smart_response["source"]}
+    
+    # Final fallback
+    record_response_source("fallback")
+    return {
+        "response": "I'm here to help! Please contact our support team at 1-800-SUPPORT for immediate assistance.",
+        "source": "fallback"
+    }
+
+
+# ---------- ENHANCED CHAT LOGIC ----------
+def get_response_with_smart_fallback(user_input, conversation_history=None, deadline=None, session_id=DEFAULT_SESSION_ID,
+                                     priority=DEFAULT_PRIORITY, user_id=None, sentiment=None, intents=None):
+    """Enhanced response logic with smart fallback based on quota status"""
+    openai_quota_exceeded = is_openai_quota_exceeded()
+    
+    # Every stage below works against one end-to-end budget
+    if deadline is None:
+        deadline = Deadline(RESPONSE_DEADLINE_SECONDS)
+    record_request()
+    
+    # Hedged mode: when no canned or knowledge base answer would catch a Dialogflow miss, race ChatGPT against it
+    if (HEDGED_DISPATCH_ENABLED and not openai_quota_exceeded and get_smart_response(user_input) is None
+            and search_knowledge_base(user_input) is None):
+        response, _ = get_hedged_dispatcher().dispatch(
+            lambda: detect_intent_text(session_id, user_input, deadline=deadline),
+            lambda: ask_openai(
+                user_input, conversation_history, deadline=deadline, priority=priority, user_id=user_id,
+                sentiment=sentiment, intents=intents
+            ),
+            accept_primary=lambda result: result is not None,
+            # No intent keywords at all means Dialogflow is unlikely to match - hedge right away
+            immediate=not (extract_intent_keywords(user_input) if intents is None else intents)
+        )
+        return response
+    
+    # Always try Dialogflow first
+    dialogflow_response = detect_intent_text(session_id, user_input, deadline=deadline)
+    
+    if dialogflow_response:
+        return dialogflow_response
+    
+    # If OpenAI quota exceeded, skip ChatGPT and use smart responses
+    if openai_quota_exceeded:
+        smart_response = get_smart_response(user_input) or search_knowledge_base(user_input)
+        if smart_response:
+            return smart_response
+        else:
+            return {
+                "response": """I understand you need help! Our advanced AI is temporarily unavailable, but I can still assist you with:
+
+📞 **Call Support:** 1-800-SUPPORT (24/7)
+📧 **Email:** support@company.com
+💬 **Live Chat:** Available on our website
+⏰ **Business Hours:** Mon-Fri 8AM-8PM EST
+
+For immediate assistance, please contact our human support team!""",
+                "source": "fallback",
+                "confidence": 0.0
+            }
+    
+    # Try smart response system
+    smart_response = get_smart_response(user_input)
+    if smart_response:
+        return smart_response
+    
+    # Then the knowledge base
+    knowledge_base_response = search_knowledge_base(user_input)
+    if knowledge_base_response:
+        return knowledge_base_response
+    
+    # Fallback to ChatGPT (if quota not exceeded and budget is left)
+    try:
+        return ask_openai(
+            user_input, conversation_history, deadline=deadline, priority=priority, user_id=user_id,
+            sentiment=sentiment, intents=intents
+        )
+    except:
+        return {
+            "response": "I apologize, but I'm having trouble processing your request right now. Please try again in a moment or contact our human support team for immediate assistance.",
+            "source": "fallback",
+            "confidence": 0.0
+        }
+
+
+# ---------- CACHE WARM-UP ----------
+def fixed_warmup_prompts():
+    """Button prompts that reach ChatGPT (quick actions whose topic has no smart response, test prompts)"""
+    config = response_config.current()
+    return [prompt for topic, prompt in QUICK_ACTION_PROMPTS if config.smart_response(topic) is None] + TEST_PROMPTS
+
+
+def collect_warmup_prompts():
+    """Fixed button prompts first, then the most frequent stored user questions"""
+    prompts = fixed_warmup_prompts()
+    if CHAT_MEMORY_SPILL_DB and CACHE_WARMUP_TOP_QUERIES:
+        prompts += [text for text, _ in get_telegram_memory().spill.top_user_messages(CACHE_WARMUP_TOP_QUERIES)]
+    unique = {}
+    for prompt in prompts:
+        unique.setdefault(make_key(prompt), prompt)
+    return list(unique.values())
+
+
+def _answered_without_chatgpt(prompt):
+    # The buttons always call ChatGPT; chat messages are answered by smart responses or the knowledge base first
+    if prompt in fixed_warmup_prompts():
+        return False
+    if response_config.current().smart_rule(prompt) is not None:
+        return True
+    results = get_knowledge_base().search(prompt)
+    return bool(results) and results[0][0] >= KNOWLEDGE_BASE_MIN_SCORE
+
+
+def _estimate_warmup_tokens(prompt):
+    # Worst case for the route: full answer length plus the system prompt and the question
+    return model_router.route(prompt)["max_tokens"] + 100 + 2 * len(prompt.split())
+
+
+def start_cache_warmup(service=False):
+    """Start the background warm-up once per process (and one process at a time)
+
+    In-process engines only warm up when the shared state is cross-process: with the default
+    memory:// backend every Streamlit server, bot and shard would otherwise spend its own
+    token budget. engine_server.py (service=True) is one process serving every client.
+    """
+    global _cache_warmer
+    if not CACHE_WARMUP_ENABLED:
+        return None
+    with _resource_lock:
+        if _cache_warmer is not None:
+            return _cache_warmer
+        _cache_warmer = CacheWarmer(
+            ask=lambda prompt, seconds_left: ask_openai(
+                prompt, deadline=Deadline(seconds_left), priority=request_priority(channel="warmup"), channel="warmup"
+            ),
+            is_cached=openai_cache.contains,
+            answered_locally=_answered_without_chatgpt,
+            estimate_tokens=_estimate_warmup_tokens,
+            time_budget=CACHE_WARMUP_TIME_BUDGET_SECONDS,
+            token_budget=CACHE_WARMUP_TOKEN_BUDGET
+        )
+    if not service and isinstance(shared_state, InMemorySharedState):
+        _cache_warmer.skip("SHARED_STATE_URL is process-local; warm up in engine_server.py or use sqlite://")
+        return _cache_warmer
+    # Processes sharing the state backend share the cache, so one warm-up is enough
+    lock_ttl = CACHE_WARMUP_TIME_BUDGET_SECONDS + RESPONSE_DEADLINE_SECONDS
+    if shared_state.compare_and_set(CACHE_WARMUP_LOCK_KEY, None, os.getpid(), ttl=lock_ttl):
+        _cache_warmer.start(collect_warmup_prompts)
+    else:
+        _cache_warmer.skip("another engine process is warming the shared cache")
+    return _cache_warmer
+
+
+# ---------- ENGINE API ----------
+def prior_turns(user_input, conversation_history):
+    """History without the current message, which callers like the web app append before asking"""
+    turns = list(conversation_history or [])
+    if turns and turns[-1].get("role") == "user" and turns[-1].get("content") == user_input:
+        turns.pop()
+    return turns
+
+
+def respond(user_input, conversation_history=None, session_id=DEFAULT_SESSION_ID, sentiment=None, intents=None):
+    """Answer one web chat message and count it in the global stats
+
+    Callers that already analyzed the message pass its sentiment and intents. Otherwise the
+    queue priority comes from cheap signals, and the full sentiment analysis for the rollups
+    runs after the reply, off the request path (the web app analyzes the message itself, in
+    parallel with this call).
+    """
+    record_global_stat("total_messages")
+    # ask_openai adds the prompt itself; a first message then also hits the shared cache
+    conversation_history = prior_turns(user_input, conversation_history)
+    started = time.perf_counter()
+    with span("pipeline") as pipeline_span:
+        if intents is None:
+            intents = extract_intent_keywords(user_input)
+        hint = sentiment or quick_sentiment(user_input)
+        response = get_response_with_smart_fallback(
+            user_input, conversation_history, session_id=session_id, priority=request_priority(hint, intents, "web"),
+            user_id=session_id, sentiment=hint, intents=intents
+        )
+        pipeline_span["source"] = response["source"]
+    record_response_source(response["source"])
+    get_batch_pool().submit(
+        record_traffic, "web", session_id, user_input, response["source"], sentiment, intents, time.perf_counter() - started
+    )
+    return response
+
+
+def respond_batch(items):
+    """Answer several {"text", "history", "session_id"} requests concurrently, results in order"""
+    futures = [
+        get_batch_pool().submit(
+            respond, item["text"], item.get("history"), item.get("session_id", DEFAULT_SESSION_ID),
+            sentiment=item.get("sentiment"), intents=item.get("intents")
+        )
+        for item in items
+    ]
+    return [future.result() for future in futures]
+
+
+def open_support_ticket(user_id, user_message, sentiment, intent, channel="web"):
+    """Queue an escalation ticket; returns immediately with its number (and whether it repeats an open one)"""
+    return get_ticket_store().create(user_id, user_message, sentiment, intent, channel)
+
+
+def list_support_tickets(status=None, priority=None, user_id=None, limit=50):
+    """Newest tickets plus counts by status and open tickets by priority"""
+    store = get_ticket_store()
+    return {
+        "tickets": store.list_tickets(status=status, priority=priority, user_id=user_id, limit=limit),
+        "counts": store.counts()
+    }
+
+
+def get_rollup_report(resolution="minute", window=60):
+    """Traffic series and totals for the last `window` minutes or hours"""
+    return rollups.report(resolution, window)
+
+
+def get_sketch_report(days=7, top=20):
+    """Distinct users per day and the most frequent queries that fell through to ChatGPT or the fallback"""
+    return get_sketch_store().report(days, top)
+
+
+def answer_quick_action(topic, prompt, user_id=None):
+    """Canned answer for a quick-action topic, else ChatGPT on the full prompt"""
+    return get_smart_response(topic) or ask_openai(
+        prompt, priority=request_priority(channel="quick_action"), channel="quick_action", user_id=user_id
+    )
+
+
+def answer_test_prompt(prompt, conversation_history=None, user_id=None):
+    """ChatGPT answer for the test buttons; lowest priority, shed first under load"""
+    return ask_openai(
+        prompt, conversation_history, priority=request_priority(channel="test"), channel="test", user_id=user_id
+    )
+
+
+def get_engine_stats():
+    """Process-local pipeline stats plus the shared global counters"""
+    return {
+        "global": get_global_stats(),
+        "openai_cache": openai_cache.get_stats(),
+        "openai_quota_exceeded": is_openai_quota_exceeded(),
+        "deadline": dict(get_deadline_stats(), budget_seconds=RESPONSE_DEADLINE_SECONDS),
+        "generic_filter": response_config.current().generic_detector.get_stats(),
+        "response_config": response_config.get_stats(),
+        "singleflight": get_singleflight_stats(),
+        "admission": get_admission_controller().get_stats(),
+        "openai_usage": usage_limiter.get_usage(),
+        "routes": model_router.get_stats(),
+        "latency": tracer.get_stats(),
+        "telegram_memory": get_telegram_memory().get_stats(),
+        "knowledge_base": _knowledge_base.get_stats() if _knowledge_base is not None else None,
+        "warmup": _cache_warmer.get_stats() if _cache_warmer is not None else None,
+        "tickets": get_ticket_store().get_stats(),
+        "sketches": get_sketch_store().get_stats(),
+        "hedge": get_hedged_dispatcher().get_stats() if HEDGED_DISPATCH_ENABLED else None
+    }
@@ -0,0 +1,287 @@
+"""
+Shared state backend
+One interface for state several processes must agree on (OpenAI quota circuit, response
+cache entries, global counters, Telegram offset): atomic counters, TTL keys and
+compare-and-set. InMemorySharedState serves a single process; SQLiteSharedState lets
+every local process (Streamlit servers, telegram_bot.py, workers) share one file.
+
+Select the backend with SHARED_STATE_URL:
+    memory://                      (default)
+    sqlite:///path/to/state.db
+"""
+
+import itertools
+import json
+import os
+import sqlite3
+import threading
+import time
+
+_MISSING = object()
+
+# Expired keys are otherwise only dropped when read again; sweep them every N writes
+PURGE_EVERY_WRITES = 1000
+
+
+class SharedState:
+    """Key/value interface; values must be JSON serializable"""
+
+    def __init__(self):
+        self._writes = itertools.count(1)
+
+    def _wrote(self):
+        """Count a write; every PURGE_EVERY_WRITES writes, sweep out expired keys"""
+        if next(self._writes) % PURGE_EVERY_WRITES == 0:
+            self.purge_expired()
+
+    def purge_expired(self):
+        """Delete expired keys; returns the number removed"""
+        raise NotImplementedError
+
+    def get(self, key, default=None):
+        raise NotImplementedError
+
+    def set(self, key, value, ttl=None):
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def incr(self, key, amount=1, ttl=None):
+        """Atomically add `amount` and return the new value (ttl applies when the key is created)"""
+        raise NotImplementedError
+
+    def compare_and_set(self, key, expected, value, ttl=None):
+        """Set key to value only if it currently equals `expected` (None = absent); returns success"""
+        raise NotImplementedError
+
+    def get_prefix(self, prefix):
+        """All live keys starting with `prefix`"""
+        raise NotImplementedError
+
+
+class InMemorySharedState(SharedState):
+    """Process-local implementation (threads only)"""
+
+    def __init__(self):
+        super().__init__()
+        self._lock = threading.Lock()
+        self._data = {}  # key -> (value, expires_at or None)
+
+    def _live(self, key, now):
+        entry = self._data.get(key)
+        if entry is None:
+            return _MISSING
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= now:
+            del self._data[key]
+            return _MISSING
+        return value
+
+    def get(self, key, default=None):
+        with self._lock:
+            value = self._live(key, time.time())
+        return default if value is _MISSING else value
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._data[key] = (value, time.time() + ttl if ttl else None)
+        self._wrote()
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def incr(self, key, amount=1, ttl=None):
+        with self._lock:
+            now = time.time()
+            current = self._live(key, now)
+            if current is _MISSING:
+                value, expires_at = amount, (now + ttl if ttl else None)
+            else:
+                value, expires_at = current + amount, self._data[key][1]
+            self._data[key] = (value, expires_at)
+        self._wrote()
+        return value
+
+    def compare_and_set(self, key, expected, value, ttl=None):
+        with self._lock:
+            now = time.time()
+            current = self._live(key, now)
+            if (None if current is _MISSING else current) != expected:
+                return False
+            self._data[key] = (value, now + ttl if ttl else None)
+        self._wrote()
+        return True
+
+    def purge_expired(self):
+        with self._lock:
+            now = time.time()
+            expired = [key for key, (_, expires_at) in self._data.items() if expires_at is not None and expires_at <= now]
+            for key in expired:
+                del self._data[key]
+        return len(expired)
+
+    def get_prefix(self, prefix):
+        with self._lock:
+            now = time.time()
+            keys = [key for key in self._data if key.startswith(prefix)]
+            values = {key: self._live(key, now) for key in keys}
+        return {key: value for key, value in values.items() if value is not _MISSING}
+
+
+class SQLiteSharedState(SharedState):
+    """Cross-process implementation on one SQLite file (WAL mode, one connection per thread)"""
+
+    def __init__(self, path):
+        super().__init__()
+        self.path = path
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS shared_state (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                expires_at REAL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_shared_state_expires ON shared_state (expires_at)")
+        conn.commit()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _read(conn, key, now):
+        row = conn.execute("SELECT value, expires_at FROM shared_state WHERE key = ?", (key,)).fetchone()
+        if row is None or (row[1] is not None and row[1] <= now):
+            return _MISSING, None
+        return json.loads(row[0]), row[1]
+
+    @staticmethod
+    def _write(conn, key, value, expires_at):
+        conn.execute(
+            "INSERT OR REPLACE INTO shared_state (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, json.dumps(value), expires_at)
+        )
+
+    def _atomic(self, fn):
+        """Run fn(conn, now) in a write transaction so read-modify-write is atomic across processes"""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = fn(conn, time.time())
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return result
+
+    def get(self, key, default=None):
+        value, _ = self._read(self._conn(), key, time.time())
+        return default if value is _MISSING else value
+
+    def set(self, key, value, ttl=None):
+        self._write(self._conn(), key, value, time.time() + ttl if ttl else None)
+        self._wrote()
+
+    def delete(self, key):
+        self._conn().execute("DELETE FROM shared_state WHERE key = ?", (key,))
+
+    def incr(self, key, amount=1, ttl=None):
+        def apply(conn, now):
+            current, expires_at = self._read(conn, key, now)
+            if current is _MISSING:
+                value, expires_at = amount, (now + ttl if ttl else None)
+            else:
+                value = current + amount
+            self._write(conn, key, value, expires_at)
+            return value
+        value = self._atomic(apply)
+        self._wrote()
+        return value
+
+    def compare_and_set(self, key, expected, value, ttl=None):
+        def apply(conn, now):
+            current, _ = self._read(conn, key, now)
+            if (None if current is _MISSING else current) != expected:
+                return False
+            self._write(conn, key, value, now + ttl if ttl else None)
+            return True
+        swapped = self._atomic(apply)
+        if swapped:
+            self._wrote()
+        return swapped
+
+    def get_prefix(self, prefix):
+        now = time.time()
+        # Escape LIKE wildcards so prefixes match literally
+        pattern = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        rows = self._conn().execute(
+            "SELECT key, value FROM shared_state WHERE key LIKE ? ESCAPE '\\' AND (expires_at IS NULL OR expires_at > ?)",
+            (pattern, now)
+        ).fetchall()
+        return {key: json.loads(value) for key, value in rows}
+
+    def purge_expired(self):
+        """Delete expired keys; returns the number removed"""
+        cursor = self._conn().execute(
+            "DELETE FROM shared_state WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),)
+        )
+        return cursor.rowcount
+
+
+def create_shared_state(url=None):
+    """Build a backend from a URL (memory:// or sqlite:///path)"""
+    url = url or os.getenv("SHARED_STATE_URL", "memory://")
+    if url.startswith("memory://"):
+        return InMemorySharedState()
+    if url.startswith("sqlite:///"):
+        return SQLiteSharedState(url[len("sqlite:///"):])
+    raise ValueError(f"Unsupported SHARED_STATE_URL: {url}")
+
+
+_shared_state = None
+_shared_state_lock = threading.Lock()
+
+
+def get_shared_state():
+    """Process-wide backend configured by SHARED_STATE_URL"""
+    global _shared_state
+    with _shared_state_lock:
+        if _shared_state is None:
+            _shared_state = create_shared_state()
+    return _shared_state
+
+
+# ---------- GLOBAL STATS ----------
+GLOBAL_STAT_KEYS = ["total_messages", "dialogflow_responses", "chatgpt_responses", "knowledge_base_responses",
+                    "fallback_responses"]
+
+
+def record_global_stat(name, amount=1):
+    """Count towards stats shared by every session and process"""
+    get_shared_state().incr(f"stats:global:{name}", amount)
+
+
+def record_response_source(source):
+    """Global counter for the source that answered a message"""
+    if source == "dialogflow":
+        record_global_stat("dialogflow_responses")
+    elif source == "chatgpt":
+        record_global_stat("chatgpt_responses")
+    elif source == "knowledge_base":
+        record_global_stat("knowledge_base_responses")
+    else:
+        record_global_stat("fallback_responses")
+
+
+def get_global_stats():
+    state = get_shared_state()
+    return {name: state.get(f"stats:global:{name}", 0) for name in GLOBAL_STAT_KEYS}
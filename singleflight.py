@@ -0,0 +1,122 @@
+"""
+Single-flight request coalescing
+Concurrent identical calls (same normalized key) share one in-flight backend call.
+Works for threaded callers (do) and asyncio callers (do_async). Keys must include
+everything the result depends on (e.g. the session for session-scoped calls).
+"""
+
+import asyncio
+import copy
+import re
+import threading
+from concurrent.futures import Future, TimeoutError
+
+
+def make_key(*parts):
+    """Build a coalescing key from normalized text parts (case and whitespace insensitive)"""
+    normalized = []
+    for part in parts:
+        if part is None:
+            normalized.append("")
+        else:
+            normalized.append(re.sub(r"\s+", " ", str(part)).strip().lower())
+    return "\x1f".join(normalized)
+
+
+class SingleFlight:
+    """Share the result of one in-flight call between all concurrent callers with the same key"""
+
+    def __init__(self, name="singleflight"):
+        self.name = name
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self._stats = {"calls": 0, "executed": 0, "coalesced": 0, "errors": 0, "wait_timeouts": 0}
+
+    def _join_or_lead(self, key):
+        """Return (future, is_leader) for `key`"""
+        with self._lock:
+            self._stats["calls"] += 1
+            future = self._in_flight.get(key)
+            if future is not None:
+                self._stats["coalesced"] += 1
+                return future, False
+            future = Future()
+            self._in_flight[key] = future
+            self._stats["executed"] += 1
+            return future, True
+
+    def _finish(self, key, future, result=None, error=None):
+        with self._lock:
+            self._in_flight.pop(key, None)
+            if error is not None:
+                self._stats["errors"] += 1
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def _count_timeout(self):
+        with self._lock:
+            self._stats["wait_timeouts"] += 1
+
+    def do(self, key, fn, *args, wait_timeout=None, **kwargs):
+        """Run fn(*args, **kwargs) unless an identical call is in flight, then wait for its result
+
+        A waiter gives up after wait_timeout seconds (TimeoutError); the leader's call is not affected.
+        """
+        future, is_leader = self._join_or_lead(key)
+        if not is_leader:
+            try:
+                result = future.result(timeout=wait_timeout)
+            except TimeoutError:
+                self._count_timeout()
+                raise
+            # Callers may decorate the result dict, so each waiter gets its own copy
+            return copy.copy(result)
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            self._finish(key, future, error=e)
+            raise
+        self._finish(key, future, result=result)
+        return result
+
+    async def do_async(self, key, coro_fn, *args, wait_timeout=None, **kwargs):
+        """Asyncio variant of do(); shares in-flight calls with threaded callers too"""
+        future, is_leader = self._join_or_lead(key)
+        if not is_leader:
+            try:
+                # shield: a waiter timing out must not cancel the leader's shared future
+                result = await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), wait_timeout)
+            except asyncio.TimeoutError:
+                self._count_timeout()
+                raise
+            return copy.copy(result)
+        try:
+            result = await coro_fn(*args, **kwargs)
+        except BaseException as e:
+            self._finish(key, future, error=e)
+            raise
+        self._finish(key, future, result=result)
+        return result
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._in_flight)
+
+    def get_stats(self):
+        """Snapshot of coalescing counters"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["in_flight"] = len(self._in_flight)
+        return stats
+
+
+# Shared groups for the backend calls
+dialogflow_flight = SingleFlight("dialogflow")
+openai_flight = SingleFlight("openai")
+
+
+def get_singleflight_stats():
+    """Counters for every backend group, keyed by group name"""
+    return {group.name: group.get_stats() for group in (dialogflow_flight, openai_flight)}
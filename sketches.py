@@ -0,0 +1,279 @@
+"""
+Probabilistic traffic sketches
+Counting distinct users and the most frequent unanswered questions exactly would mean
+keeping every chat id and every message text. Instead:
+
+    HyperLogLog  distinct users per day in 2^HLL_PRECISION one-byte registers (16 KB,
+                 about 0.8% standard error), merged by taking the register-wise max
+    SpaceSaving  the TOP_QUERIES_CAPACITY most frequent normalized queries that fell
+                 through to ChatGPT or the fallback, each with an upper bound on its
+                 overcount; merged by adding counts and keeping the heaviest entries
+
+Each process adds to small in-memory sketches and a flusher thread folds them into a
+SQLite file (SKETCH_DB) every SKETCH_FLUSH_SECONDS, merging with what other processes wrote
+inside one write transaction. Readers merge the stored sketches with the pending local
+ones, so their numbers include this process's latest traffic.
+"""
+
+import atexit
+import hashlib
+import heapq
+import json
+import math
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+
+HLL_PRECISION = 14
+TOP_QUERIES_CAPACITY = 1000
+SKETCH_RETENTION_DAYS = 30
+MAX_QUERY_CHARS = 200
+
+
+def normalize_query(text):
+    """Lowercase words only, so "Where is my order?!" and "where is my order" count together"""
+    return " ".join(re.sub(r"[^\w\s]", " ", text.lower()).split())[:MAX_QUERY_CHARS]
+
+
+def _hash64(item):
+    return int.from_bytes(hashlib.blake2b(str(item).encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class HyperLogLog:
+    """Distinct-count estimator; add() and merge() are idempotent"""
+
+    def __init__(self, precision=HLL_PRECISION, registers=None):
+        self.precision = precision
+        self.size = 1 << precision
+        self.registers = bytearray(registers) if registers is not None else bytearray(self.size)
+
+    def add(self, item):
+        value = _hash64(item)
+        index = value >> (64 - self.precision)
+        rest = value & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other):
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge HyperLogLogs of different precision")
+        self.registers = bytearray(max(a, b) for a, b in zip(self.registers, other.registers))
+
+    def count(self):
+        alpha = 0.7213 / (1 + 1.079 / self.size)
+        estimate = alpha * self.size * self.size / sum(2.0 ** -register for register in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * self.size and zeros:
+            return round(self.size * math.log(self.size / zeros))  # linear counting for small sets
+        return round(estimate)
+
+    def to_bytes(self):
+        return bytes([self.precision]) + bytes(self.registers)
+
+    @classmethod
+    def from_bytes(cls, data):
+        return cls(precision=data[0], registers=data[1:])
+
+
+class SpaceSaving:
+    """Top-K heavy hitters in bounded memory; counts overestimate by at most `error`"""
+
+    def __init__(self, capacity=TOP_QUERIES_CAPACITY):
+        self.capacity = capacity
+        self.counters = {}  # item -> [count, error]
+        self._heap = []  # (count, item), stale entries skipped lazily
+
+    def add(self, item, amount=1):
+        counter = self.counters.get(item)
+        if counter is None:
+            if len(self.counters) < self.capacity:
+                counter = self.counters[item] = [0, 0]
+            else:
+                # Replace the smallest counter; the newcomer inherits its count as possible overcount
+                smallest, evicted = self._pop_min()
+                del self.counters[evicted]
+                counter = self.counters[item] = [smallest, smallest]
+        counter[0] += amount
+        heapq.heappush(self._heap, (counter[0], item))
+        if len(self._heap) > 4 * self.capacity:
+            self._heap = [(count, key) for key, (count, _) in self.counters.items()]
+            heapq.heapify(self._heap)
+
+    def _pop_min(self):
+        while True:
+            count, item = heapq.heappop(self._heap)
+            counter = self.counters.get(item)
+            if counter is not None and counter[0] == count:
+                return count, item
+
+    def merge(self, other):
+        """Combine two summaries (an item missing from one side counts that side's minimum)"""
+        self_min = self._minimum()
+        other_min = other._minimum()
+        merged = {}
+        for item in set(self.counters) | set(other.counters):
+            count_a, error_a = self.counters.get(item, (self_min, self_min))
+            count_b, error_b = other.counters.get(item, (other_min, other_min))
+            merged[item] = [count_a + count_b, error_a + error_b]
+        top = heapq.nlargest(self.capacity, merged.items(), key=lambda entry: entry[1][0])
+        self.counters = dict(top)
+        self._heap = [(count, item) for item, (count, _) in self.counters.items()]
+        heapq.heapify(self._heap)
+
+    def _minimum(self):
+        # Only a full summary can have dropped items
+        if len(self.counters) < self.capacity:
+            return 0
+        return min(count for count, _ in self.counters.values())
+
+    def top(self, limit=20):
+        """[(item, count, error)] heaviest first"""
+        entries = heapq.nlargest(limit, self.counters.items(), key=lambda entry: entry[1][0])
+        return [(item, count, error) for item, (count, error) in entries]
+
+    def to_bytes(self):
+        return json.dumps({"capacity": self.capacity, "counters": self.counters}, ensure_ascii=False).encode("utf-8")
+
+    @classmethod
+    def from_bytes(cls, data):
+        payload = json.loads(data)
+        summary = cls(payload["capacity"])
+        summary.counters = payload["counters"]
+        summary._heap = [(count, item) for item, (count, _) in summary.counters.items()]
+        heapq.heapify(summary._heap)
+        return summary
+
+
+SKETCH_TYPES = {"users": HyperLogLog, "fallthrough": SpaceSaving}
+
+
+def day_key(now=None):
+    """UTC day the sketches are bucketed by"""
+    return datetime.fromtimestamp(time.time() if now is None else now, timezone.utc).strftime("%Y-%m-%d")
+
+
+class SketchStore:
+    """Per-day sketches: local deltas in memory, merged into SQLite by a flusher thread"""
+
+    def __init__(self, path="sketches.db", flush_seconds=10.0, retention_days=SKETCH_RETENTION_DAYS):
+        self.path = path
+        self.flush_seconds = flush_seconds
+        self.retention_days = retention_days
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS sketches (
+                kind TEXT NOT NULL,
+                day TEXT NOT NULL,
+                data BLOB NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (kind, day)
+            )
+        """)
+        self._conn.commit()
+        self._pending = {}  # (kind, day) -> sketch added to since the last flush
+        self._stats = {"flushes": 0, "flush_errors": 0, "last_flush_at": None}
+        self._flusher = None
+        if flush_seconds > 0:
+            self._flusher = threading.Thread(target=self._flush_loop, name="sketch-flusher", daemon=True)
+            self._flusher.start()
+        atexit.register(self.flush)
+
+    def _local(self, kind, day):
+        sketch = self._pending.get((kind, day))
+        if sketch is None:
+            sketch = self._pending[(kind, day)] = SKETCH_TYPES[kind]()
+        return sketch
+
+    def add_user(self, user_id, now=None):
+        with self._lock:
+            self._local("users", day_key(now)).add(str(user_id))
+
+    def add_fallthrough(self, query, now=None):
+        normalized = normalize_query(query)
+        if normalized:
+            with self._lock:
+                self._local("fallthrough", day_key(now)).add(normalized)
+
+    # ---------- persistence ----------
+    def _read(self, kind, day):
+        row = self._conn.execute("SELECT data FROM sketches WHERE kind = ? AND day = ?", (kind, day)).fetchone()
+        return SKETCH_TYPES[kind].from_bytes(row[0]) if row else None
+
+    def flush(self):
+        """Merge the local deltas into the file; other processes' contributions are kept"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return True
+        cutoff = day_key(time.time() - self.retention_days * 86400)
+        with self._db_lock:
+            try:
+                self._conn.execute("BEGIN IMMEDIATE")
+                for (kind, day), sketch in pending.items():
+                    stored = self._read(kind, day)
+                    if stored is not None:
+                        stored.merge(sketch)
+                        sketch = stored
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO sketches (kind, day, data, updated_at) VALUES (?, ?, ?, ?)",
+                        (kind, day, sketch.to_bytes(), time.time())
+                    )
+                self._conn.execute("DELETE FROM sketches WHERE day < ?", (cutoff,))
+                self._conn.commit()
+            except sqlite3.Error as e:
+                self._conn.rollback()
+                print(f"⚠️ Sketch flush failed, keeping the deltas for the next one: {str(e)}")
+                with self._lock:
+                    for key, sketch in pending.items():
+                        self._local(*key).merge(sketch)
+                    self._stats["flush_errors"] += 1
+                return False
+        with self._lock:
+            self._stats["flushes"] += 1
+            self._stats["last_flush_at"] = datetime.now().isoformat(timespec="seconds")
+        return True
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_seconds)
+            self.flush()
+
+    # ---------- reads ----------
+    def _merged(self, kind, days):
+        merged = SKETCH_TYPES[kind]()
+        with self._db_lock:
+            stored = [self._read(kind, day) for day in days]
+        with self._lock:
+            local = [self._pending.get((kind, day)) for day in days]
+        for sketch in stored + local:
+            if sketch is not None:
+                merged.merge(sketch)
+        return merged
+
+    def report(self, days=7, top=20, now=None):
+        """Distinct users per day (oldest first) and for the whole window, plus the top fall-through queries"""
+        now = time.time() if now is None else now
+        day_keys = [day_key(now - offset * 86400) for offset in range(days - 1, -1, -1)]
+        users_per_day = [{"day": day, "users": self._merged("users", [day]).count()} for day in day_keys]
+        return {
+            "days": day_keys,
+            "users_per_day": users_per_day,
+            "users_total": self._merged("users", day_keys).count(),
+            "top_fallthrough": [
+                {"query": query, "count": count, "error": error}
+                for query, count, error in self._merged("fallthrough", day_keys).top(top)
+            ]
+        }
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["pending"] = len(self._pending)
+        return stats
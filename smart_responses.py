@@ -0,0 +1,120 @@
+"""
+Smart responses
+Built-in canned answers for common support topics, used when Dialogflow misses and ChatGPT
+is unavailable or not needed. Rules are plain data tried in order; the first rule with a
+keyword contained in the message wins. response_config.py compiles them (or the rules from
+the response config file) into the matchers the engine uses.
+"""
+
+SMART_RESPONSES = [
+    {
+        "topic": "greeting",
+        "keywords": ['hello', 'hi', 'hey', 'good morning', 'good afternoon', 'good evening'],
+        "response": "Hello! 👋 I'm your AI-powered support assistant. I'm here to help you with any questions about our products, services, or support needs. How can I assist you today?",
+        "confidence": 0.95
+    },
+    {
+        "topic": "help",
+        "keywords": ['help', 'support', 'assist', 'what can you do', 'how can you help'],
+        "response": """I'm your comprehensive support assistant! Here's what I can help you with:
+
+🔍 **Product Information** - Find details, pricing, and availability
+📦 **Order Management** - Track orders, check status, and manage deliveries
+🔄 **Returns & Refunds** - Process returns and handle refunds
+🔧 **Technical Support** - Troubleshoot issues and provide solutions
+📞 **Contact Information** - Connect you with the right team
+⏰ **Business Hours** - Check availability and support times
+💳 **Payment & Billing** - Handle payment issues and billing questions
+
+What would you like to know about?""",
+        "confidence": 0.9
+    },
+    {
+        "topic": "product",
+        "keywords": ['product', 'item', 'buy', 'purchase', 'price', 'cost', 'available'],
+        "response": "I'd be happy to help you with product information! Could you please specify which product or category you're interested in? I can provide details about pricing, features, availability, and help you make the best choice.",
+        "confidence": 0.85
+    },
+    {
+        "topic": "order",
+        "keywords": ['order', 'tracking', 'shipping', 'delivery', 'when', 'status', 'where is my'],
+        "response": """To check your order status, I'll need your order number. Here's how to find it:
+
+📧 **Email Confirmation** - Check your email for order confirmation
+📱 **Account Dashboard** - Log into your account to view order history
+📞 **Phone Support** - Call us at 1-800-SUPPORT with your order number
+
+Once you have your order number, I can help you track its status and estimated delivery date. Do you have your order number handy?""",
+        "confidence": 0.9
+    },
+    {
+        "topic": "returns",
+        "keywords": ['return', 'refund', 'exchange', 'cancel', 'send back', 'money back'],
+        "response": """Our return and refund policy is designed to make things easy for you:
+
+✅ **30-Day Return Window** - Return items within 30 days of purchase
+📦 **Free Return Shipping** - We cover all return shipping costs
+💳 **Full Refund** - Money back to your original payment method
+🔄 **Easy Process** - Use our online return portal or contact support
+
+To start a return, I'll need your order number and the reason for return. Do you have your order details ready?""",
+        "confidence": 0.9
+    },
+    {
+        "topic": "technical",
+        "keywords": ['technical', 'broken', 'not working', 'error', 'problem', 'issue', 'trouble', 'fix'],
+        "response": """I'm sorry to hear you're experiencing technical issues. Let me help you troubleshoot:
+
+🔍 **Quick Troubleshooting Steps:**
+• Restart your device/browser
+• Clear cache and cookies
+• Check your internet connection
+• Try a different browser or device
+• Update to the latest version
+
+📞 **Still having issues?** I can connect you with our technical support team for personalized assistance.
+
+Could you describe the problem in detail so I can provide more specific help?""",
+        "confidence": 0.85
+    },
+    {
+        "topic": "contact",
+        "keywords": ['contact', 'phone', 'email', 'speak', 'human', 'agent', 'talk to someone'],
+        "response": """You can reach our customer service team through multiple channels:
+
+📞 **Phone Support:** 1-800-SUPPORT (24/7)
+📧 **Email:** support@company.com
+💬 **Live Chat:** Available on our website
+📱 **Mobile App:** Download our app for quick support
+
+⏰ **Business Hours:**
+Monday-Friday: 8 AM - 8 PM EST
+Saturday: 9 AM - 6 PM EST
+Sunday: 10 AM - 4 PM EST
+
+Would you like me to connect you with a human agent right now?""",
+        "confidence": 0.9
+    },
+    {
+        "topic": "hours",
+        "keywords": ['hours', 'open', 'closed', 'time', 'when', 'available', 'business hours'],
+        "response": """Our customer support is available:
+
+🕐 **Monday-Friday:** 8 AM - 8 PM EST
+🕐 **Saturday:** 9 AM - 6 PM EST
+🕐 **Sunday:** 10 AM - 4 PM EST
+
+📞 **24/7 Emergency Support:** Available for urgent technical issues
+💬 **Online Chat:** Available 24/7 for general inquiries
+
+We're here to help whenever you need us!""",
+        "confidence": 0.9
+    },
+    {
+        "topic": "goodbye",
+        "keywords": ['bye', 'goodbye', 'end', 'exit', 'see you', 'thank you', 'thanks'],
+        "response": "Thank you for chatting with us! Have a wonderful day! 👋 Feel free to come back anytime you need assistance. We're here to help!",
+        "confidence": 0.95
+    }
+]
+
@@ -0,0 +1,65 @@
+"""
+Concurrent request stages
+Independent per-message stages (sentiment, intent, language, backend call) run side by side
+on a shared thread pool, so a message costs max(stages) instead of their sum.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class StageRun:
+    """The stages of one request; join() waits for all of them"""
+
+    def __init__(self, pool, wrap=None):
+        self._pool = pool
+        self._wrap = wrap
+        self._futures = {}
+        self.timings = {}
+        self.started = time.monotonic()
+        self.finished = self.started
+
+    def submit(self, name, fn, *args, **kwargs):
+        """Start stage `name` as fn(*args, **kwargs)"""
+        if self._wrap is not None:
+            fn = self._wrap(fn)
+
+        def timed():
+            start = time.monotonic()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                end = time.monotonic()
+                self.timings[name] = round(end - start, 3)
+                self.finished = max(self.finished, end)
+
+        self._futures[name] = self._pool.submit(timed)
+
+    def result(self, name):
+        """Wait for a single stage and return its result (re-raises its exception)"""
+        return self._futures[name].result()
+
+    def join(self):
+        """Wait for every stage; returns {stage name: result}"""
+        results = {name: future.result() for name, future in self._futures.items()}
+        # Up to the last stage finishing, not to join() - callers may do other work in between
+        self.timings["total"] = round(self.finished - self.started, 3)
+        return results
+
+
+class StageExecutor:
+    """Process-wide thread pool for request stages"""
+
+    def __init__(self, max_workers=16):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="stage")
+
+    def start(self, wrap=None):
+        """Begin a new request; `wrap` decorates each stage callable (e.g. to bind thread context)"""
+        return StageRun(self._pool, wrap)
+
+
+def format_timings(timings):
+    """Short human readable stage breakdown, slowest first"""
+    stages = [(name, seconds) for name, seconds in timings.items() if name != "total"]
+    stages.sort(key=lambda item: item[1], reverse=True)
+    return " • ".join(f"{name} {seconds:.2f}s" for name, seconds in stages)
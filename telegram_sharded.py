@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+"""
+Sharded Telegram Bot
+One ingestion process long-polls Telegram and routes every update to one of N worker
+processes by hashing chat_id, so each chat is always answered in order by the same worker.
+Only the standard library's multiprocessing is used; everything runs on one machine.
+
+A worker that exits or stops acknowledging updates for WORKER_ACK_TIMEOUT_SECONDS is
+replaced, and the updates it had not finished are handed to the new worker (an update that
+keeps killing its worker is dropped after MAX_DELIVERY_ATTEMPTS), so the committed offset
+keeps moving. Ingestion always polls past everything already dispatched, so a slow shard
+never holds back new messages for the others.
+
+Usage: python telegram_sharded.py --workers 4
+"""
+
+import argparse
+import json
+import multiprocessing as mp
+import os
+import time
+import zlib
+from collections import deque
+
+# Where the committed offset survives restarts of the ingestion process
+OFFSET_STATE_PATH = os.getenv("TELEGRAM_OFFSET_STATE", "telegram_offset.json")
+
+# A worker with updates pending and no acknowledgement for this long is considered hung
+WORKER_ACK_TIMEOUT_SECONDS = float(os.getenv("TELEGRAM_WORKER_ACK_TIMEOUT", "120"))
+# Deliveries of the update a worker died or hung on before it is skipped
+MAX_DELIVERY_ATTEMPTS = 3
+
+# Per-worker metric slots (shared double array, one row per worker)
+METRIC_FIELDS = ["processed", "errors", "busy_seconds", "last_latency"]
+
+
+def shard_for(chat_id, workers):
+    """Stable worker index for a chat (same chat -> same worker across restarts)"""
+    return zlib.crc32(str(chat_id).encode("utf-8")) % workers
+
+
+# ---------- OFFSET COORDINATION ----------
+class OffsetCoordinator:
+    """
+    Tracks dispatched vs. handled update ids across workers.
+
+    Ingestion polls Telegram from poll_offset() (past everything dispatched), and Telegram
+    forgets every update below the offset it is polled with. The updates a worker has not
+    finished are therefore saved to the state file with the committed offset (which never
+    passes one of them) before each poll, and replayed from there after a restart.
+    """
+
+    def __init__(self, workers, state_path=OFFSET_STATE_PATH):
+        self.state_path = state_path
+        self.acked = mp.Array("q", workers)  # last update id each worker finished
+        self._pending = [deque() for _ in range(workers)]  # dispatched (update_id, chat_id, text, received_at)
+        committed, self.max_dispatched, self.recovered = self.load()
+        for index in range(workers):
+            self.acked[index] = committed
+
+    def load(self):
+        """(committed, max dispatched, unfinished updates) from the last save"""
+        try:
+            with open(self.state_path) as f:
+                state = json.load(f)
+            committed = int(state["committed"])
+            return committed, int(state.get("max_dispatched", committed)), [tuple(item) for item in state.get("inflight", [])]
+        except (OSError, ValueError, KeyError, TypeError):
+            return 0, 0, []
+
+    def save(self):
+        """Persist the committed offset and every unfinished update; returns the committed offset"""
+        committed = self.committed()
+        inflight = sorted(item for worker in range(len(self._pending)) for item in self._trim(worker))
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({
+                "committed": committed,
+                "max_dispatched": self.max_dispatched,
+                "inflight": inflight,
+                "saved_at": time.time()
+            }, f)
+        os.replace(tmp_path, self.state_path)
+        return committed
+
+    def poll_offset(self):
+        """getUpdates offset: past everything dispatched, however far behind a worker is"""
+        return self.max_dispatched + 1
+
+    def dispatched(self, worker, item):
+        self._pending[worker].append(item)
+        self.max_dispatched = max(self.max_dispatched, item[0])
+
+    def skip(self, update_id):
+        """Updates without a chat are handled by the ingestion process itself"""
+        self.max_dispatched = max(self.max_dispatched, update_id)
+
+    def _trim(self, worker):
+        pending, acked = self._pending[worker], self.acked[worker]
+        while pending and pending[0][0] <= acked:
+            pending.popleft()
+        return pending
+
+    def committed(self):
+        """Highest update id below which everything has been handled"""
+        committed = self.max_dispatched
+        for worker in range(len(self._pending)):
+            pending = self._trim(worker)
+            if pending:
+                committed = min(committed, pending[0][0] - 1)
+        return committed
+
+    def unacked(self, worker):
+        """Updates dispatched to a worker that it has not finished, oldest first"""
+        return list(self._trim(worker))
+
+    def drop(self, worker, update_id):
+        """Give up on an update; the committed offset moves past it"""
+        self._pending[worker] = deque(item for item in self._pending[worker] if item[0] != update_id)
+
+    def pending(self, worker):
+        return len(self._trim(worker))
+
+
+# ---------- WORKER PROCESS ----------
+def worker_main(index, inbox, acked, metrics):
+    """Answer updates for the chats hashed to this worker, strictly in arrival order"""
+    from telegram_bot import process_telegram_message, send_telegram_message
+
+    row = index * len(METRIC_FIELDS)
+    print(f"👷 Worker {index} started (pid {os.getpid()})")
+    while True:
+        item = inbox.get()
+        if item is None:
+            break
+        update_id, chat_id, text, received_at = item
+        start = time.monotonic()
+        try:
+            response = process_telegram_message(chat_id, text)
+            send_telegram_message(chat_id, response)
+        except Exception as e:
+            print(f"❌ Worker {index} error: {str(e)}")
+            with metrics.get_lock():
+                metrics[row + 1] += 1
+        finished = time.monotonic()
+        with metrics.get_lock():
+            metrics[row] += 1
+            metrics[row + 2] += finished - start
+            metrics[row + 3] = time.time() - received_at
+        acked[index] = update_id
+    print(f"👷 Worker {index} stopped")
+
+
+# ---------- INGESTION PROCESS ----------
+class ShardedBot:
+    """Ingestion loop plus its worker processes"""
+
+    def __init__(self, workers=4, poll_timeout=30, report_every=30, ack_timeout=WORKER_ACK_TIMEOUT_SECONDS):
+        self.workers = workers
+        self.poll_timeout = poll_timeout
+        self.report_every = report_every
+        self.ack_timeout = ack_timeout
+        self.coordinator = OffsetCoordinator(workers)
+        self.metrics = mp.Array("d", workers * len(METRIC_FIELDS))
+        self.inboxes = [mp.Queue() for _ in range(workers)]
+        self.processes = []
+        self.restarts = [0] * workers
+        self._last_acked = list(self.coordinator.acked)
+        self._last_progress = [time.monotonic()] * workers
+        self._attempts = {}  # update id -> deliveries, for updates a worker died or hung on
+
+    def _spawn(self, index):
+        process = mp.Process(
+            target=worker_main,
+            args=(index, self.inboxes[index], self.coordinator.acked, self.metrics),
+            name=f"telegram-worker-{index}",
+            daemon=True
+        )
+        process.start()
+        return process
+
+    def start_workers(self):
+        for index in range(self.workers):
+            self.processes.append(self._spawn(index))
+
+    def check_workers(self):
+        """Replace workers that exited or stopped acknowledging while they had updates pending"""
+        now = time.monotonic()
+        for index, process in enumerate(self.processes):
+            acked = self.coordinator.acked[index]
+            if acked != self._last_acked[index] or not self.coordinator.pending(index):
+                self._last_acked[index] = acked
+                self._last_progress[index] = now
+            if process.is_alive():
+                if now - self._last_progress[index] < self.ack_timeout:
+                    continue
+                print(f"⏱️ Worker {index} acknowledged nothing for {self.ack_timeout:.0f}s, restarting it")
+                process.terminate()
+                process.join(5)
+            else:
+                print(f"💀 Worker {index} exited (code {process.exitcode}), restarting it")
+            self.restart_worker(index)
+
+    def restart_worker(self, index):
+        """Start a fresh worker for this shard and hand it the updates the old one left unfinished"""
+        # The old queue may still hold the dead process's lock or a half-read item
+        old_inbox = self.inboxes[index]
+        old_inbox.cancel_join_thread()
+        old_inbox.close()
+        self.inboxes[index] = mp.Queue()
+        self.processes[index] = self._spawn(index)
+        self.restarts[index] += 1
+        self._last_progress[index] = time.monotonic()
+
+        unacked = self.coordinator.unacked(index)
+        if unacked:
+            # Workers go in order, so only the oldest update was being handled when it failed
+            update_id = unacked[0][0]
+            attempts = self._attempts.get(update_id, 1) + 1
+            if attempts > MAX_DELIVERY_ATTEMPTS:
+                print(f"⚠️ Skipping update {update_id} after {MAX_DELIVERY_ATTEMPTS} failed deliveries")
+                self.coordinator.drop(index, update_id)
+                self._attempts.pop(update_id, None)
+                unacked = unacked[1:]
+            else:
+                self._attempts[update_id] = attempts
+        for item in unacked:
+            self.inboxes[index].put(item)
+        committed = self.coordinator.committed()
+        self._attempts = {update_id: n for update_id, n in self._attempts.items() if update_id > committed}
+        print(f"👷 Worker {index} restarted with {len(unacked)} unfinished updates")
+
+    def stop_workers(self, timeout=30):
+        for inbox in self.inboxes:
+            inbox.put(None)
+        for process in self.processes:
+            process.join(timeout)
+        self.coordinator.save()
+
+    def route(self, update):
+        """Send an update to its chat's worker; returns the worker index or None"""
+        message = update.get("message") or {}
+        text = message.get("text", "")
+        if not text:
+            self.coordinator.skip(update["update_id"])
+            return None
+        chat_id = message["chat"]["id"]
+        worker = shard_for(chat_id, self.workers)
+        item = (update["update_id"], chat_id, text, time.time())
+        self.coordinator.dispatched(worker, item)
+        self.inboxes[worker].put(item)
+        return worker
+
+    def get_worker_metrics(self):
+        """Per-worker counters plus the queue depth still waiting for each worker"""
+        size = len(METRIC_FIELDS)
+        with self.metrics.get_lock():
+            values = list(self.metrics)
+        report = []
+        for index in range(self.workers):
+            row = dict(zip(METRIC_FIELDS, values[index * size:(index + 1) * size]))
+            row["worker"] = index
+            row["alive"] = self.processes[index].is_alive() if index < len(self.processes) else False
+            row["pending"] = self.coordinator.pending(index)
+            row["restarts"] = self.restarts[index]
+            report.append(row)
+        return report
+
+    def replay_recovered(self):
+        """Hand the updates left unfinished by the previous run back to their chats' workers"""
+        recovered, self.coordinator.recovered = self.coordinator.recovered, []
+        for item in recovered:
+            worker = shard_for(item[1], self.workers)
+            self.coordinator.dispatched(worker, item)
+            self.inboxes[worker].put(item)
+        if recovered:
+            print(f"♻️ Replaying {len(recovered)} updates left unfinished by the last run")
+
+    def report(self):
+        committed = self.coordinator.save()
+        print(f"📊 Committed offset {committed} (dispatched up to {self.coordinator.max_dispatched})")
+        for row in self.get_worker_metrics():
+            avg = row["busy_seconds"] / row["processed"] if row["processed"] else 0.0
+            print(f"   worker {row['worker']}: {int(row['processed'])} processed, {int(row['errors'])} errors, "
+                  f"{row['pending']} pending, {row['restarts']} restarts, avg {avg:.2f}s, "
+                  f"last latency {row['last_latency']:.2f}s"
+                  f"{'' if row['alive'] else ' (DEAD)'}")
+
+    def run(self):
+        from telegram_bot import get_telegram_updates
+
+        self.start_workers()
+        self.replay_recovered()
+        print(f"🔄 Ingestion started with {self.workers} workers from offset {self.coordinator.poll_offset()}")
+        last_report = time.monotonic()
+        try:
+            while True:
+                self.check_workers()
+                # Polling confirms everything dispatched to Telegram, so save what is unfinished first
+                self.coordinator.save()
+                updates = get_telegram_updates(offset=self.coordinator.poll_offset(), timeout=self.poll_timeout)
+                if not updates or not updates.get("ok"):
+                    time.sleep(5)
+                    continue
+
+                for update in updates.get("result", []):
+                    if update["update_id"] > self.coordinator.max_dispatched:
+                        self.route(update)
+
+                if time.monotonic() - last_report >= self.report_every:
+                    self.report()
+                    last_report = time.monotonic()
+        except KeyboardInterrupt:
+            print("\n🛑 Stopping workers...")
+        finally:
+            self.stop_workers()
+            self.report()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the Telegram bot across several worker processes")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2, help="number of worker processes")
+    parser.add_argument("--poll-timeout", type=int, default=30, help="getUpdates long-poll timeout (seconds)")
+    parser.add_argument("--report-every", type=int, default=30, help="seconds between metric reports")
+    parser.add_argument("--ack-timeout", type=float, default=WORKER_ACK_TIMEOUT_SECONDS,
+                        help="seconds a worker may hold pending updates without finishing one before it is restarted")
+    args = parser.parse_args()
+
+    print("🤖 Starting sharded Telegram Customer Support Bot...")
+    ShardedBot(
+        workers=args.workers, poll_timeout=args.poll_timeout, report_every=args.report_every, ack_timeout=args.ack_timeout
+    ).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Telegram poller supervisor
+Owns exactly one getUpdates loop and its offset, can be stopped cooperatively and
+reports health (updates per second, loop lag, last error, queue depth).
+"""
+
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+# Window used for the updates-per-second rate
+RATE_WINDOW_SECONDS = 60
+
+
+class TelegramSupervisor:
+    """Single long-polling loop: fetch_updates(offset, timeout) -> list, handle_update(update)"""
+
+    def __init__(self, fetch_updates, handle_update, poll_timeout=10, error_sleep=5, offset=0,
+                 on_offset=None):
+        self.fetch_updates = fetch_updates
+        self.handle_update = handle_update
+        self.poll_timeout = poll_timeout
+        self.error_sleep = error_sleep
+        self.on_offset = on_offset
+        self.offset = offset
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._arrivals = deque()
+        self._health = {
+            "started_at": None,
+            "updates_total": 0,
+            "errors": 0,
+            "last_error": None,
+            "last_error_at": None,
+            "last_poll_at": None,
+            "loop_lag": 0.0,
+            "queue_depth": 0
+        }
+
+    # ---------- LIFECYCLE ----------
+    @property
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Start the poller thread; returns False if it is already running"""
+        with self._lock:
+            if self.is_running:
+                return False
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self.run, name="telegram-poller", daemon=True)
+            self._thread.start()
+            return True
+
+    def stop(self, timeout=None):
+        """Ask the loop to stop and wait for the in-flight poll to finish"""
+        self._stop_event.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout if timeout is not None else self.poll_timeout + 5)
+        return not self.is_running
+
+    def run(self):
+        """Blocking poll loop; returns once stop() is called"""
+        self._health["started_at"] = datetime.now().isoformat()
+        while not self._stop_event.is_set():
+            try:
+                updates = self.fetch_updates(self.offset + 1, self.poll_timeout)
+                loop_started = time.monotonic()
+                self._health["last_poll_at"] = datetime.now().isoformat()
+                updates = updates or []
+                self._record_arrivals(len(updates))
+                for index, update in enumerate(updates):
+                    if self._stop_event.is_set():
+                        break
+                    self._health["queue_depth"] = len(updates) - index
+                    try:
+                        self.handle_update(update)
+                    except Exception as e:
+                        self._record_error(e)
+                    # Advance past the update even if handling failed - redelivering it would fail again
+                    self.offset = max(self.offset, update["update_id"])
+                    if self.on_offset is not None:
+                        self.on_offset(self.offset)
+                self._health["queue_depth"] = 0
+                # Time spent handling the batch is time the next poll was held back
+                self._health["loop_lag"] = round(time.monotonic() - loop_started, 3)
+            except Exception as e:
+                self._record_error(e)
+                self._stop_event.wait(self.error_sleep)
+
+    # ---------- HEALTH ----------
+    def _record_arrivals(self, count):
+        now = time.monotonic()
+        with self._lock:
+            if count:
+                self._arrivals.append((now, count))
+                self._health["updates_total"] += count
+            while self._arrivals and now - self._arrivals[0][0] > RATE_WINDOW_SECONDS:
+                self._arrivals.popleft()
+
+    def _record_error(self, error):
+        print(f"Telegram bot error: {str(error)}")
+        with self._lock:
+            self._health["errors"] += 1
+            self._health["last_error"] = str(error)
+            self._health["last_error_at"] = datetime.now().isoformat()
+
+    def get_health(self):
+        """Snapshot of poller health for dashboards"""
+        self._record_arrivals(0)
+        with self._lock:
+            health = dict(self._health)
+            recent = sum(count for _, count in self._arrivals)
+        health["running"] = self.is_running
+        health["offset"] = self.offset
+        health["updates_per_second"] = round(recent / RATE_WINDOW_SECONDS, 3)
+        return health
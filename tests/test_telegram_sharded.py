@@ -0,0 +1,50 @@
+from telegram_sharded import OffsetCoordinator
+
+
+def update(update_id, chat_id):
+    return (update_id, chat_id, f"message {update_id}", 0.0)
+
+
+def test_stalled_shard_does_not_hold_back_polling(tmp_path):
+    coordinator = OffsetCoordinator(2, state_path=str(tmp_path / "offset.json"))
+
+    # Worker 0 hangs on update 1 while worker 1 keeps up with far more than one getUpdates page
+    coordinator.dispatched(0, update(1, "stuck"))
+    for update_id in range(2, 302):
+        coordinator.dispatched(1, update(update_id, "busy"))
+        coordinator.acked[1] = update_id
+
+    assert coordinator.committed() == 0
+    assert coordinator.poll_offset() == 302
+    assert coordinator.pending(0) == 1
+    assert coordinator.pending(1) == 0
+
+
+def test_restart_replays_the_stalled_update(tmp_path):
+    state_path = str(tmp_path / "offset.json")
+    coordinator = OffsetCoordinator(2, state_path=state_path)
+    coordinator.dispatched(0, update(1, "stuck"))
+    for update_id in range(2, 6):
+        coordinator.dispatched(1, update(update_id, "busy"))
+    coordinator.acked[1] = 5
+    assert coordinator.save() == 0
+
+    restarted = OffsetCoordinator(2, state_path=state_path)
+    assert restarted.recovered == [update(1, "stuck")]
+    assert restarted.poll_offset() == 6
+
+    restarted.dispatched(0, restarted.recovered[0])
+    assert restarted.committed() == 0
+    restarted.acked[0] = 1
+    assert restarted.committed() == 5
+
+
+def test_dropped_update_releases_the_committed_offset(tmp_path):
+    coordinator = OffsetCoordinator(1, state_path=str(tmp_path / "offset.json"))
+    coordinator.dispatched(0, update(1, "poison"))
+    coordinator.dispatched(0, update(2, "next"))
+
+    coordinator.drop(0, 1)
+    assert coordinator.committed() == 1
+    coordinator.acked[0] = 2
+    assert coordinator.committed() == 2
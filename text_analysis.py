@@ -0,0 +1,58 @@
+"""
+Text analysis helpers
+Sentiment, intent keywords and language detection for user messages; shared by the
+Streamlit app and the response engine.
+"""
+
+import re
+
+from textblob import TextBlob
+
+from response_config import response_config
+
+# ---------- SENTIMENT & INTENT ----------
+def analyze_sentiment(text):
+    """Analyze sentiment of user messages"""
+    try:
+        blob = TextBlob(text)
+        sentiment_score = blob.sentiment.polarity
+        if sentiment_score > 0.1:
+            return "positive", sentiment_score
+        elif sentiment_score < -0.1:
+            return "negative", sentiment_score
+        else:
+            return "neutral", sentiment_score
+    except:
+        return "neutral", 0.0
+
+# Words that mark an upset customer; enough to order the LLM queue without a TextBlob pass
+NEGATIVE_CUES = frozenset(
+    "angry annoyed awful bad broken complaint disappointed disgusting frustrated furious hate "
+    "horrible incompetent ridiculous scam terrible unacceptable upset useless worst wrong".split()
+)
+
+def quick_sentiment(text):
+    """Cheap lexical sentiment ("negative" or "neutral") for hot-path decisions"""
+    return "negative" if NEGATIVE_CUES.intersection(re.findall(r"[a-z]+", text.lower())) else "neutral"
+
+def extract_intent_keywords(text):
+    """Extract key intent keywords from user messages (intent categories come from the response config)"""
+    return response_config.current().intent_keywords(text)
+
+# ---------- MULTI-LANGUAGE SUPPORT ----------
+def detect_language(text):
+    """Detect language of user input"""
+    try:
+        blob = TextBlob(text)
+        return blob.detect_language()
+    except:
+        return "en"
+
+def translate_response(response, target_language="en"):
+    """Translate response to target language"""
+    try:
+        blob = TextBlob(response)
+        translated = blob.translate(to=target_language)
+        return str(translated)
+    except:
+        return response
@@ -0,0 +1,273 @@
+"""
+Durable support-ticket queue
+Escalation tickets live in SQLite (indexed by status, priority and time) instead of the
+browser session, so they survive restarts and are shared by the web app and Telegram.
+
+Creating a ticket never waits on the disk: ticket numbers are handed out from a block
+reserved in the database (one small write per TICKET_ID_BLOCK tickets), and the rows are
+queued for a writer thread that appends them in batches, one transaction per batch. Every
+message is an append (a ticket row, or a message row for a repeat), never an update.
+
+Repeated negative messages from the same user within the dedup window attach to the
+user's open ticket instead of opening another one. The window is tracked in shared state,
+so it holds across processes that share SHARED_STATE_URL, and closing a ticket ends it.
+"""
+
+import atexit
+import json
+import queue
+import sqlite3
+import threading
+import time
+
+from shared_state import InMemorySharedState
+
+TICKET_DEDUP_WINDOW_SECONDS = 600
+TICKET_ID_BLOCK = 100
+WRITE_BATCH_SIZE = 256
+# A failed batch is retried (never dropped: its users were already told their ticket number)
+WRITE_RETRY_SECONDS = 0.5
+WRITE_RETRY_MAX_SECONDS = 30.0
+TICKET_STATUSES = ("open", "pending", "closed")
+
+
+def ticket_priority(sentiment):
+    return "high" if sentiment == "negative" else "medium"
+
+
+class TicketStore:
+    """SQLite ticket store with an asynchronous, batched append path"""
+
+    def __init__(self, path="tickets.db", shared_state=None, dedup_window_seconds=TICKET_DEDUP_WINDOW_SECONDS):
+        self.path = path
+        self.shared_state = shared_state or InMemorySharedState()
+        self.dedup_window_seconds = dedup_window_seconds
+        # The connection has its own lock so a slow commit never blocks ticket creation
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS tickets (
+                ticket_id INTEGER PRIMARY KEY,
+                created_at REAL NOT NULL,
+                user_id TEXT NOT NULL,
+                channel TEXT NOT NULL,
+                user_message TEXT NOT NULL,
+                sentiment TEXT NOT NULL,
+                intent TEXT NOT NULL,
+                priority TEXT NOT NULL,
+                status TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_tickets_status ON tickets (status, created_at);
+            CREATE INDEX IF NOT EXISTS idx_tickets_priority ON tickets (priority, created_at);
+            CREATE INDEX IF NOT EXISTS idx_tickets_created ON tickets (created_at);
+            CREATE INDEX IF NOT EXISTS idx_tickets_user ON tickets (user_id, created_at);
+            CREATE TABLE IF NOT EXISTS ticket_messages (
+                ticket_id INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                user_message TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_ticket_messages_ticket ON ticket_messages (ticket_id);
+            CREATE TABLE IF NOT EXISTS ticket_ids (
+                id INTEGER PRIMARY KEY CHECK (id = 0),
+                next_id INTEGER NOT NULL
+            );
+            INSERT OR IGNORE INTO ticket_ids (id, next_id) VALUES (0, 1);
+        """)
+        self._conn.commit()
+        self._id_lock = threading.Lock()
+        self._next_id = 0
+        self._id_limit = 0
+        self._queue = queue.SimpleQueue()
+        self._pending = 0
+        self._drained = threading.Condition(self._lock)
+        self._stats = {"created": 0, "deduplicated": 0, "written": 0, "write_batches": 0, "write_errors": 0}
+        self._writer = threading.Thread(target=self._write_loop, name="ticket-writer", daemon=True)
+        self._writer.start()
+        atexit.register(self.flush)  # don't lose tickets still queued at shutdown
+
+    # ---------- request path ----------
+    def _allocate_id(self):
+        """Next ticket number; reserves a new block from the database when the current one is used up"""
+        with self._id_lock:
+            if self._next_id >= self._id_limit:
+                with self._db_lock:
+                    self._conn.execute("BEGIN IMMEDIATE")
+                    try:
+                        start = self._conn.execute("SELECT next_id FROM ticket_ids WHERE id = 0").fetchone()[0]
+                        self._conn.execute("UPDATE ticket_ids SET next_id = ? WHERE id = 0", (start + TICKET_ID_BLOCK,))
+                        self._conn.commit()
+                    except Exception:
+                        self._conn.rollback()
+                        raise
+                self._next_id, self._id_limit = start, start + TICKET_ID_BLOCK
+            ticket_id = self._next_id
+            self._next_id += 1
+            return ticket_id
+
+    def _unallocate_id(self, ticket_id):
+        """Hand back a number that lost the claim race, if nothing was allocated after it"""
+        with self._id_lock:
+            if self._next_id == ticket_id + 1:
+                self._next_id = ticket_id
+
+    @staticmethod
+    def _recent_key(user_id):
+        return f"tickets:recent:{user_id}"
+
+    def _claim(self, user_id):
+        """(ticket id, duplicate): the user's ticket still open in the window, else a newly allocated one"""
+        key = self._recent_key(user_id)
+        for _ in range(3):
+            existing = self.shared_state.get(key)
+            if existing is not None:
+                return existing, True
+            # A number is only allocated once the user has no open ticket, so duplicates never burn one
+            ticket_id = self._allocate_id()
+            if self.shared_state.compare_and_set(key, None, ticket_id, ttl=self.dedup_window_seconds):
+                return ticket_id, False
+            self._unallocate_id(ticket_id)  # another request for this user claimed the window first
+        return self._allocate_id(), False  # the window kept flipping under us; a new ticket is the safe answer
+
+    def create(self, user_id, user_message, sentiment, intent, channel="web"):
+        """Open a ticket (or attach to the user's recent one); returns the ticket dict without waiting for the write"""
+        now = time.time()
+        ticket_id, duplicate = self._claim(str(user_id))
+        ticket = {
+            "ticket_id": ticket_id,
+            "timestamp": now,
+            "user_id": str(user_id),
+            "channel": channel,
+            "user_message": user_message,
+            "sentiment": sentiment,
+            "intent": list(intent or []),
+            "priority": ticket_priority(sentiment),
+            "status": "open",
+            "duplicate": duplicate
+        }
+        with self._lock:
+            self._stats["deduplicated" if duplicate else "created"] += 1
+            self._pending += 1
+        self._queue.put(ticket)
+        return ticket
+
+    # ---------- writer ----------
+    def _write_loop(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < WRITE_BATCH_SIZE:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            delay = WRITE_RETRY_SECONDS
+            while not self._write_batch(batch):
+                time.sleep(delay)
+                delay = min(delay * 2, WRITE_RETRY_MAX_SECONDS)
+
+    def _write_batch(self, batch):
+        """Append one batch in a single transaction; False (nothing written) on a database error"""
+        new_tickets = [
+            (t["ticket_id"], t["timestamp"], t["user_id"], t["channel"], t["user_message"], t["sentiment"],
+             json.dumps(t["intent"]), t["priority"], t["status"])
+            for t in batch if not t["duplicate"]
+        ]
+        messages = [(t["ticket_id"], t["timestamp"], t["user_message"]) for t in batch]
+        written, error = False, None
+        with self._db_lock:
+            try:
+                self._conn.executemany("INSERT OR IGNORE INTO tickets VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", new_tickets)
+                self._conn.executemany("INSERT INTO ticket_messages VALUES (?, ?, ?)", messages)
+                self._conn.commit()
+                written = True
+            except sqlite3.Error as e:
+                self._conn.rollback()
+                error = e
+        if error is not None:
+            print(f"⚠️ Failed to write {len(batch)} tickets, retrying: {str(error)}")
+        with self._lock:
+            if not written:
+                self._stats["write_errors"] += 1
+                return False
+            self._stats["written"] += len(batch)
+            self._stats["write_batches"] += 1
+            self._pending -= len(batch)
+            self._drained.notify_all()
+        return True
+
+    def flush(self, timeout=2.0):
+        """Wait until queued tickets are written; False on timeout"""
+        with self._lock:
+            return self._drained.wait_for(lambda: self._pending == 0, timeout)
+
+    # ---------- dashboard ----------
+    def list_tickets(self, status=None, priority=None, user_id=None, since=None, limit=50):
+        """Newest tickets first, each with the number of messages attached to it"""
+        self.flush()
+        clauses, params = [], []
+        for column, value in (("status", status), ("priority", priority), ("user_id", user_id)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(str(value))
+        if since is not None:
+            clauses.append("created_at >= ?")
+            params.append(since)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._db_lock:
+            rows = self._conn.execute(f"""
+                SELECT ticket_id, created_at, user_id, channel, user_message, sentiment, intent, priority, status,
+                       (SELECT COUNT(*) FROM ticket_messages m WHERE m.ticket_id = t.ticket_id)
+                FROM tickets t {where} ORDER BY created_at DESC LIMIT ?
+            """, params + [int(limit)]).fetchall()
+        return [
+            {
+                "ticket_id": row[0],
+                "timestamp": row[1],
+                "user_id": row[2],
+                "channel": row[3],
+                "user_message": row[4],
+                "sentiment": row[5],
+                "intent": json.loads(row[6]),
+                "priority": row[7],
+                "status": row[8],
+                "messages": row[9]
+            }
+            for row in rows
+        ]
+
+    def set_status(self, ticket_id, status):
+        """Move a ticket to open / pending / closed; False if it does not exist"""
+        if status not in TICKET_STATUSES:
+            raise ValueError(f"Unknown ticket status: {status}")
+        self.flush()
+        with self._db_lock:
+            cursor = self._conn.execute("UPDATE tickets SET status = ? WHERE ticket_id = ?", (status, int(ticket_id)))
+            self._conn.commit()
+            row = self._conn.execute("SELECT user_id FROM tickets WHERE ticket_id = ?", (int(ticket_id),)).fetchone()
+        if status == "closed" and row is not None:
+            # The user's next negative message opens a new ticket instead of attaching to this one
+            self.shared_state.compare_and_set(self._recent_key(row[0]), int(ticket_id), None, ttl=1)
+        return cursor.rowcount > 0
+
+    def counts(self):
+        """{"status": {...}, "priority": {...}} ticket counts"""
+        self.flush()
+        with self._db_lock:
+            by_status = dict(self._conn.execute("SELECT status, COUNT(*) FROM tickets GROUP BY status").fetchall())
+            by_priority = dict(self._conn.execute(
+                "SELECT priority, COUNT(*) FROM tickets WHERE status != 'closed' GROUP BY priority"
+            ).fetchall())
+        return {"status": by_status, "priority": by_priority}
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["queued"] = self._pending
+        return stats
+
+    def close(self):
+        self.flush()
+        with self._db_lock:
+            self._conn.close()
@@ -0,0 +1,170 @@
+"""
+Per-stage latency tracing
+Spans time every pipeline stage (analysis, Dialogflow, generic filter, smart responses,
+OpenAI, Telegram send) into fixed-bucket histograms keyed by stage and source. Recording a
+span is a perf_counter pair, a bisect and a counter bump under a lock, cheap enough to
+stay on in production. p50/p95/p99 are estimated from the buckets, and the histograms are
+exposed in the Prometheus text format by start_metrics_server() and engine_server.py.
+"""
+
+import bisect
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Upper bounds (seconds) of the latency buckets; the last bucket is +Inf
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 1.5, 2.0, 3.0, 5.0, 10.0, 30.0)
+METRIC_NAME = "support_stage_duration_seconds"
+
+
+class Histogram:
+    """Prometheus-style histogram (non-cumulative counts per bucket)"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q):
+        """Quantile estimate, interpolated linearly inside the bucket it falls in"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            if bucket_count and seen + bucket_count >= rank:
+                lower = self.buckets[index - 1] if index > 0 else 0.0
+                upper = self.buckets[index] if index < len(self.buckets) else self.buckets[-1]
+                return lower + (upper - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+        return self.buckets[-1]
+
+
+class Tracer:
+    """Histograms per (stage, source) for one process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+
+    def observe(self, stage, seconds, source=""):
+        key = (stage, source or "")
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    @contextmanager
+    def span(self, stage, source=""):
+        """Time a block; set span["source"] inside the block to label the outcome"""
+        span = {"source": source}
+        start = time.perf_counter()
+        try:
+            yield span
+        finally:
+            self.observe(stage, time.perf_counter() - start, span["source"])
+
+    def traced(self, stage):
+        """Decorator timing every call; the source label comes from the result"""
+        def decorator(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                source = "error"
+                try:
+                    result = fn(*args, **kwargs)
+                    source = _result_source(result)
+                    return result
+                finally:
+                    self.observe(stage, time.perf_counter() - start, source)
+            return wrapper
+        return decorator
+
+    def get_stats(self):
+        """{stage: {source: {count, p50, p95, p99}}}"""
+        with self._lock:
+            items = list(self._histograms.items())
+            stats = {}
+            for (stage, source), histogram in items:
+                stats.setdefault(stage, {})[source or "all"] = {
+                    "count": histogram.count,
+                    "p50": round(histogram.quantile(0.50), 4),
+                    "p95": round(histogram.quantile(0.95), 4),
+                    "p99": round(histogram.quantile(0.99), 4)
+                }
+        return stats
+
+    def render_prometheus(self):
+        """Prometheus text exposition of every histogram"""
+        lines = [
+            f"# HELP {METRIC_NAME} Latency of response pipeline stages",
+            f"# TYPE {METRIC_NAME} histogram"
+        ]
+        with self._lock:
+            items = sorted(self._histograms.items())
+            for (stage, source), histogram in items:
+                labels = f'stage="{stage}",source="{source}"'
+                cumulative = 0
+                for bound, bucket_count in zip(histogram.buckets, histogram.counts):
+                    cumulative += bucket_count
+                    lines.append(f'{METRIC_NAME}_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f'{METRIC_NAME}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+                lines.append(f"{METRIC_NAME}_sum{{{labels}}} {histogram.sum:.6f}")
+                lines.append(f"{METRIC_NAME}_count{{{labels}}} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+def _result_source(result):
+    if isinstance(result, dict):
+        return result.get("source", "")
+    if isinstance(result, bool):
+        return "yes" if result else "no"
+    return "hit" if result else "miss"
+
+
+# Process-wide tracer shared by every module
+tracer = Tracer()
+span = tracer.span
+traced = tracer.traced
+observe = tracer.observe
+
+
+class MetricsRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != "/metrics":
+            self.send_error(404)
+            return
+        body = tracer.render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # scrapes every few seconds would flood the console
+
+
+def start_metrics_server(port, host="127.0.0.1"):
+    """Serve GET /metrics on a daemon thread; returns the server, or None if the port is taken
+
+    Loopback only by default: the endpoint has no authentication. Pass host="0.0.0.0" (or set
+    METRICS_HOST in the front ends) to let a remote Prometheus scrape it.
+    """
+    try:
+        server = ThreadingHTTPServer((host, port), MetricsRequestHandler)
+    except OSError as e:
+        print(f"⚠️ Metrics endpoint not started on port {port}: {str(e)}")
+        return None
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    print(f"📈 Metrics at http://{host}:{port}/metrics")
+    return server
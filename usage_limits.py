@@ -0,0 +1,107 @@
+"""
+Per-user OpenAI rate limits and token accounting
+Each user (web session or Telegram chat) gets a request bucket, a token bucket fed by the
+real usage.total_tokens of every completion, and daily request/token budgets. Everything
+lives in the shared state backend, so limits hold across processes, and daily usage
+keys expire on their own - the store never grows past two days of users.
+"""
+
+import time
+from datetime import datetime, timezone
+
+# Daily usage keys outlive their day long enough for "yesterday" views
+USAGE_KEY_TTL_SECONDS = 2 * 24 * 3600
+BUCKET_KEY_TTL_SECONDS = 3600
+CAS_RETRIES = 5
+
+
+def usage_day(now=None):
+    """UTC day used for daily budgets"""
+    return datetime.fromtimestamp(now or time.time(), tz=timezone.utc).strftime("%Y%m%d")
+
+
+class UsageLimiter:
+    """Request and token buckets plus daily budgets per user"""
+
+    def __init__(self, state, requests_per_minute=6, tokens_per_minute=3000,
+                 daily_request_budget=200, daily_token_budget=20000):
+        self.state = state
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.daily_request_budget = daily_request_budget
+        self.daily_token_budget = daily_token_budget
+
+    # ---------- BUCKETS ----------
+    def _update_bucket(self, key, capacity, per_minute, cost, allow_debt):
+        """Refill, then take `cost`; returns False (leaving the bucket alone) if it cannot pay"""
+        for _ in range(CAS_RETRIES):
+            current = self.state.get(key)
+            now = time.time()
+            if current is None:
+                level = float(capacity)
+            else:
+                level = min(capacity, current["level"] + (now - current["at"]) * per_minute / 60.0)
+            if not allow_debt and level < cost:
+                return False
+            updated = {"level": level - cost, "at": now}
+            if self.state.compare_and_set(key, current, updated, ttl=BUCKET_KEY_TTL_SECONDS):
+                return True
+        # Heavy contention on one user's bucket - err on the side of limiting
+        return allow_debt
+
+    def _has_tokens(self, user_id):
+        current = self.state.get(f"ratelimit:tokens:{user_id}")
+        if current is None:
+            return True
+        level = current["level"] + (time.time() - current["at"]) * self.tokens_per_minute / 60.0
+        return level > 0
+
+    # ---------- PUBLIC API ----------
+    def check(self, user_id):
+        """Admit one OpenAI request for the user; returns None, or the reason it is limited"""
+        day = usage_day()
+        if self.state.get(f"usage:{day}:{user_id}:tokens", 0) >= self.daily_token_budget:
+            reason = "daily_tokens"
+        elif self.state.get(f"usage:{day}:{user_id}:requests", 0) >= self.daily_request_budget:
+            reason = "daily_requests"
+        elif not self._has_tokens(user_id):
+            reason = "tokens_per_minute"
+        elif not self._update_bucket(f"ratelimit:requests:{user_id}", self.requests_per_minute,
+                                     self.requests_per_minute, 1, allow_debt=False):
+            reason = "requests_per_minute"
+        else:
+            self.state.incr(f"usage:{day}:{user_id}:requests", ttl=USAGE_KEY_TTL_SECONDS)
+            return None
+        self.state.incr(f"usage:{day}:limited:{reason}", ttl=USAGE_KEY_TTL_SECONDS)
+        return reason
+
+    def record(self, user_id, tokens):
+        """Charge the tokens a completion actually used (the token bucket may go into debt)"""
+        if not tokens:
+            return
+        self.state.incr(f"usage:{usage_day()}:{user_id}:tokens", tokens, ttl=USAGE_KEY_TTL_SECONDS)
+        self._update_bucket(f"ratelimit:tokens:{user_id}", self.tokens_per_minute,
+                            self.tokens_per_minute, tokens, allow_debt=True)
+
+    def get_usage(self, day=None, top=10):
+        """Per-user totals for one day, heaviest token users first, plus limit counts"""
+        day = day or usage_day()
+        prefix = f"usage:{day}:"
+        users = {}
+        limited = {}
+        for key, value in self.state.get_prefix(prefix).items():
+            user_id, _, field = key[len(prefix):].rpartition(":")
+            if user_id == "limited":
+                limited[field] = value
+            else:
+                users.setdefault(user_id, {"requests": 0, "tokens": 0})[field] = value
+        ranked = sorted(users.items(), key=lambda item: item[1]["tokens"], reverse=True)
+        return {
+            "day": day,
+            "users": len(users),
+            "requests": sum(usage["requests"] for usage in users.values()),
+            "tokens": sum(usage["tokens"] for usage in users.values()),
+            "limited": limited,
+            "top_users": [dict(usage, user=user_id) for user_id, usage in ranked[:top]],
+            "daily_token_budget": self.daily_token_budget
+        }